@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from typing import List
 from fastapi import FastAPI, Depends, HTTPException, Header
 from fastapi.responses import JSONResponse
@@ -5,21 +6,36 @@ from fastapi.openapi.utils import get_openapi
 from sqlalchemy.orm import Session
 
 from app.database import Base, get_engine
+from app.logging_config import configure_logging
 from app.routes import activity_image_routes, activity_review_routes, activity_routes
+from app.services.auth_cache import auth_decision_cache
+from app.services.auth_service import create_auth_client
 
 import os
 
+configure_logging()
+
 if not os.path.exists("uploads"):
     os.makedirs("uploads")
 
 
 Base.metadata.create_all(bind=get_engine())
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client to the auth service for the lifetime of the application
+    app.state.auth_client = create_auth_client()
+    yield
+    await app.state.auth_client.aclose()
+
+
 app = FastAPI(
     title="Activities Service",
     description="Activities Management Service",
     version="1.0.0",
     openapi_tags=[],
+    lifespan=lifespan,
 )
 
 app.include_router(activity_routes.router, prefix="/api/activities", tags=[])
@@ -31,6 +47,12 @@ app.include_router(
 )
 
 
+@app.get("/metrics/auth", include_in_schema=False)
+def auth_metrics():
+    """Hit rate of the auth decision cache and latency of calls to the auth service"""
+    return auth_decision_cache.stats()
+
+
 def custom_openapi():
     if app.openapi_schema:
         return app.openapi_schema
@@ -1,14 +1,18 @@
-from geoalchemy2 import Geometry
+from geoalchemy2 import Geography, Geometry
 from sqlalchemy import (
     TIMESTAMP,
     BigInteger,
     Column,
     Float,
     ForeignKey,
+    Index,
     Integer,
     PrimaryKeyConstraint,
     String,
     UUID,
+    cast,
+    func,
+    text,
 )
 from sqlalchemy.orm import relationship
 from ...database import Base
@@ -38,6 +42,35 @@ class Activity(Base):
     reviews = relationship("ActivityReview", back_populates="activity")
 
 
+# Document the full text search runs on. Postgres only uses the GIN index below when
+# a query repeats this exact expression, search with it instead of rebuilding it.
+activity_search_document = func.to_tsvector(
+    text("'simple'::regconfig"),
+    func.coalesce(Activity.name, text("''"))
+    + text("' '")
+    + func.coalesce(Activity.description, text("''")),
+)
+
+Index(
+    "ix_activities_search_document",
+    activity_search_document,
+    postgresql_using="gin",
+).ddl_if(dialect="postgresql")
+
+
+# point_geom as geography, so distances are in metres. Indexed for radius and nearest
+# searches, which must use this exact expression for Postgres to use the index.
+activity_point_geography = cast(
+    Activity.point_geom, Geography(geometry_type="POINT", srid=4326)
+)
+
+Index(
+    "ix_activities_point_geography",
+    activity_point_geography,
+    postgresql_using="gist",
+).ddl_if(dialect="postgresql")
+
+
 class Image(Base):
     __tablename__ = "images"
 
@@ -0,0 +1,113 @@
+# Shared with other services, which hold copies of this file.
+# Edit it here and run scripts/python/syncSharedModules.py to update the copies.
+import base64
+import datetime
+import enum
+import json
+from typing import Any, Optional
+
+from sqlalchemy import and_, or_
+
+
+# Response header carrying the cursor of the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime.datetime):
+        return {"datetime": value.isoformat()}
+    if isinstance(value, enum.Enum):
+        return value.name
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and "datetime" in value:
+        return datetime.datetime.fromisoformat(value["datetime"])
+    return value
+
+
+def encode_cursor(sort_key: str, descending: bool, sort_value: Any, id: int) -> str:
+    payload = [sort_key, descending, _encode_value(sort_value), id]
+    data = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_key: str, descending: bool) -> tuple[Any, int]:
+    """
+    Returns the (sort value, id) of the last row of the previous page.
+    The cursor must come from a search with the same sort field and order.
+    """
+    try:
+        data = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_sort_key, cursor_descending, sort_value, id = json.loads(data)
+        sort_value = _decode_value(sort_value)
+    except (ValueError, TypeError):
+        raise InvalidCursor("Invalid cursor")
+
+    if cursor_sort_key != sort_key or cursor_descending != descending:
+        raise InvalidCursor("Cursor does not match the sort field and order")
+    if not isinstance(id, int):
+        raise InvalidCursor("Invalid cursor")
+    return sort_value, id
+
+
+def paginate(
+    query,
+    sort_key: str,
+    sort_column,
+    id_column,
+    descending: bool,
+    limit: int,
+    page: int = 1,
+    cursor: Optional[str] = None,
+) -> tuple[list, Optional[str]]:
+    """
+    Order `query` by `sort_column` (nulls last) then `id_column`, in the same direction,
+    and return one page of entities with the cursor of the next page (None on the last page).
+
+    With a cursor the page starts right after the row it points at (keyset pagination),
+    which stays fast on deep pages and does not shift when rows are inserted.
+    Without one `page` is used as an offset, for clients that do not send cursors yet.
+    `sort_column` must read back exactly as stored (e.g. float8, not float4), else rows
+    tied with the cursor's value compare unequal to it and are skipped.
+    """
+    if cursor:
+        last_value, last_id = decode_cursor(cursor, sort_key, descending)
+        after = (lambda a, b: a < b) if descending else (lambda a, b: a > b)
+        if last_value is None:
+            query = query.filter(sort_column.is_(None), after(id_column, last_id))
+        else:
+            query = query.filter(
+                or_(
+                    after(sort_column, last_value),
+                    and_(sort_column == last_value, after(id_column, last_id)),
+                    sort_column.is_(None),
+                )
+            )
+
+    direction = (lambda c: c.desc()) if descending else (lambda c: c.asc())
+    query = query.add_columns(sort_column.label("sort_key")).order_by(
+        direction(sort_column).nulls_last(), direction(id_column)
+    )
+
+    if not cursor and page > 1:
+        query = query.offset((page - 1) * limit)
+
+    # One row more than asked tells whether there is a next page
+    rows = query.limit(limit + 1).all()
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+
+    next_cursor = None
+    if has_next and rows:
+        entity, sort_value = rows[-1]
+        next_cursor = encode_cursor(
+            sort_key, descending, sort_value, getattr(entity, id_column.key)
+        )
+
+    return [entity for entity, _ in rows], next_cursor
@@ -1,5 +1,15 @@
 import os
-from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from typing import Optional
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    UploadFile,
+)
 from fastapi.responses import FileResponse, JSONResponse
 from sqlalchemy.orm import Session
 
@@ -12,6 +22,15 @@ from app.services.activity_images_service import (
     get_image_ids_for_activity,
     set_hero_image_for_activity,
 )
+from app.services.image_variants import (
+    CACHE_CONTROL,
+    MEDIA_TYPES,
+    etag,
+    etag_matches,
+    get_or_create_variant,
+    variant_format,
+    variant_width,
+)
 from app.services.auth_service import (
     RESOURCE_NAME,
     authenticate_request,
@@ -27,14 +46,21 @@ router = APIRouter()
     "/{image_id}",
     responses={
         200: {"description": "Image retrieved successfully."},
+        304: {"description": "Image not modified."},
         404: {"description": "Image not found."},
         500: {"description": "Internal server error."},
     },
 )
 def get_image(
     image_id: int,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1),
     db: Session = Depends(get_db),
 ):
+    """
+    The original upload, or with `w` a WebP/JPEG variant at least `w` pixels wide
+    (at most the widest variant), generated on first request and cached on disk.
+    """
     image_data = db.query(Image).filter(Image.id == image_id).first()
     if not image_data:
         raise HTTPException(status_code=404, detail="Image not found")
@@ -43,7 +69,28 @@ def get_image(
     if not os.path.exists(file_path):
         raise HTTPException(status_code=404, detail="File not found")
 
-    return FileResponse(file_path)
+    if_none_match = request.headers.get("if-none-match")
+    headers = {"Cache-Control": CACHE_CONTROL}
+
+    if w is not None:
+        width = variant_width(w)
+        format = variant_format(request.headers.get("accept"))
+        headers["Vary"] = "Accept"
+        headers["ETag"] = etag(image_data.filepath, width, format)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+
+        variant_path = get_or_create_variant(image_data.filepath, width, format)
+        if variant_path is not None:
+            return FileResponse(
+                variant_path, media_type=MEDIA_TYPES[format], headers=headers
+            )
+
+    headers["ETag"] = etag(image_data.filepath)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(file_path, headers=headers)
 
 
 @router.post(
@@ -51,6 +98,7 @@ def get_image(
     responses={
         201: {"description": "Image uploaded successfully."},
         400: {"description": "Invalid input data."},
+        413: {"description": "Image too large."},
         500: {"description": "Internal server error."},
     },
 )
@@ -85,6 +133,7 @@ def upload_hero_image(
     responses={
         201: {"description": "Images uploaded successfully."},
         400: {"description": "Invalid input data."},
+        413: {"description": "Image too large."},
         500: {"description": "Internal server error."},
     },
 )
@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Response, UploadFile, File, Form
 from typing import List, Optional
 
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, run_in_db_thread
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor
 from app.models.dto.models import ActivityCreateDTO, ActivityEditDTO, CreateReviewDTO
 from app.services.activity_reviews_service import (
     create_activity_review,
@@ -40,8 +41,8 @@ async def create_new_activity_review(
         )
     ),
 ):
-    (created_review_id, status_code, err_message) = create_activity_review(
-        db, data, auth_data["user"]["user"]["id"]
+    (created_review_id, status_code, err_message) = await run_in_db_thread(
+        create_activity_review, db, data, auth_data["user"]["user"]["id"]
     )
     if status_code != 201:
         raise HTTPException(status_code=status_code, detail=err_message)
@@ -61,24 +62,40 @@ async def create_new_activity_review(
     },
 )
 async def get_reviews(
+    response: Response,
     search_term: str = "",
     sort_field: str = "id",
     sort_order: str = "desc",
     limit: int = 10,
     page: int = 1,
     activity_id: int = 0,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     auth_data: dict = Depends(
         authenticate_request(RESOURCE_NAME, "review-activities", "create-review")
     ),
 ):
     try:
-        return search_activity_reviews(
-            db, search_term, sort_field, sort_order, limit, page, activity_id
+        results, next_cursor = await run_in_db_thread(
+            search_activity_reviews,
+            db,
+            search_term,
+            sort_field,
+            sort_order,
+            limit,
+            page,
+            activity_id,
+            cursor,
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return results
+
 
 @router.delete(
     "/{review_id}",
@@ -95,7 +112,9 @@ async def delete_activity_review(
         authenticate_request(RESOURCE_NAME, "review-activities", "delete-review")
     ),
 ):
-    (success, status_code, err_message) = delete_activity_review_by_id(db, review_id)
+    (success, status_code, err_message) = await run_in_db_thread(
+        delete_activity_review_by_id, db, review_id
+    )
     if status_code != 200:
         raise HTTPException(status_code=status_code, detail=err_message)
 
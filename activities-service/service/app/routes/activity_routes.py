@@ -1,11 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, UploadFile, File, Form
 from typing import List, Optional
 
 from fastapi.responses import JSONResponse
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
-from app.database import get_db
+from app.database import get_db, run_in_db_thread
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor
 from app.models.dto.models import ActivityCreateDTO, ActivityEditDTO
 from app.services.activities_service import (
     create_activity,
@@ -14,6 +15,7 @@ from app.services.activities_service import (
     get_activity_by_id,
     search_activities,
     search_activities_by_location,
+    search_nearest_activities,
 )
 from app.services.auth_service import (
     RESOURCE_NAME,
@@ -49,8 +51,6 @@ async def create_new_activity(
         )
     ),
 ):
-    print("auth data for create", auth_data)
-
     try:
         activity_data = ActivityCreateDTO(
             name=name,
@@ -67,8 +67,8 @@ async def create_new_activity(
     except ValidationError as e:
         raise HTTPException(status_code=400, detail=e.errors())
 
-    (created_activity_id, status_code, err_message) = create_activity(
-        db, activity_data, auth_data["user"]["user"]["id"]
+    (created_activity_id, status_code, err_message) = await run_in_db_thread(
+        create_activity, db, activity_data, auth_data["user"]["user"]["id"]
     )
     if status_code != 201:
         raise HTTPException(status_code=status_code, detail=err_message)
@@ -88,24 +88,45 @@ async def create_new_activity(
     },
 )
 async def get_activities(
+    response: Response,
     search_term: str = "",
-    sort_field: str = "id",
+    sort_field: Optional[str] = None,
     sort_order: str = "desc",
     limit: int = 10,
     page: int = 1,
     categories: Optional[str] = None,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     auth_data: dict = Depends(
         authenticate_request(RESOURCE_NAME, "fetch-activities", "get-activities")
     ),
 ):
+    """
+    `sort_field` is one of id, name, created_at, updated_at or relevance. Without it,
+    results matching `search_term` come most relevant first, others by id.
+    Pass the X-Next-Cursor header of a response as `cursor` to get the next page.
+    """
     try:
-        return search_activities(
-            db, search_term, sort_field, sort_order, limit, page, categories
+        results, next_cursor = await run_in_db_thread(
+            search_activities,
+            db,
+            search_term,
+            sort_field,
+            sort_order,
+            limit,
+            page,
+            categories,
+            cursor,
         )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return results
+
 
 @router.get(
     "/search/location",
@@ -121,6 +142,7 @@ async def get_activities_by_location(
     radius: int = 1000,
     search_term: str = "",
     categories: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
     db: Session = Depends(get_db),
     auth_data: dict = Depends(
         authenticate_request(
@@ -129,8 +151,50 @@ async def get_activities_by_location(
     ),
 ):
     try:
-        return search_activities_by_location(
-            db, latitude, longitude, radius, search_term, categories
+        return await run_in_db_thread(
+            search_activities_by_location,
+            db,
+            latitude,
+            longitude,
+            radius,
+            search_term,
+            categories,
+            limit,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get(
+    "/search/nearest",
+    responses={
+        200: {"description": "search successful."},
+        400: {"description": "Invalid input data."},
+        500: {"description": "Internal server error."},
+    },
+)
+async def get_nearest_activities(
+    latitude: float,
+    longitude: float,
+    limit: int = Query(20, ge=1, le=100),
+    search_term: str = "",
+    categories: Optional[str] = None,
+    db: Session = Depends(get_db),
+    auth_data: dict = Depends(
+        authenticate_request(
+            RESOURCE_NAME, "fetch-activities", "get-nearest-activities"
+        )
+    ),
+):
+    try:
+        return await run_in_db_thread(
+            search_nearest_activities,
+            db,
+            latitude,
+            longitude,
+            limit,
+            search_term,
+            categories,
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -154,8 +218,8 @@ async def update_activity(
         )
     ),
 ):
-    (success, status_code, err_message) = edit_activity(
-        db, data, auth_data["user"]["user"]["id"]
+    (success, status_code, err_message) = await run_in_db_thread(
+        edit_activity, db, data, auth_data["user"]["user"]["id"]
     )
     if status_code != 200:
         raise HTTPException(status_code=status_code, detail=err_message)
@@ -181,7 +245,9 @@ async def delete_activity(
         authenticate_request(RESOURCE_NAME, "modify-activities", "delete-activity")
     ),
 ):
-    (success, status_code, err_message) = delete_activity_by_id(db, activity_id)
+    (success, status_code, err_message) = await run_in_db_thread(
+        delete_activity_by_id, db, activity_id
+    )
     if status_code != 200:
         raise HTTPException(status_code=status_code, detail=err_message)
 
@@ -206,7 +272,9 @@ async def get_activity(
         authenticate_request(RESOURCE_NAME, "fetch-activities", "get-activity")
     ),
 ):
-    (activity_data, status_code, err_message) = get_activity_by_id(db, activity_id)
+    (activity_data, status_code, err_message) = await run_in_db_thread(
+        get_activity_by_id, db, activity_id
+    )
     if status_code != 200:
         raise HTTPException(status_code=status_code, detail=err_message)
 
@@ -1,55 +1,169 @@
 import datetime
+import logging
+import re
 from typing import List, Optional
-import uuid
 
-from sqlalchemy import text
+from geoalchemy2 import Geography
+from sqlalchemy import Double, cast, func, text
 from sqlalchemy.orm import Session
-from app.models.db.models import Activity, ActivityImage, ActivityReview, Image
+from app.models.db.models import (
+    Activity,
+    ActivityImage,
+    ActivityReview,
+    Image,
+    activity_point_geography,
+    activity_search_document,
+)
 from app.models.dto.models import (
     ActivityCreateDTO,
     ActivityDetailDTO,
     ActivityEditDTO,
     ActivitySearchResultDTO,
 )
+from app.pagination import InvalidCursor, paginate
+from app.services.activity_images_service import insert_activity_images
+from app.services.upload_storage import StagedUploads, UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+
+def _filter_by_search_term(db: Session, query, search_term: str):
+    """
+    Filter activities whose name or description match `search_term`.
+    On Postgres every word of the term is matched as a prefix against the GIN indexed
+    activity_search_document, elsewhere (e.g. SQLite) it falls back to a substring match.
+    Returns the query and a relevance expression, None when there is no relevance.
+    """
+    search_term = (search_term or "").strip()
+    if not search_term:
+        return query, None
+
+    words = re.findall(r"\w+", search_term)
+    if db.get_bind().dialect.name != "postgresql" or not words:
+        return (
+            query.filter(
+                (Activity.name.ilike(f"%{search_term}%"))
+                | (Activity.description.ilike(f"%{search_term}%"))
+            ),
+            None,
+        )
+
+    ts_query = func.to_tsquery(
+        text("'simple'::regconfig"), " & ".join(f"{word}:*" for word in words)
+    )
+    return (
+        query.filter(activity_search_document.op("@@")(ts_query)),
+        # ts_rank is a float4, which psycopg reads back rounded. As a float8 the value a
+        # cursor carries compares equal to the row's rank, so tied rows are not skipped.
+        cast(func.ts_rank(activity_search_document, ts_query), Double),
+    )
 
 
 def search_activities(
     db: Session,
     search_term: str,
-    sort_field: str,
+    sort_field: Optional[str],
     sort_order: str = "asc",
     limit: int = 10,
     page: int = 1,
     categories: Optional[str] = None,
-) -> list[ActivitySearchResultDTO]:
+    cursor: Optional[str] = None,
+) -> tuple[list[ActivitySearchResultDTO], Optional[str]]:
+    """
+    Returns one page of activities and the cursor of the next page, see app.pagination.
+    Results are ordered by `sort_field` when it is a column. With a search term and no
+    other column to sort by they are ordered by relevance, most relevant first, as with
+    sort_field "relevance". Otherwise they are ordered by id.
+    """
     try:
         if sort_order not in ["asc", "desc"]:
             sort_order = "asc"
 
         if sort_field not in ["id", "name", "created_at", "updated_at"]:
-            sort_field = ""
+            sort_field = None
 
         if page < 1:
             page = 1
 
-        offset = (page - 1) * limit
+        query, rank = _filter_by_search_term(db, db.query(Activity), search_term)
+
+        if categories and len(categories) > 0:
+            category_list = categories.split(",")
+            query = query.filter(Activity.type.in_(category_list))
 
-        query = db.query(Activity).filter(
-            (Activity.name.ilike(f"%{search_term}%"))
-            | (Activity.description.ilike(f"%{search_term}%"))
+        if sort_field:
+            sort_key, sort_column = sort_field, getattr(Activity, sort_field)
+            descending = sort_order == "desc"
+        elif rank is not None:
+            # Most relevant first when no other order was asked for
+            sort_key, sort_column, descending = "relevance", rank, True
+        else:
+            sort_key, sort_column = "id", Activity.id
+            descending = sort_order == "desc"
+
+        data, next_cursor = paginate(
+            query, sort_key, sort_column, Activity.id, descending, limit, page, cursor
         )
 
+        return_data = [
+            ActivitySearchResultDTO(
+                id=item.id,
+                name=item.name,
+                description=item.description,
+                booking_url=item.booking_url,
+                type=item.type,
+                image_id=item.hero_image_id,
+                latitude=item.latitude,
+                longitude=item.longitude,
+                createdAt=item.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                updatedAt=item.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+                address=item.address,
+            )
+            for item in data
+        ]
+
+        return return_data, next_cursor
+    except InvalidCursor:
+        raise
+    except Exception:
+        logger.exception("Error searching activities")
+        return [], None
+
+
+def geography_point(latitude: float, longitude: float):
+    """A WGS 84 point as geography, with the coordinates as bound parameters"""
+    return cast(
+        func.ST_SetSRID(func.ST_MakePoint(float(longitude), float(latitude)), 4326),
+        Geography(geometry_type="POINT", srid=4326),
+    )
+
+
+def search_activities_by_location(
+    db: Session,
+    latitude: float,
+    longitude: float,
+    radius: int = 1000,
+    search_term: str = "",
+    categories: Optional[str] = None,
+    limit: int = 100,
+) -> list[ActivitySearchResultDTO]:
+    """
+    Activities within `radius` metres of the point, nearest first
+    """
+    try:
+        query, _ = _filter_by_search_term(db, db.query(Activity), search_term)
+
         if categories and len(categories) > 0:
             category_list = categories.split(",")
             query = query.filter(Activity.type.in_(category_list))
 
-        if len(sort_field) > 0:
-            if sort_order == "asc":
-                query = query.order_by(getattr(Activity, sort_field).asc())
-            else:
-                query = query.order_by(getattr(Activity, sort_field).desc())
+        point = geography_point(latitude, longitude)
+        # Both use the GiST index on activity_point_geography
+        query = query.filter(
+            func.ST_DWithin(activity_point_geography, point, float(radius))
+        ).order_by(activity_point_geography.op("<->")(point), Activity.id)
 
-        data = query.offset(offset).limit(limit).all()
+        data = query.limit(limit).all()
 
         return_data = [
             ActivitySearchResultDTO(
@@ -69,37 +183,42 @@ def search_activities(
         ]
 
         return return_data
-    except Exception as e:
-        print(f"Error searching activities: {e}")
+    except Exception:
+        logger.exception("Error searching activities by location")
         return []
 
 
-def search_activities_by_location(
+def search_nearest_activities(
     db: Session,
     latitude: float,
     longitude: float,
-    radius: int = 1000,
+    limit: int = 20,
     search_term: str = "",
     categories: Optional[str] = None,
 ) -> list[ActivitySearchResultDTO]:
+    """
+    The `limit` activities closest to the point with their distance in metres.
+    Ordering by <-> walks the GiST index, so the cost depends on `limit` and not on the table size.
+    """
     try:
-        query = db.query(Activity).filter(
-            (Activity.name.ilike(f"%{search_term}%"))
-            | (Activity.description.ilike(f"%{search_term}%"))
-        )
+        query, _ = _filter_by_search_term(db, db.query(Activity), search_term)
 
         if categories and len(categories) > 0:
             category_list = categories.split(",")
             query = query.filter(Activity.type.in_(category_list))
 
-        query = query.filter(
-            text(
-                f"ST_DWithin(point_geom, ST_MakePoint({longitude}, {latitude})::geography, {radius})"
+        point = geography_point(latitude, longitude)
+        data = (
+            # Activities without a location have no distance to the point
+            query.filter(Activity.point_geom.isnot(None))
+            .add_columns(
+                func.ST_Distance(activity_point_geography, point).label("distance_m")
             )
+            .order_by(activity_point_geography.op("<->")(point), Activity.id)
+            .limit(limit)
+            .all()
         )
 
-        data = query.all()
-
         return_data = [
             ActivitySearchResultDTO(
                 id=item.id,
@@ -113,13 +232,14 @@ def search_activities_by_location(
                 createdAt=item.created_at.strftime("%Y-%m-%d %H:%M:%S"),
                 updatedAt=item.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
                 address=item.address,
+                distance_m=round(distance_m, 1),
             )
-            for item in data
+            for item, distance_m in data
         ]
 
         return return_data
-    except Exception as e:
-        print(f"Error searching activities by location: {e}")
+    except Exception:
+        logger.exception("Error searching nearest activities")
         return []
 
 
@@ -146,72 +266,67 @@ def get_activity_by_id(
         )
 
         return return_data, 200, "Activity retrieved successfully"
-    except Exception as e:
-        print(f"Error retrieving activity: {e}")
+    except Exception:
+        logger.exception("Error retrieving activity")
         return None, 500, str(e)
 
 
 def create_activity(
     db: Session, data: ActivityCreateDTO, user_id: int
 ) -> tuple[int, int, str]:
-    try:
-        hero_image_data = None
-        if data.hero_image != None:
-            hero_image_data = Image(
-                name=data.hero_image.filename,
-                filepath=uuid.uuid4().hex.replace("-", "") + data.hero_image.filename,
+    with StagedUploads() as uploads:
+        try:
+            hero_filepath = None
+            if data.hero_image != None:
+                hero_filepath = uploads.stage(data.hero_image)
+            filepaths = [uploads.stage(image) for image in data.files or []]
+
+            hero_image_data = None
+            if hero_filepath != None:
+                hero_image_data = Image(
+                    name=data.hero_image.filename,
+                    filepath=hero_filepath,
+                )
+                db.add(hero_image_data)
+                db.flush()
+
+            activity_data = Activity(
+                name=data.name,
+                type=data.type,
+                description=data.description,
+                address=data.address,
+                created_by=user_id,
+                updated_by=user_id,
+                booking_url=data.booking_url,
+                hero_image_id=hero_image_data.id if hero_image_data else None,
+                latitude=data.latitude,
+                longitude=data.longitude,
+                created_at=datetime.datetime.now(datetime.timezone.utc),
+                updated_at=datetime.datetime.now(datetime.timezone.utc),
+                point_geom=f"SRID=4326;POINT({data.longitude} {data.latitude})",
             )
-            db.add(hero_image_data)
+            db.add(activity_data)
             db.flush()
 
-            fileSavePath = f"uploads/{hero_image_data.filepath}"
-            with open(fileSavePath, "wb") as f:
-                f.write(data.hero_image.file.read())
-
-        activity_data = Activity(
-            name=data.name,
-            type=data.type,
-            description=data.description,
-            address=data.address,
-            created_by=user_id,
-            updated_by=user_id,
-            booking_url=data.booking_url,
-            hero_image_id=hero_image_data.id if hero_image_data else None,
-            latitude=data.latitude,
-            longitude=data.longitude,
-            created_at=datetime.datetime.now(datetime.timezone.utc),
-            updated_at=datetime.datetime.now(datetime.timezone.utc),
-            point_geom=f"SRID=4326;POINT({data.longitude} {data.latitude})",
-        )
-        db.add(activity_data)
-        db.flush()
-
-        for image in data.files:
-            image_data = Image(
-                name=image.filename,
-                filepath=uuid.uuid4().hex.replace("-", "") + image.filename,
+            insert_activity_images(
+                db,
+                activity_data.id,
+                [
+                    (image.filename, filepath)
+                    for image, filepath in zip(data.files or [], filepaths)
+                ],
             )
-            db.add(image_data)
-            db.flush()
 
-            activity_image_data = ActivityImage(
-                image_id=image_data.id,
-                activity_id=activity_data.id,
-            )
-            db.add(activity_image_data)
-            db.flush()
-
-            fileSavePath = f"uploads/{image_data.filepath}"
-            with open(fileSavePath, "wb") as f:
-                f.write(image.file.read())
-
-        db.commit()
+            db.commit()
+            uploads.publish()
 
-        return activity_data.id, 201, "Activity created successfully"
-    except Exception as e:
-        db.rollback()
-        print(f"Error creating activity: {e}")
-        return None, 500, str(e)
+            return activity_data.id, 201, "Activity created successfully"
+        except UploadTooLarge as e:
+            return None, 413, str(e)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Error creating activity")
+            return None, 500, str(e)
 
 
 def edit_activity(
@@ -236,7 +351,7 @@ def edit_activity(
         return True, 200, "Activity updated successfully"
     except Exception as e:
         db.rollback()
-        print(f"Error updating activity: {e}")
+        logger.exception("Error updating activity")
         return False, 500, str(e)
 
 
@@ -259,5 +374,5 @@ def delete_activity_by_id(db: Session, activity_id: int) -> tuple[bool, int, str
         return True, 200, "Activity deleted successfully"
     except Exception as e:
         db.rollback()
-        print(f"Error deleting activity: {e}")
+        logger.exception("Error deleting activity")
         return False, 500, str(e)
@@ -1,75 +1,93 @@
+import logging
 import os
-import uuid
 from fastapi import UploadFile
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
 
 from app.models.db.models import Activity, ActivityImage, Image
+from app.services.image_variants import delete_variants
+from app.services.upload_storage import StagedUploads, UploadTooLarge
+
+logger = logging.getLogger(__name__)
+
+
+def insert_activity_images(
+    db: Session, activity_id: int, images: list[tuple[str, str]]
+) -> list[int]:
+    """
+    Insert an Image for each (name, filepath) and link them all to the activity.
+    One statement for the images and one for the links, however many images there are.
+    Returns the image ids in the order of `images`.
+    """
+    if not images:
+        return []
+
+    image_ids = db.scalars(
+        insert(Image).returning(Image.id, sort_by_parameter_order=True),
+        [{"name": name, "filepath": filepath} for name, filepath in images],
+    ).all()
+    db.execute(
+        insert(ActivityImage),
+        [{"image_id": image_id, "activity_id": activity_id} for image_id in image_ids],
+    )
+    return image_ids
 
 
 def set_hero_image_for_activity(
     db: Session, activity_id: int, file: UploadFile
 ) -> tuple[bool, int, str]:
-    try:
+    with StagedUploads() as uploads:
+        try:
+            filepath = uploads.stage(file)
 
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            return None, 404, "Activity not found"
+            activity = db.query(Activity).filter(Activity.id == activity_id).first()
+            if not activity:
+                return None, 404, "Activity not found"
 
-        image_data = Image(
-            name=file.filename,
-            filepath=uuid.uuid4().hex.replace("-", "") + file.filename,
-        )
-        db.add(image_data)
-        db.flush()
-
-        fileSavePath = f"uploads/{image_data.filepath}"
-        with open(fileSavePath, "wb") as f:
-            f.write(file.file.read())
+            image_data = Image(name=file.filename, filepath=filepath)
+            db.add(image_data)
+            db.flush()
 
-        activity.hero_image_id = image_data.id
-        db.commit()
+            activity.hero_image_id = image_data.id
+            db.commit()
+            uploads.publish()
 
-        return True, 201, "upload successful"
-    except Exception as e:
-        db.rollback()
-        print(f"Failed to upload hero image: {e}")
-        return None, 500, str(e)
+            return True, 201, "upload successful"
+        except UploadTooLarge as e:
+            return None, 413, str(e)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Failed to upload hero image")
+            return None, 500, str(e)
 
 
 def add_images_for_activity(
     db: Session, activity_id: int, files: list[UploadFile]
 ) -> tuple[bool, int, str]:
-    try:
-        activity = db.query(Activity).filter(Activity.id == activity_id).first()
-        if not activity:
-            return None, 404, "Activity not found"
-
-        for file in files:
-            image_data = Image(
-                name=file.filename,
-                filepath=uuid.uuid4().hex.replace("-", "") + file.filename,
+    with StagedUploads() as uploads:
+        try:
+            filepaths = [uploads.stage(file) for file in files]
+
+            activity = db.query(Activity).filter(Activity.id == activity_id).first()
+            if not activity:
+                return None, 404, "Activity not found"
+
+            insert_activity_images(
+                db,
+                activity_id,
+                [(file.filename, filepath) for file, filepath in zip(files, filepaths)],
             )
-            db.add(image_data)
-            db.flush()
 
-            activity_image_data = ActivityImage(
-                image_id=image_data.id,
-                activity_id=activity_id,
-            )
-            db.add(activity_image_data)
-            db.flush()
+            db.commit()
+            uploads.publish()
 
-            fileSavePath = f"uploads/{image_data.filepath}"
-            with open(fileSavePath, "wb") as f:
-                f.write(file.file.read())
-
-        db.commit()
-
-        return True, 201, "upload successful"
-    except Exception as e:
-        db.rollback()
-        print(f"Failed to upload images: {e}")
-        return None, 500, str(e)
+            return True, 201, "upload successful"
+        except UploadTooLarge as e:
+            return None, 413, str(e)
+        except Exception as e:
+            db.rollback()
+            logger.exception("Failed to upload images")
+            return None, 500, str(e)
 
 
 def get_image_ids_for_activity(
@@ -92,7 +110,7 @@ def get_image_ids_for_activity(
             "Images retrieved successfully",
         )
     except Exception as e:
-        print(f"Failed to retrieve images: {e}")
+        logger.exception("Failed to retrieve images")
         return None, 500, str(e)
 
 
@@ -107,9 +125,10 @@ def delete_image_by_id(db: Session, image_id: int) -> tuple[bool, int, str]:
 
         if os.path.exists(f"uploads/{image.filepath}"):
             os.remove(f"uploads/{image.filepath}")
+        delete_variants(image.filepath)
 
         return True, 200, "Image deleted successfully"
     except Exception as e:
         db.rollback()
-        print(f"Failed to delete image: {e}")
+        logger.exception("Failed to delete image")
         return None, 500, str(e)
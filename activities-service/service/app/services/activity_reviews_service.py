@@ -1,3 +1,4 @@
+import logging
 from typing import List, Optional
 import uuid
 
@@ -8,6 +9,9 @@ from app.models.dto.models import (
     ActivityReviewSearchResultDTO,
     CreateReviewDTO,
 )
+from app.pagination import InvalidCursor, paginate
+
+logger = logging.getLogger(__name__)
 
 
 def search_activity_reviews(
@@ -18,7 +22,11 @@ def search_activity_reviews(
     limit: int = 10,
     page: int = 1,
     activity_id: int = 0,
-) -> list[ActivityReviewSearchResultDTO]:
+    cursor: Optional[str] = None,
+) -> tuple[list[ActivityReviewSearchResultDTO], Optional[str]]:
+    """
+    Returns one page of reviews and the cursor of the next page, see app.pagination
+    """
     try:
         if sort_order not in ["asc", "desc"]:
             sort_order = "asc"
@@ -29,8 +37,6 @@ def search_activity_reviews(
         if page < 1:
             page = 1
 
-        offset = (page - 1) * limit
-
         query = (
             db.query(ActivityReview)
             .filter((ActivityReview.review_text.ilike(f"%{search_term}%")))
@@ -38,12 +44,21 @@ def search_activity_reviews(
         )
 
         if len(sort_field) > 0:
-            if sort_order == "asc":
-                query = query.order_by(getattr(ActivityReview, sort_field).asc())
-            else:
-                query = query.order_by(getattr(ActivityReview, sort_field).desc())
-
-        data = query.offset(offset).limit(limit).all()
+            sort_column = getattr(ActivityReview, sort_field)
+            descending = sort_order == "desc"
+        else:
+            sort_field, sort_column, descending = "id", ActivityReview.id, False
+
+        data, next_cursor = paginate(
+            query,
+            sort_field,
+            sort_column,
+            ActivityReview.id,
+            descending,
+            limit,
+            page,
+            cursor,
+        )
 
         return_data = [
             ActivityReviewSearchResultDTO(
@@ -57,10 +72,12 @@ def search_activity_reviews(
             for item in data
         ]
 
-        return return_data
-    except Exception as e:
-        print(f"Error searching activity reviews: {e}")
-        return []
+        return return_data, next_cursor
+    except InvalidCursor:
+        raise
+    except Exception:
+        logger.exception("Error searching activity reviews")
+        return [], None
 
 
 def create_activity_review(
@@ -87,7 +104,7 @@ def create_activity_review(
         return insert_data.id, 201, "Review created successfully"
     except Exception as e:
         db.rollback()
-        print(f"Error creating review: {e}")
+        logger.exception("Error creating review")
         return None, 500, str(e)
 
 
@@ -105,5 +122,5 @@ def delete_activity_review_by_id(db: Session, review_id: int) -> tuple[bool, int
         return True, 200, "Review deleted successfully"
     except Exception as e:
         db.rollback()
-        print(f"Error deleting review: {e}")
+        logger.exception("Error deleting review")
         return False, 500, str(e)
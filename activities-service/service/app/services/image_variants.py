@@ -0,0 +1,115 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Optional
+
+from PIL import Image as PILImage, ImageOps, UnidentifiedImageError
+
+from app.services.upload_storage import UPLOAD_DIR
+
+logger = logging.getLogger(__name__)
+
+# Widths variants are generated at, a requested width is rounded up to the next one
+VARIANT_WIDTHS = (160, 320, 640, 1280)
+VARIANT_DIR = os.path.join(UPLOAD_DIR, "variants")
+VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", "80"))
+# Larger originals are served as they are, decoding them could exhaust the memory
+IMAGE_MAX_PIXELS = int(os.getenv("IMAGE_MAX_PIXELS", "40000000"))
+
+# Pillow raises DecompressionBombError above twice this, and only warns above it
+PILImage.MAX_IMAGE_PIXELS = IMAGE_MAX_PIXELS
+
+MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg"}
+
+# Uploaded files are never modified, so variants and originals can be cached for good
+CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+def variant_width(requested: int) -> int:
+    for width in VARIANT_WIDTHS:
+        if width >= requested:
+            return width
+    return VARIANT_WIDTHS[-1]
+
+
+def variant_format(accept: Optional[str]) -> str:
+    """WebP for clients that accept it, JPEG otherwise"""
+    return "webp" if accept and "image/webp" in accept else "jpeg"
+
+
+def variant_path(filepath: str, width: int, format: str) -> str:
+    return os.path.join(VARIANT_DIR, str(width), f"{filepath}.{format}")
+
+
+def etag(
+    filepath: str, width: Optional[int] = None, format: Optional[str] = None
+) -> str:
+    key = f"{filepath}:{width}:{format}"
+    return f'"{hashlib.sha1(key.encode("utf-8")).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], current_etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return current_etag in tags
+
+
+def get_or_create_variant(filepath: str, width: int, format: str) -> Optional[str]:
+    """
+    Path of the variant of uploads/`filepath` resized to `width` in `format`, generated
+    on first use and kept on disk. Images narrower than `width` are not enlarged.
+    Returns None when the original is missing, cannot be read as an image or has more
+    than IMAGE_MAX_PIXELS pixels.
+    """
+    path = variant_path(filepath, width, format)
+    if os.path.exists(path):
+        return path
+
+    original = os.path.join(UPLOAD_DIR, filepath)
+    if not os.path.exists(original):
+        return None
+
+    try:
+        with PILImage.open(original) as image:
+            # Only the header has been read, refuse before the pixels are decoded
+            if image.width * image.height > IMAGE_MAX_PIXELS:
+                raise PILImage.DecompressionBombError(
+                    f"{image.width}x{image.height} image exceeds {IMAGE_MAX_PIXELS} pixels"
+                )
+            image = ImageOps.exif_transpose(image)
+            image.thumbnail((width, image.height))
+            if format == "jpeg" and image.mode not in ("RGB", "L"):
+                image = image.convert("RGB")
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                dir=os.path.dirname(path), prefix=".", suffix=".part"
+            )
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    image.save(f, format=format.upper(), quality=VARIANT_QUALITY)
+                # Concurrent requests for the same variant each write their own file,
+                # the last rename wins and readers never see a partial image
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+    except (PILImage.DecompressionBombError, UnidentifiedImageError, OSError):
+        logger.warning(
+            "Could not create %spx variant of %s", width, filepath, exc_info=True
+        )
+        return None
+
+    return path
+
+
+def delete_variants(filepath: str):
+    for width in VARIANT_WIDTHS:
+        for format in MEDIA_TYPES:
+            path = variant_path(filepath, width, format)
+            if os.path.exists(path):
+                os.remove(path)
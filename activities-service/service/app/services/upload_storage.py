@@ -0,0 +1,81 @@
+import logging
+import os
+import tempfile
+import uuid
+from typing import Optional
+
+from fastapi import UploadFile
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_DIR = "uploads"
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Largest accepted image in bytes, 0 for no limit
+MAX_UPLOAD_SIZE = int(os.getenv("MAX_UPLOAD_SIZE", "0"))
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+class StagedUploads:
+    """
+    Uploaded files written to temporary files next to their final location.
+    Stage the files before the database work, call `publish` after the commit to rename
+    them into place, anything not published is deleted when the context exits.
+
+        with StagedUploads() as uploads:
+            filepath = uploads.stage(file)
+            ...
+            db.commit()
+            uploads.publish()
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = MAX_UPLOAD_SIZE if max_size is None else max_size
+        # (temporary path, filepath relative to UPLOAD_DIR)
+        self._staged: list[tuple[str, str]] = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.discard()
+
+    def stage(self, file: UploadFile) -> str:
+        """
+        Copy the upload to a temporary file in chunks and return the filepath it will be
+        published under. Raises UploadTooLarge past `max_size` bytes.
+        """
+        filepath = uuid.uuid4().hex + file.filename
+        fd, temp_path = tempfile.mkstemp(dir=UPLOAD_DIR, prefix=".", suffix=".part")
+        try:
+            size = 0
+            with os.fdopen(fd, "wb") as f:
+                while chunk := file.file.read(UPLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if self.max_size and size > self.max_size:
+                        raise UploadTooLarge(
+                            f"{file.filename} is larger than {self.max_size} bytes"
+                        )
+                    f.write(chunk)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+        self._staged.append((temp_path, filepath))
+        return filepath
+
+    def publish(self):
+        while self._staged:
+            temp_path, filepath = self._staged.pop(0)
+            # Same directory, so the file appears complete or not at all
+            os.replace(temp_path, os.path.join(UPLOAD_DIR, filepath))
+
+    def discard(self):
+        for temp_path, _ in self._staged:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                logger.warning("Could not remove staged upload %s", temp_path)
+        self._staged.clear()
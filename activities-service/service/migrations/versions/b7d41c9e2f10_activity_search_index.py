@@ -0,0 +1,41 @@
+"""activity full text search index
+
+Revision ID: b7d41c9e2f10
+Revises: a320a123736c
+Create Date: 2026-10-18 19:40:12.381204
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d41c9e2f10"
+down_revision: Union[str, None] = "a320a123736c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Must stay the same expression as activity_search_document in app.models.db.models
+    op.create_index(
+        "ix_activities_search_document",
+        "activities",
+        [
+            sa.text(
+                "to_tsvector('simple'::regconfig, "
+                "coalesce(name, '') || ' ' || coalesce(description, ''))"
+            )
+        ],
+        unique=False,
+        postgresql_using="gin",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_activities_search_document", table_name="activities")
@@ -0,0 +1,36 @@
+"""activity location geography index
+
+Revision ID: c3e8a51f7d24
+Revises: b7d41c9e2f10
+Create Date: 2026-10-18 20:52:47.104683
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c3e8a51f7d24"
+down_revision: Union[str, None] = "b7d41c9e2f10"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Must stay the same expression as activity_point_geography in app.models.db.models
+    op.create_index(
+        "ix_activities_point_geography",
+        "activities",
+        [sa.text("CAST(point_geom AS geography(POINT,4326))")],
+        unique=False,
+        postgresql_using="gist",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_activities_point_geography", table_name="activities")
@@ -0,0 +1,85 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run_level(client, path, params, concurrency, requests_per_client):
+    latencies = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        for _ in range(requests_per_client):
+            started = time.perf_counter()
+            response = await client.get(path, params=params)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+async def benchmark(args):
+    headers = {}
+    if args.api_key:
+        headers["X-API-KEY"] = args.api_key
+    if args.token:
+        headers["Authorization"] = f"Token {args.token}"
+
+    params = dict(param.split("=", 1) for param in args.param)
+    limits = httpx.Limits(max_connections=max(args.concurrency))
+
+    async with httpx.AsyncClient(
+        base_url=args.url, headers=headers, limits=limits, timeout=60
+    ) as client:
+        # Warm up connections and caches before measuring
+        await run_level(client, args.path, params, 4, 5)
+
+        print(f"GET {args.url}{args.path} {params}")
+        print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8}")
+        for concurrency in args.concurrency:
+            result = await run_level(
+                client, args.path, params, concurrency, args.requests_per_client
+            )
+            print(
+                f"{concurrency:>8} {result['requests']:>9} {result['errors']:>7} "
+                f"{result['requests_per_second']:>9.1f} {result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f}"
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Requests per second of an activities endpoint as parallel clients increase"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/api/activities/search")
+    parser.add_argument(
+        "--param",
+        action="append",
+        default=[],
+        help="query parameter as name=value, can be repeated",
+    )
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--token", default=None)
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32]
+    )
+    parser.add_argument("--requests-per-client", type=int, default=50)
+    asyncio.run(benchmark(parser.parse_args()))
+
+
+main()
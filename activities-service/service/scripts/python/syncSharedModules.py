@@ -0,0 +1,103 @@
+import argparse
+import os
+import sys
+
+# Modules the activities service shares with other services. The files under
+# activities-service/service/app are the originals, the others are copies of them.
+SERVICE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+REPO_DIR = os.path.dirname(os.path.dirname(SERVICE_DIR))
+
+SHARED_MODULES = {
+    "app/services/auth_cache.py": [
+        "waste-management-service/app/app/services/auth_cache.py",
+        "restaurant_service_python/auth_cache.py",
+    ],
+    "app/services/access_token_verifier.py": [
+        "waste-management-service/app/app/services/access_token_verifier.py",
+    ],
+    "app/logging_config.py": [
+        "waste-management-service/app/app/logging_config.py",
+    ],
+    "app/pagination.py": [
+        "waste-management-service/app/app/pagination.py",
+    ],
+}
+
+# Lines a copy keeps different from its original, as (original line, line in the copy)
+COPY_OVERRIDES = {
+    # The waste service has always cached decisions for a shorter time
+    "waste-management-service/app/app/services/auth_cache.py": [
+        (
+            'AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))',
+            'AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "5"))',
+        ),
+        (
+            'AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "5"))',
+            'AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "2"))',
+        ),
+    ],
+}
+
+ORIGINAL_HEADER = (
+    "# Shared with other services, which hold copies of this file.\n"
+    "# Edit it here and run scripts/python/syncSharedModules.py to update the copies.\n"
+)
+COPY_HEADER = (
+    "# Copy of activities-service/service/{original}, do not edit it here.\n"
+    "# Change the original and run activities-service/service/scripts/python/syncSharedModules.py.\n"
+)
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def expected_copies():
+    """(copy path, expected text) of every copy"""
+    for original, copies in SHARED_MODULES.items():
+        text = read(os.path.join(SERVICE_DIR, original))
+        if not text.startswith(ORIGINAL_HEADER):
+            sys.exit(f"{original} does not start with the shared module header")
+        body = text[len(ORIGINAL_HEADER):]
+
+        for copy in copies:
+            copy_body = body
+            for original_line, copy_line in COPY_OVERRIDES.get(copy, []):
+                if f"\n{original_line}\n" not in copy_body:
+                    sys.exit(f"{original} no longer has the line overridden in {copy}")
+                copy_body = copy_body.replace(
+                    f"\n{original_line}\n", f"\n{copy_line}\n"
+                )
+            yield copy, COPY_HEADER.format(original=original) + copy_body
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Copy the shared modules of the activities service to the other services"
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only report copies that differ from the original, exit 1 if any do",
+    )
+    args = parser.parse_args()
+
+    outdated = []
+    for copy, text in expected_copies():
+        path = os.path.join(REPO_DIR, copy)
+        if os.path.exists(path) and read(path) == text:
+            continue
+
+        outdated.append(copy)
+        if not args.check:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+    for copy in outdated:
+        print(f"{'Outdated' if args.check else 'Updated'}: {copy}")
+    if args.check and outdated:
+        sys.exit(1)
+
+
+main()
@@ -2,7 +2,10 @@ import json
 import os
 import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import event
 
+from app.models.db.models import ActivityImage
+from app.services.activity_images_service import insert_activity_images
 from tests.conftest import BASE_TEST_URL
 
 
@@ -31,6 +34,18 @@ def test_upload_hero_image___invalid_activity_id(client):
     assert response.status_code == 404
 
 
+def test_upload_hero_image___too_large(client, monkeypatch):
+    monkeypatch.setattr("app.services.upload_storage.MAX_UPLOAD_SIZE", 10)
+    hero = ("image", ("hero.jpg", load_test_file("swk_1.jpg"), "image/jpeg"))
+
+    response = client.post(
+        f"{BASE_TEST_URL}/images/activity/1/hero/upload",
+        files=[hero],
+    )
+    assert response.status_code == 413
+    assert not [name for name in os.listdir("uploads") if name.endswith(".part")]
+
+
 def test_upload_hero_image___missing_file(client):
     response = client.post(
         f"{BASE_TEST_URL}/images/activity/1/hero/upload",
@@ -94,6 +109,41 @@ def test_upload_activity_images___invalid_file_type(client):
     assert response.status_code == 422
 
 
+def _insert_counting_statements(test_db, images):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = test_db.get_bind()
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        image_ids = insert_activity_images(test_db, 1, images)
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return image_ids, len(statements)
+
+
+def test_insert_activity_images___same_statements_for_any_count(test_db):
+    one_ids, one_statements = _insert_counting_statements(
+        test_db, [("one.jpg", "one.jpg")]
+    )
+    twenty_ids, twenty_statements = _insert_counting_statements(
+        test_db, [(f"{i}.jpg", f"{i}.jpg") for i in range(20)]
+    )
+    test_db.commit()
+
+    assert one_statements == twenty_statements == 2
+    assert len(one_ids) == 1
+    assert len(twenty_ids) == 20
+    assert (
+        test_db.query(ActivityImage)
+        .filter(ActivityImage.image_id.in_(twenty_ids), ActivityImage.activity_id == 1)
+        .count()
+        == 20
+    )
+
+
 def test_get_activity_image_ids___success(client):
     file = ("images", ("test1.jpg", load_test_file("swk_1.jpg"), "image/jpeg"))
     response = client.post(
@@ -136,6 +186,61 @@ def test_get_activity_image___success(client):
     assert len(file_retrieval_response.content) > 0
 
 
+def test_get_activity_image___resized_variant(client):
+    file = ("images", ("test1.jpg", load_test_file("swk_1.jpg"), "image/jpeg"))
+    response = client.post(
+        f"{BASE_TEST_URL}/images/activity/1/upload",
+        files=[file],
+    )
+    assert response.status_code == 201
+
+    data = client.get(f"{BASE_TEST_URL}/images/activity/1").json()
+    image_id = data.get("image_ids", [])[-1]
+
+    original_response = client.get(f"{BASE_TEST_URL}/images/{image_id}")
+    variant_response = client.get(
+        f"{BASE_TEST_URL}/images/{image_id}",
+        params={"w": 320},
+        headers={"Accept": "image/webp"},
+    )
+    assert variant_response.status_code == 200
+    assert variant_response.headers["Content-Type"] == "image/webp"
+    assert len(variant_response.content) < len(original_response.content)
+
+    not_modified_response = client.get(
+        f"{BASE_TEST_URL}/images/{image_id}",
+        params={"w": 320},
+        headers={
+            "Accept": "image/webp",
+            "If-None-Match": variant_response.headers["ETag"],
+        },
+    )
+    assert not_modified_response.status_code == 304
+
+
+def test_get_activity_image___original_when_too_many_pixels(client, monkeypatch):
+    monkeypatch.setattr("app.services.image_variants.IMAGE_MAX_PIXELS", 100)
+    file = ("images", ("test1.jpg", load_test_file("swk_1.jpg"), "image/jpeg"))
+    response = client.post(
+        f"{BASE_TEST_URL}/images/activity/1/upload",
+        files=[file],
+    )
+    assert response.status_code == 201
+
+    data = client.get(f"{BASE_TEST_URL}/images/activity/1").json()
+    image_id = data.get("image_ids", [])[-1]
+
+    original_response = client.get(f"{BASE_TEST_URL}/images/{image_id}")
+    variant_response = client.get(
+        f"{BASE_TEST_URL}/images/{image_id}",
+        params={"w": 320},
+        headers={"Accept": "image/webp"},
+    )
+    assert variant_response.status_code == 200
+    assert variant_response.headers["Content-Type"] == "image/jpeg"
+    assert variant_response.content == original_response.content
+
+
 def test_delete_activity_image___success(client):
     file = ("images", ("test1.jpg", load_test_file("swk_1.jpg"), "image/jpeg"))
     response = client.post(
@@ -1,8 +1,11 @@
+import datetime
 import json
 import pytest
 from fastapi.testclient import TestClient
 
+from app.models.db.models import Activity
 from app.models.enums.enums import ActivityType
+from app.pagination import NEXT_CURSOR_HEADER
 from tests.conftest import BASE_TEST_URL
 
 
@@ -124,6 +127,160 @@ def test_get_activities___success_no_item_with_category(client):
     assert len(data) == 0
 
 
+def _fetch_all_pages(client, params):
+    """Follow the next page cursors, returning the ids of every page in order"""
+    ids = []
+    cursor = None
+    while True:
+        response = client.get(
+            f"{BASE_TEST_URL}/search", params={**params, "cursor": cursor}
+        )
+        assert response.status_code == 200
+        ids.extend(item["id"] for item in response.json())
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if not cursor:
+            return ids
+
+
+def test_get_activities___cursor_pages(client):
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={"sort_field": "id", "sort_order": "asc", "limit": 1},
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [1]
+
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={
+            "sort_field": "id",
+            "sort_order": "asc",
+            "limit": 1,
+            "cursor": response.headers[NEXT_CURSOR_HEADER],
+        },
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [2]
+    assert NEXT_CURSOR_HEADER not in response.headers
+
+
+def test_get_activities___cursor_keeps_tied_sort_values(client, test_db):
+    created_at = datetime.datetime(2025, 1, 1)
+    test_db.add_all(
+        [
+            Activity(
+                type=ActivityType.FESTIVAL,
+                name=f"Festival {i}",
+                description="Same day",
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            for i in range(3, 6)
+        ]
+    )
+    test_db.commit()
+
+    ids = _fetch_all_pages(
+        client, {"sort_field": "created_at", "sort_order": "asc", "limit": 1}
+    )
+    assert ids[:3] == [3, 4, 5]
+    assert sorted(ids) == [1, 2, 3, 4, 5]
+
+
+def test_get_activities___cursor_keeps_tied_relevance(client, test_db):
+    now = datetime.datetime.now()
+    # Same text, so every activity has the same rank
+    test_db.add_all(
+        [
+            Activity(
+                type=ActivityType.FESTIVAL,
+                name="Lantern Walk",
+                description="Lantern walk along the beach",
+                created_at=now,
+                updated_at=now,
+            )
+            for _ in range(3)
+        ]
+    )
+    test_db.commit()
+
+    ids = _fetch_all_pages(client, {"search_term": "lantern", "limit": 1})
+    assert ids == [5, 4, 3]
+
+
+def _add_lantern_activities(test_db):
+    now = datetime.datetime.now()
+    test_db.add_all(
+        [
+            Activity(
+                id=3,
+                type=ActivityType.FESTIVAL,
+                name="Lantern Parade",
+                description="Lantern parade along the beach, bring a lantern",
+                created_at=now,
+                updated_at=now,
+            ),
+            Activity(
+                id=4,
+                type=ActivityType.RECREATIONAL,
+                name="Harbour Market",
+                description="Crafts, food and a lantern stall",
+                created_at=now,
+                updated_at=now,
+            ),
+        ]
+    )
+    test_db.commit()
+
+
+def test_get_activities___search_term_most_relevant_first(client, test_db):
+    _add_lantern_activities(test_db)
+
+    response = client.get(f"{BASE_TEST_URL}/search", params={"search_term": "lantern"})
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [3, 4]
+
+
+def test_get_activities___sort_by_relevance(client, test_db):
+    _add_lantern_activities(test_db)
+
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={"search_term": "lantern", "sort_field": "relevance"},
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [3, 4]
+
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={"search_term": "lantern", "sort_field": "id", "sort_order": "desc"},
+    )
+    assert response.status_code == 200
+    assert [item["id"] for item in response.json()] == [4, 3]
+
+
+def test_get_activities___invalid_cursor(client):
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={"sort_field": "id", "limit": 1, "cursor": "not-a-cursor"},
+    )
+    assert response.status_code == 400
+
+
+def test_get_activities___cursor_for_another_sort_order(client):
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={"sort_field": "id", "sort_order": "asc", "limit": 1},
+    )
+    cursor = response.headers[NEXT_CURSOR_HEADER]
+
+    response = client.get(
+        f"{BASE_TEST_URL}/search",
+        params={"sort_field": "id", "sort_order": "desc", "limit": 1, "cursor": cursor},
+    )
+    assert response.status_code == 400
+
+
 def test_get_activities_by_location___success(client):
     response = client.get(
         f"{BASE_TEST_URL}/search/location",
@@ -199,6 +356,39 @@ def test_get_activities_by_location___success_larger_radius(client):
     assert len(data) == 2
 
 
+def test_get_activities_by_location___nearest_first_with_limit(client):
+    response = client.get(
+        f"{BASE_TEST_URL}/search/location",
+        params={
+            "latitude": -22.54742520993337,
+            "longitude": 17.076575094549124,
+            "radius": 10000,
+            "search_term": "",
+            "categories": None,
+            "limit": 1,
+        },
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) == 1
+    assert data[0]["name"] == "Concert 1"
+
+
+@pytest.mark.parametrize("limit", [0, -1, 501])
+def test_get_activities_by_location___invalid_limit(client, limit):
+    response = client.get(
+        f"{BASE_TEST_URL}/search/location",
+        params={
+            "latitude": -22.592063343286743,
+            "longitude": 17.080047073592386,
+            "limit": limit,
+        },
+    )
+    assert response.status_code == 422
+
+
 def test_get_activities_by_location___success_no_items(client):
     response = client.get(
         f"{BASE_TEST_URL}/search/location",
@@ -217,6 +407,70 @@ def test_get_activities_by_location___success_no_items(client):
     assert len(data) == 0
 
 
+def test_get_nearest_activities___success(client):
+    response = client.get(
+        f"{BASE_TEST_URL}/search/nearest",
+        params={
+            "latitude": -22.54742520993337,
+            "longitude": 17.076575094549124,
+            "limit": 20,
+        },
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) == 2
+    assert data[0]["name"] == "Concert 1"
+    assert data[0]["distance_m"] < 1
+    assert data[1]["distance_m"] > data[0]["distance_m"]
+
+
+def test_get_nearest_activities___success_with_category(client):
+    response = client.get(
+        f"{BASE_TEST_URL}/search/nearest",
+        params={
+            "latitude": -22.54742520993337,
+            "longitude": 17.076575094549124,
+            "categories": f"{ActivityType.FESTIVAL}",
+        },
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert isinstance(data, list)
+    assert len(data) == 1
+    assert data[0]["name"] == "Festival 1"
+
+
+def test_get_nearest_activities___skips_activities_without_location(
+    client, test_db
+):
+    now = datetime.datetime.now()
+    test_db.add(
+        Activity(
+            type=ActivityType.FESTIVAL,
+            name="Festival 3",
+            description="No location yet",
+            created_at=now,
+            updated_at=now,
+        )
+    )
+    test_db.commit()
+
+    response = client.get(
+        f"{BASE_TEST_URL}/search/nearest",
+        params={
+            "latitude": -22.54742520993337,
+            "longitude": 17.076575094549124,
+        },
+    )
+    assert response.status_code == 200
+
+    data = response.json()
+    assert [item["id"] for item in data] == [2, 1]
+
+
 def test_get_actitity_by_id___success(client):
     response = client.get(f"{BASE_TEST_URL}/1")
     assert response.status_code == 200
@@ -0,0 +1,224 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from app.services import auth_service
+from app.services.auth_cache import (
+    AuthDecisionCache,
+    auth_decision_cache,
+    credential_digest,
+)
+
+RESOURCE = "activities-services"
+SUB_RESOURCE = "fetch-activities"
+# How long the mock auth service takes to answer
+AUTH_LATENCY = 0.1
+
+
+@pytest.fixture
+def auth_calls():
+    return []
+
+
+@pytest.fixture
+def auth_client(auth_calls, monkeypatch):
+    """Answers auth service calls from a mock transport and records them in auth_calls"""
+
+    async def handler(request):
+        auth_calls.append(request)
+        await asyncio.sleep(AUTH_LATENCY)
+        if request.headers.get("x-api-key") == "unreachable":
+            raise httpx.ConnectError("Auth service is down")
+        if request.headers.get("x-api-key") == "denied":
+            return httpx.Response(403, json={"error": "Permission denied"})
+        if request.headers.get("x-api-key") == "failing":
+            return httpx.Response(500, json={})
+        return httpx.Response(
+            200,
+            json={"status": "authorised", "user": {"id": 1, "email": "a@a.com"}},
+        )
+
+    monkeypatch.setattr(auth_service, "AUTH_SERVICE_URL", "http://auth")
+    auth_decision_cache.clear()
+    yield httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    auth_decision_cache.clear()
+
+
+def make_request(method="GET", headers=None):
+    return Request(
+        {
+            "type": "http",
+            "method": method,
+            "scheme": "http",
+            "server": ("testserver", 80),
+            "path": "/api/activities/search",
+            "query_string": b"",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+        }
+    )
+
+
+def authenticate(client, headers, method="GET"):
+    dependency = auth_service.authenticate_request(RESOURCE, SUB_RESOURCE, "search")
+    request = make_request(method, headers)
+    return asyncio.run(dependency(request, override_value=None, client=client))
+
+
+def test_authenticate_request___checks_run_concurrently(auth_client, auth_calls):
+    started = time.perf_counter()
+    result = authenticate(
+        auth_client, {"X-API-KEY": "key", "Authorization": "Token token"}
+    )
+    elapsed = time.perf_counter() - started
+
+    assert len(auth_calls) == 2
+    assert result["app"]["status"] == "authorised"
+    assert result["user"]["user"]["id"] == 1
+    # Sequential checks would take at least twice the latency
+    assert elapsed < 2 * AUTH_LATENCY
+
+
+def test_authenticate_request___user_denial_is_403(auth_client):
+    with pytest.raises(HTTPException) as e:
+        authenticate(auth_client, {"X-API-KEY": "denied", "Authorization": "Token t"})
+    assert e.value.status_code == 403
+
+
+def test_authenticate_request___no_credentials_is_401(auth_client, auth_calls):
+    with pytest.raises(HTTPException) as e:
+        authenticate(auth_client, {})
+
+    assert e.value.status_code == 401
+    assert auth_calls == []
+
+
+def test_check_user_permission___concurrent_checks_share_one_call(
+    auth_client, auth_calls
+):
+    async def burst():
+        return await asyncio.gather(
+            *[
+                auth_service.check_user_permission(
+                    auth_client, "token", "key", RESOURCE, SUB_RESOURCE
+                )
+                for _ in range(50)
+            ]
+        )
+
+    results = asyncio.run(burst())
+
+    assert len(auth_calls) == 1
+    assert all(result["user"]["id"] == 1 for result in results)
+
+
+def test_check_user_permission___denials_are_cached(auth_client, auth_calls):
+    async def check():
+        with pytest.raises(HTTPException) as e:
+            await auth_service.check_user_permission(
+                auth_client, "token", "denied", RESOURCE, SUB_RESOURCE
+            )
+        return e.value
+
+    for _ in range(3):
+        assert asyncio.run(check()).status_code == 403
+
+    assert len(auth_calls) == 1
+
+
+def test_check_user_permission___errors_are_not_cached(auth_client, auth_calls):
+    for _ in range(2):
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(
+                auth_service.check_user_permission(
+                    auth_client, "token", "failing", RESOURCE, SUB_RESOURCE
+                )
+            )
+        assert e.value.status_code == 401
+
+    assert len(auth_calls) == 2
+
+
+def test_check_user_permission___stale_decision_only_serves_reads(
+    auth_client, monkeypatch
+):
+    monkeypatch.setattr(auth_decision_cache, "ttl", 0.01)
+    monkeypatch.setattr(auth_decision_cache, "max_staleness", 60)
+    cache_key = (
+        "user",
+        credential_digest("token"),
+        credential_digest("unreachable"),
+        RESOURCE,
+        SUB_RESOURCE,
+    )
+    auth_decision_cache.set(cache_key, 200, {"status": "authorised"})
+
+    async def check(allow_stale):
+        await asyncio.sleep(0.02)
+        return await auth_service.check_user_permission(
+            auth_client, "token", "unreachable", RESOURCE, SUB_RESOURCE, allow_stale
+        )
+
+    assert asyncio.run(check(allow_stale=True)) == {"status": "authorised"}
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(check(allow_stale=False))
+    assert e.value.status_code == 401
+
+
+def test_auth_decision_cache___ttls(monkeypatch):
+    cache = AuthDecisionCache(ttl=30, negative_ttl=5, max_entries=10)
+    now = time.monotonic()
+    cache.set("allowed", 200, {})
+    cache.set("denied", 403, {})
+    cache.set("unauthenticated", 401, {})
+    cache.set("error", 500, {})
+
+    async def fetch():
+        return 200, {"fetched": True}
+
+    def get(key):
+        return asyncio.run(cache.get_or_fetch(key, fetch))
+
+    assert get("allowed") == (200, {})
+    assert get("denied") == (403, {})
+    assert get("unauthenticated") == (401, {})
+    assert get("error") == (200, {"fetched": True})
+
+    # Denials expire after negative_ttl, allowed decisions after ttl
+    monkeypatch.setattr("app.services.auth_cache.time.monotonic", lambda: now + 10)
+    assert get("allowed") == (200, {})
+    assert get("denied") == (200, {"fetched": True})
+    monkeypatch.setattr("app.services.auth_cache.time.monotonic", lambda: now + 31)
+    assert get("allowed") == (200, {"fetched": True})
+
+
+def test_auth_decision_cache___bounded():
+    cache = AuthDecisionCache(ttl=30, negative_ttl=5, max_entries=2)
+    for key in ["a", "b", "c"]:
+        cache.set(key, 200, {})
+
+    assert cache.stats()["entries"] == 2
+    assert list(cache._entries) == ["b", "c"]
+
+
+def test_auth_metrics(client, auth_client):
+    asyncio.run(
+        auth_service.check_user_permission(
+            auth_client, "token", "key", RESOURCE, SUB_RESOURCE
+        )
+    )
+
+    response = client.get("/metrics/auth")
+
+    assert response.status_code == 200
+    data = response.json()
+    assert data["misses"] == 1
+    assert data["entries"] == 1
+    assert data["upstream"]["calls"] == 1
+    assert data["upstream"]["p50_ms"] >= AUTH_LATENCY * 1000
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from application.models import Application
+
+
+class Command(BaseCommand):
+    help = (
+        "List active applications whose API key still uses the legacy make_password hash. "
+        "Every unknown API key is checked against each of them with a slow hash, so once the "
+        "remaining applications have been issued new keys, retire them with --deactivate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--deactivate', action='store_true', help="Deactivate the listed applications")
+
+    def handle(self, *args, **options):
+        legacy_applications = Application.objects.filter(key_prefix__isnull=True, is_active=True).order_by('name')
+
+        for application in legacy_applications:
+            self.stdout.write(f"{application.id} {application.name} (last updated {application.updated_at:%Y-%m-%d})")
+
+        if not options['deactivate']:
+            self.stdout.write(f"{len(legacy_applications)} applications with legacy API keys")
+            return
+
+        # One save per application so the permission cache and policy version signals fire
+        for application in legacy_applications:
+            application.is_active = False
+            application.save(update_fields=['is_active', 'updated_at'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deactivated {len(legacy_applications)} applications with legacy API keys"
+        ))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='key_prefix',
+            field=models.CharField(blank=True, db_index=True, max_length=8, null=True),
+        ),
+    ]
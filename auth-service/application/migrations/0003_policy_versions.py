@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:13
+
+from django.db import migrations, models
+
+
+def create_policy_version(apps, schema_editor):
+    PolicyVersion = apps.get_model('application', 'PolicyVersion')
+    PolicyVersion.objects.get_or_create(pk=1, defaults={'version': 0})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('application', '0002_application_key_prefix'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(db_index=True)),
+                ('model', models.CharField(max_length=100)),
+                ('object_id', models.CharField(max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PolicyVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_policy_version, migrations.RunPython.noop),
+    ]
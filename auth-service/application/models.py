@@ -1,16 +1,27 @@
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 from knox.models import AuthToken
-from django.contrib.auth.hashers import make_password, check_password
+from django.contrib.auth.hashers import check_password
+import hashlib
+import hmac
+import re
 import uuid
 from django.contrib.postgres.fields import ArrayField
 
+# Number of leading characters of a plaintext API key stored in clear text
+# so that a key can be resolved with a single indexed lookup
+API_KEY_PREFIX_LENGTH = 8
+API_KEY_DIGEST_PREFIX = "hmac_sha256$"
+# Every key ever issued is uuid4().hex, only keys of that shape can match a legacy hash
+LEGACY_API_KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
 # Create your models here.
 class Application(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
     api_key = models.CharField(max_length=128, unique=True)
+    key_prefix = models.CharField(max_length=API_KEY_PREFIX_LENGTH, null=True, blank=True, db_index=True)
     api_key_expiration = models.DateTimeField()
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -23,11 +34,63 @@ class Application(models.Model):
 
     def generate_api_key(self):
         plaintext_key = uuid.uuid4().hex
-        self.api_key = make_password(plaintext_key)
+        self.key_prefix = plaintext_key[:API_KEY_PREFIX_LENGTH]
+        self.api_key = self.hash_api_key(plaintext_key)
         self.api_key_expiration = timezone.now() + timezone.timedelta(days=365*10)
         self._api_key_plain = plaintext_key
         return plaintext_key
 
+    @staticmethod
+    def hash_api_key(key):
+        """
+        Keyed digest of the plaintext API key. The key is a random 128 bit value,
+        so a fast HMAC is sufficient and avoids a slow password hash per request.
+        """
+        digest = hmac.new(
+            settings.API_KEY_HMAC_SECRET.encode("utf-8"),
+            key.encode("utf-8"),
+            hashlib.sha256,
+        ).hexdigest()
+        return f"{API_KEY_DIGEST_PREFIX}{digest}"
+
+    @classmethod
+    def get_by_api_key(cls, key):
+        """
+        Resolve an active application from a plaintext API key.
+        Keys are looked up by their indexed prefix and verified with a constant-time compare.
+        Keys issued before prefixes existed are still hashed with make_password; they are
+        checked as a fallback and upgraded to the prefixed scheme on first successful use.
+        The fallback costs one slow hash per legacy application, so it only runs for keys
+        of the issued shape, and the retire_legacy_api_keys command empties it.
+        """
+        if not key:
+            return None
+
+        candidates = cls.objects.filter(key_prefix=key[:API_KEY_PREFIX_LENGTH], is_active=True)
+        for application in candidates:
+            if application.check_api_key(key):
+                return application
+
+        if not LEGACY_API_KEY_PATTERN.fullmatch(key):
+            return None
+
+        legacy_applications = cls.objects.filter(key_prefix__isnull=True, is_active=True)
+        for application in legacy_applications:
+            if application.check_api_key(key):
+                application.upgrade_api_key(key)
+                return application
+
+        return None
+
+    def upgrade_api_key(self, key):
+        """
+        Move a legacy make_password hashed key to the prefixed HMAC scheme.
+        The plaintext key held by the client does not change.
+        """
+        self.key_prefix = key[:API_KEY_PREFIX_LENGTH]
+        self.api_key = self.hash_api_key(key)
+        Application.objects.filter(pk=self.pk).update(key_prefix=self.key_prefix, api_key=self.api_key)
+
     @property
     def display_key(self):
         if self._api_key_plain:
@@ -36,6 +99,8 @@ class Application(models.Model):
         return "•••••••• (Hidden for security)"
 
     def check_api_key(self, key):
+        if self.api_key.startswith(API_KEY_DIGEST_PREFIX):
+            return hmac.compare_digest(self.hash_api_key(key), self.api_key)
         return check_password(key, self.api_key)
 
 class Resource(models.Model):
@@ -74,3 +139,37 @@ class ApplicationResourcePermission(models.Model):
 
     def __str__(self):
         return f"{self.application.name} - {self.resource.name} ({self.permission})"
+
+
+class PolicyVersion(models.Model):
+    """
+    Single row counter of the authorization model version.
+    Incremented under a row lock so versions become visible in commit order.
+    """
+    version = models.BigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+
+class PolicyChange(models.Model):
+    """
+    Log of the authorization model objects changed in each version,
+    used to serve policy snapshot deltas.
+    """
+    version = models.BigIntegerField(db_index=True)
+    model = models.CharField(max_length=100)
+    object_id = models.CharField(max_length=64)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.version}: {self.model} {self.object_id}"
+
+    @classmethod
+    def record(cls, instance):
+        with transaction.atomic():
+            if not PolicyVersion.objects.filter(pk=1).update(version=models.F('version') + 1):
+                PolicyVersion.objects.create(pk=1, version=1)
+            version = PolicyVersion.current()
+            cls.objects.create(version=version, model=instance._meta.label_lower, object_id=str(instance.pk))
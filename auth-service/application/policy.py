@@ -0,0 +1,105 @@
+from .models import (
+    Application,
+    ApplicationResourcePermission,
+    PolicyChange,
+    Resource,
+    SubResource,
+)
+from user.models import UserType, UserResourcePermission
+
+
+def _resource(resource):
+    return {'id': resource.id, 'name': resource.name}
+
+
+def _sub_resource(sub_resource):
+    return {
+        'id': sub_resource.id,
+        'resource': sub_resource.resource_id,
+        'name': sub_resource.name,
+        'allow_anonymous': sub_resource.allow_anonymous,
+    }
+
+
+def _user_type(user_type):
+    return {'id': user_type.id, 'name': user_type.name}
+
+
+def _user_resource_permission(permission):
+    return {
+        'id': permission.id,
+        'user_type': permission.user_type_id,
+        'sub_resource': permission.sub_resource_id,
+        'permission': permission.permission,
+    }
+
+
+def _application(application):
+    return {
+        'id': str(application.id),
+        'name': application.name,
+        'is_active': application.is_active,
+        'api_key_expiration': application.api_key_expiration.isoformat(),
+    }
+
+
+def _application_resource_permission(permission):
+    return {
+        'id': permission.id,
+        'application': str(permission.application_id),
+        'resource': permission.resource_id,
+        'permission': permission.permission,
+    }
+
+
+# Snapshot section name, model and serialiser of every part of the authorization model
+POLICY_SECTIONS = [
+    ('resources', Resource, _resource),
+    ('sub_resources', SubResource, _sub_resource),
+    ('user_types', UserType, _user_type),
+    ('user_resource_permissions', UserResourcePermission, _user_resource_permission),
+    ('applications', Application, _application),
+    ('application_resource_permissions', ApplicationResourcePermission, _application_resource_permission),
+]
+
+POLICY_MODELS = [model for _, model, _ in POLICY_SECTIONS]
+
+
+def policy_snapshot(version):
+    """
+    The whole authorization model at `version`, as read from PolicyVersion.current().
+    Objects are read after the version, so they may already include later changes;
+    a client asking for the changes since that version receives them again.
+    """
+    snapshot = {'version': version, 'delta': False}
+
+    for section, model, serialise in POLICY_SECTIONS:
+        snapshot[section] = [serialise(obj) for obj in model.objects.order_by('pk')]
+
+    return snapshot
+
+
+def policy_delta(since, version):
+    """
+    The objects changed after version `since` up to `version`: changed objects in their
+    current state under their section and the ids of deleted objects under `deleted`.
+    """
+    delta = {'version': version, 'since': since, 'delta': True}
+    deleted = {}
+
+    changes = {}
+    rows = PolicyChange.objects.filter(version__gt=since, version__lte=version).values_list('model', 'object_id')
+    for model_label, object_id in rows:
+        changes.setdefault(model_label, set()).add(object_id)
+
+    for section, model, serialise in POLICY_SECTIONS:
+        object_ids = changes.get(model._meta.label_lower, set())
+        objects = list(model.objects.filter(pk__in=object_ids).order_by('pk')) if object_ids else []
+
+        delta[section] = [serialise(obj) for obj in objects]
+        deleted[section] = sorted(
+            model._meta.pk.to_python(object_id) for object_id in object_ids - {str(obj.pk) for obj in objects}
+        )
+
+    delta['deleted'] = deleted
+    return delta
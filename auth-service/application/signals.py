@@ -0,0 +1,29 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from authservice.cache import permission_decision_cache
+from .models import Application, Resource, SubResource, ApplicationResourcePermission, PolicyChange
+from .policy import POLICY_MODELS
+
+
+@receiver([post_save, post_delete], sender=Application)
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=SubResource)
+@receiver([post_save, post_delete], sender=ApplicationResourcePermission)
+def invalidate_permission_decisions(sender, **kwargs):
+    """
+    Resources and application permissions change rarely, drop every cached decision
+    """
+    permission_decision_cache.clear()
+
+
+def record_policy_change(sender, instance, **kwargs):
+    """
+    Version every change to the authorization model for the policy snapshot endpoint
+    """
+    PolicyChange.record(instance)
+
+
+for policy_model in POLICY_MODELS:
+    post_save.connect(record_policy_change, sender=policy_model, dispatch_uid=f'record_policy_change_{policy_model._meta.label_lower}')
+    post_delete.connect(record_policy_change, sender=policy_model, dispatch_uid=f'record_policy_delete_{policy_model._meta.label_lower}')
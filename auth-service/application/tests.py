@@ -1,3 +1,246 @@
+import uuid
+from unittest import mock
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
 from django.test import TestCase
+from django.utils import timezone
+
+from authservice.cache import permission_decision_cache
+from .models import (
+    API_KEY_DIGEST_PREFIX, Application, ApplicationResourcePermission, PolicyVersion, Resource, SubResource,
+)
+
+CHECK_APPLICATION_PERMISSION_URL = '/api/auth/application/check_application_permission/'
+POLICY_URL = '/api/auth/application/policy/'
+
+
+def create_application(name='test-app'):
+    application = Application(name=name)
+    key = application.generate_api_key()
+    application.save()
+    return application, key
+
+
+def create_legacy_application(name='legacy-app'):
+    key = uuid.uuid4().hex
+    application = Application.objects.create(
+        name=name,
+        api_key=make_password(key),
+        api_key_expiration=timezone.now() + timezone.timedelta(days=365),
+    )
+    return application, key
+
+
+class GetByAPIKeyTests(TestCase):
+    def test_prefix_hit(self):
+        application, key = create_application()
+        create_legacy_application()
+
+        with mock.patch('application.models.check_password') as check_password:
+            self.assertEqual(Application.get_by_api_key(key), application)
+        check_password.assert_not_called()
+
+    def test_legacy_key_is_upgraded_on_first_use(self):
+        application, key = create_legacy_application()
+
+        self.assertEqual(Application.get_by_api_key(key), application)
+
+        application.refresh_from_db()
+        self.assertEqual(application.key_prefix, key[:8])
+        self.assertTrue(application.api_key.startswith(API_KEY_DIGEST_PREFIX))
+
+        # Resolved through the prefix from now on
+        with mock.patch('application.models.check_password') as check_password:
+            self.assertEqual(Application.get_by_api_key(key), application)
+        check_password.assert_not_called()
+
+    def test_miss(self):
+        create_application()
+        create_legacy_application()
+
+        self.assertIsNone(Application.get_by_api_key(uuid.uuid4().hex))
+        self.assertIsNone(Application.get_by_api_key(''))
+
+    def test_miss_with_wrong_key_for_prefix(self):
+        application, key = create_application()
+
+        self.assertIsNone(Application.get_by_api_key(key[:8] + uuid.uuid4().hex[8:]))
+
+    def test_key_of_another_shape_skips_legacy_hashes(self):
+        create_legacy_application()
+
+        with mock.patch('application.models.check_password') as check_password:
+            self.assertIsNone(Application.get_by_api_key('not-a-key'))
+            self.assertIsNone(Application.get_by_api_key(uuid.uuid4().hex.upper()))
+        check_password.assert_not_called()
+
+    def test_inactive_application(self):
+        application, key = create_application()
+        application.is_active = False
+        application.save()
+
+        self.assertIsNone(Application.get_by_api_key(key))
+
+
+class RetireLegacyAPIKeysCommandTests(TestCase):
+    def test_lists_without_deactivating(self):
+        legacy_application, _ = create_legacy_application()
+
+        call_command('retire_legacy_api_keys', stdout=mock.MagicMock())
+
+        legacy_application.refresh_from_db()
+        self.assertTrue(legacy_application.is_active)
+
+    def test_deactivate(self):
+        application, _ = create_application()
+        legacy_application, legacy_key = create_legacy_application()
+
+        call_command('retire_legacy_api_keys', '--deactivate', stdout=mock.MagicMock())
+
+        legacy_application.refresh_from_db()
+        application.refresh_from_db()
+        self.assertFalse(legacy_application.is_active)
+        self.assertTrue(application.is_active)
+        self.assertIsNone(Application.get_by_api_key(legacy_key))
+
+
+class CheckApplicationPermissionTests(TestCase):
+    def setUp(self):
+        permission_decision_cache.clear()
+        self.addCleanup(permission_decision_cache.clear)
+
+        self.resource = Resource.objects.create(name='test-services')
+        self.application, self.key = create_application()
+        self.permission = ApplicationResourcePermission.objects.create(
+            application=self.application, resource=self.resource, permission=['read']
+        )
+
+    def check_application_permission(self, method='GET', key=None):
+        return self.client.post(CHECK_APPLICATION_PERMISSION_URL, headers={
+            'X-API-KEY': key or self.key, 'X-RESOURCE': self.resource.name, 'X-METHOD': method,
+        })
+
+    def test_permitted(self):
+        response = self.check_application_permission()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['permission'], 'read')
+
+    def test_insufficient_permission_is_403(self):
+        self.assertEqual(self.check_application_permission(method='POST').status_code, 403)
+
+    def test_invalid_key_is_403(self):
+        self.assertEqual(self.check_application_permission(key=uuid.uuid4().hex).status_code, 403)
+
+    def test_missing_key_is_400(self):
+        self.assertEqual(self.client.post(CHECK_APPLICATION_PERMISSION_URL).status_code, 400)
+
+    def test_repeated_check_is_served_from_cache(self):
+        self.check_application_permission()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.check_application_permission().status_code, 200)
+
+    def test_grant_invalidates_denial(self):
+        self.assertEqual(self.check_application_permission(method='POST').status_code, 403)
+
+        self.permission.permission = ['read', 'write']
+        self.permission.save()
+
+        self.assertEqual(self.check_application_permission(method='POST').status_code, 200)
+
+    def test_revoke_invalidates_decision(self):
+        self.assertEqual(self.check_application_permission().status_code, 200)
+
+        self.permission.delete()
+
+        self.assertEqual(self.check_application_permission().status_code, 403)
+
+    def test_deactivating_application_invalidates_decision(self):
+        self.assertEqual(self.check_application_permission().status_code, 200)
+
+        self.application.is_active = False
+        self.application.save()
+
+        self.assertEqual(self.check_application_permission().status_code, 403)
+
+
+class PolicySnapshotTests(TestCase):
+    def setUp(self):
+        self.application, self.key = create_application()
+        self.resource = Resource.objects.create(name='test-services')
+        self.sub_resource = SubResource.objects.create(resource=self.resource, name='private')
+
+    def get_policy(self, key=None, **params):
+        headers = {'X-API-KEY': key or self.key}
+        if 'etag' in params:
+            headers['If-None-Match'] = params.pop('etag')
+        return self.client.get(POLICY_URL, params, headers=headers)
+
+    def test_snapshot(self):
+        response = self.get_policy()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['ETag'], f'"policy-{PolicyVersion.current()}"')
+        policy = response.json()
+        self.assertFalse(policy['delta'])
+        self.assertEqual(policy['version'], PolicyVersion.current())
+        self.assertIn({'id': self.resource.id, 'name': 'test-services'}, policy['resources'])
+        self.assertIn(str(self.application.id), [application['id'] for application in policy['applications']])
+        self.assertNotIn('api_key', policy['applications'][0])
+
+    def test_unchanged_policy_is_304(self):
+        etag = self.get_policy()['ETag']
+
+        response = self.get_policy(etag=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_change_invalidates_etag(self):
+        etag = self.get_policy()['ETag']
+
+        self.sub_resource.allow_anonymous = True
+        self.sub_resource.save()
+
+        response = self.get_policy(etag=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_delta(self):
+        since = PolicyVersion.current()
+        resource_id, sub_resource_id = self.resource.id, self.sub_resource.id
+        other = Resource.objects.create(name='test-other')
+        self.sub_resource.allow_anonymous = True
+        self.sub_resource.save()
+        # Also deletes the sub resource
+        self.resource.delete()
+
+        policy = self.get_policy(since=since).json()
+
+        self.assertTrue(policy['delta'])
+        self.assertEqual(policy['since'], since)
+        self.assertEqual(policy['version'], since + 4)
+        self.assertEqual(policy['resources'], [{'id': other.id, 'name': 'test-other'}])
+        self.assertEqual(policy['sub_resources'], [])
+        self.assertEqual(policy['applications'], [])
+        self.assertEqual(policy['deleted']['resources'], [resource_id])
+        self.assertEqual(policy['deleted']['sub_resources'], [sub_resource_id])
+
+    def test_empty_delta(self):
+        since = PolicyVersion.current()
+
+        policy = self.get_policy(since=since).json()
+
+        self.assertEqual(policy['version'], since)
+        self.assertEqual(policy['resources'], [])
+        self.assertEqual(policy['deleted']['resources'], [])
+
+    def test_invalid_since_is_400(self):
+        for since in ['not-a-version', -1, PolicyVersion.current() + 1]:
+            self.assertEqual(self.get_policy(since=since).status_code, 400)
 
-# Create your tests here.
+    def test_api_key_required(self):
+        self.assertEqual(self.client.get(POLICY_URL).status_code, 400)
+        self.assertEqual(self.get_policy(key=uuid.uuid4().hex).status_code, 403)
@@ -5,12 +5,14 @@ from rest_framework import routers
 from rest_framework.urlpatterns import format_suffix_patterns
 
 # app imports
-from .views import ApplicationListView, CheckApplicationPermissionView, ValidateAPIKeyView
+from .views import ApplicationListView, CheckApplicationPermissionView, ValidateAPIKeyView, PermissionCacheStatsView, PolicySnapshotView
 
 urlpatterns = [
     path('', ApplicationListView.as_view()),
     path('check_application_permission/', CheckApplicationPermissionView.as_view()),
     path('validate', ValidateAPIKeyView.as_view()),
+    path('cache-stats/', PermissionCacheStatsView.as_view()),
+    path('policy/', PolicySnapshotView.as_view()),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
\ No newline at end of file
@@ -1,17 +1,20 @@
 
 
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 # Rest Framework Imports
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 
 # App Imports
-from .models import Application, ApplicationResourcePermission
+from .models import Application, ApplicationResourcePermission, PolicyVersion
 from .serializers import ApplicationSerializer
+from .policy import policy_snapshot, policy_delta
 
 from django.utils import timezone
 
+from authservice.cache import Decision, permission_decision_cache
+
 
 # API Documentation
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiExample, OpenApiResponse
@@ -53,6 +56,8 @@ class CheckApplicationPermissionView(APIView):
     Verify if the application has permission to access the resource.
     """
 
+    # The token is resolved by the view itself, skip the default knox authentication
+    authentication_classes = []
     permission_classes = [AllowAny]
 
     # Map HTTP methods to required permission levels
@@ -71,31 +76,36 @@ class CheckApplicationPermissionView(APIView):
             return Response({"error": "Missing API key"},
                             status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            applications = Application.objects.filter(is_active=True)
-            application = None
+        requested_resource = request.headers.get('x-resource')
+        # Default to GET if not specified
+        http_method = request.headers.get('x-method', 'GET').upper()
 
-            for app in applications:
-                if app.check_api_key(api_key):
-                    application = app
-                    break
+        decision = self.decide(api_key, requested_resource, http_method)
 
-            if not application:
-                return Response({"error": "Invalid API Key"},
-                                status=status.HTTP_403_FORBIDDEN)
+        return Response(decision.data, status=decision.status_code)
 
-            if application.api_key_expiration < timezone.now():
-                return Response({"error": "API Key has expired"},
-                                status=status.HTTP_403_FORBIDDEN)
+    def decide(self, api_key, requested_resource, http_method):
+        cache_key = ('application', Application.hash_api_key(api_key), requested_resource, http_method)
+        decision = permission_decision_cache.get(cache_key)
 
-        except Exception as e:
-            return Response({"error": str(e)},
-                            status=status.HTTP_403_FORBIDDEN
-                            )
+        if decision is None:
+            try:
+                decision = self.check_permission(api_key, requested_resource, http_method)
+            except Exception as e:
+                # Not cached, the lookup may succeed on the next request
+                return Decision({"error": str(e)}, status.HTTP_403_FORBIDDEN)
+            permission_decision_cache.set(cache_key, decision, expires_at=decision.expires_at)
 
-        requested_resource = request.headers.get('x-resource')
-        # Default to GET if not specified
-        http_method = request.headers.get('x-method', 'GET').upper()
+        return decision
+
+    def check_permission(self, api_key, requested_resource, http_method):
+        application = Application.get_by_api_key(api_key)
+
+        if not application:
+            return Decision({"error": "Invalid API Key"}, status.HTTP_403_FORBIDDEN)
+
+        if application.api_key_expiration < timezone.now():
+            return Decision({"error": "API Key has expired"}, status.HTTP_403_FORBIDDEN)
 
         # Get the required permission based on HTTP method
         required_permission = self.METHOD_TO_PERMISSION.get(http_method, 'read')
@@ -105,38 +115,216 @@ class CheckApplicationPermissionView(APIView):
                 application=application,
                 resource__name=requested_resource
             )
+        except ApplicationResourcePermission.DoesNotExist:
+            return Decision({"error": "Permission denied, resource permission not found"},
+                            status.HTTP_403_FORBIDDEN)
 
-            # Check if the application has the required permission
-            permission_hierarchy = ['read', 'write', 'admin']
-
-            # Get the highest permission the application has for this resource
-            highest_app_permission = max(
-                app_permission.permission,
-                key=lambda p: permission_hierarchy.index(p)
-            )
+        # Check if the application has the required permission
+        permission_hierarchy = ['read', 'write', 'admin']
 
-            # Check if the highest permission meets the requirement
-            print(f"Highest App Permission: {highest_app_permission}")
-            if permission_hierarchy.index(highest_app_permission) < permission_hierarchy.index(required_permission):
-                return Response({"error": "Permission denied, insufficient permissions"},
-                                status=status.HTTP_403_FORBIDDEN
-                                )
+        # Get the highest permission the application has for this resource
+        highest_app_permission = max(
+            app_permission.permission,
+            key=lambda p: permission_hierarchy.index(p)
+        )
 
-        except ApplicationResourcePermission.DoesNotExist:
-            return Response({"error": "Permission denied, resource permission not found"},
-                            status=status.HTTP_403_FORBIDDEN
-                            )
+        # Check if the highest permission meets the requirement
+        if permission_hierarchy.index(highest_app_permission) < permission_hierarchy.index(required_permission):
+            return Decision({"error": "Permission denied, insufficient permissions"},
+                            status.HTTP_403_FORBIDDEN)
 
-        return Response(
+        return Decision(
             {
                 "status": "authorised",
                 "application": application.name,
                 "resource": requested_resource,
                 "permission": highest_app_permission,
-            }, status=status.HTTP_200_OK
+            },
+            status.HTTP_200_OK,
+            expires_at=application.api_key_expiration,
         )
 
 
+class PermissionCacheStatsView(APIView):
+    """
+    Report the size and hit rate of the permission decision cache.
+    """
+
+    permission_classes = [IsAdminUser]
+
+    @extend_schema(
+        responses={200: OpenApiTypes.OBJECT},
+        description="Hit and miss counters of the in-process permission decision cache"
+    )
+    def get(self, request):
+        return Response(permission_decision_cache.stats(), status=status.HTTP_200_OK)
+
+
+class PolicySnapshotView(APIView):
+    """
+    Export the authorization model so services can hold it in memory.
+    """
+
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                name='X-API-KEY',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                description='API key of the requesting application',
+                required=True
+            ),
+            OpenApiParameter(
+                name='If-None-Match',
+                type=OpenApiTypes.STR,
+                location=OpenApiParameter.HEADER,
+                description='ETag of the snapshot the client holds',
+                required=False
+            ),
+            OpenApiParameter(
+                name='since',
+                type=OpenApiTypes.INT,
+                location=OpenApiParameter.QUERY,
+                description='Only return the changes made after this version',
+                required=False
+            )
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Policy snapshot or delta",
+                response=OpenApiTypes.OBJECT,
+                examples=[
+                    OpenApiExample(
+                        name="Snapshot",
+                        value={
+                            "version": 42,
+                            "delta": False,
+                            "resources": [{"id": 1, "name": "activities-services"}],
+                            "sub_resources": [
+                                {"id": 3, "resource": 1, "name": "fetch-activities", "allow_anonymous": True}
+                            ],
+                            "user_types": [{"id": 1, "name": "resident"}],
+                            "user_resource_permissions": [
+                                {"id": 7, "user_type": 1, "sub_resource": 3, "permission": ["read"]}
+                            ],
+                            "applications": [
+                                {
+                                    "id": "0b3c2a9e-9c1f-4c57-9e0e-1f4f0f7a9c11",
+                                    "name": "Example Application",
+                                    "is_active": True,
+                                    "api_key_expiration": "2035-01-01T00:00:00+00:00"
+                                }
+                            ],
+                            "application_resource_permissions": [
+                                {
+                                    "id": 2,
+                                    "application": "0b3c2a9e-9c1f-4c57-9e0e-1f4f0f7a9c11",
+                                    "resource": 1,
+                                    "permission": ["read", "write"]
+                                }
+                            ]
+                        }
+                    ),
+                    OpenApiExample(
+                        name="Delta",
+                        value={
+                            "version": 44,
+                            "since": 42,
+                            "delta": True,
+                            "resources": [],
+                            "sub_resources": [],
+                            "user_types": [],
+                            "user_resource_permissions": [
+                                {"id": 7, "user_type": 1, "sub_resource": 3, "permission": ["read", "write"]}
+                            ],
+                            "applications": [],
+                            "application_resource_permissions": [],
+                            "deleted": {
+                                "resources": [],
+                                "sub_resources": [],
+                                "user_types": [],
+                                "user_resource_permissions": [9],
+                                "applications": [],
+                                "application_resource_permissions": []
+                            }
+                        }
+                    )
+                ]
+            ),
+            304: OpenApiResponse(description="The policy has not changed"),
+            400: OpenApiResponse(
+                description="Missing API key or invalid version",
+                response=OpenApiTypes.OBJECT,
+                examples=[
+                    OpenApiExample(
+                        name="Invalid version",
+                        value={"error": "since must be a version returned by this endpoint"}
+                    )
+                ]
+            ),
+            403: OpenApiResponse(
+                description="Invalid or expired API key",
+                response=OpenApiTypes.OBJECT,
+                examples=[
+                    OpenApiExample(
+                        name="Invalid API key",
+                        value={"error": "Invalid API Key"}
+                    )
+                ]
+            )
+        },
+        auth=None,
+        summary="Authorization policy snapshot",
+        description="""
+        Returns the resources, sub resources, user types, user and application
+        permissions together with the policy version. The ETag is the version,
+        so a conditional GET returns 304 until the policy changes.
+        With `since=<version>` only the objects changed after that version are returned.
+        """
+    )
+    def get(self, request):
+        api_key = request.headers.get('X-API-KEY')
+
+        if not api_key:
+            return Response({"error": "Missing API key"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        application = Application.get_by_api_key(api_key)
+
+        if not application:
+            return Response({"error": "Invalid API Key"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        if application.api_key_expiration < timezone.now():
+            return Response({"error": "API Key has expired"},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        version = PolicyVersion.current()
+        etag = f'"policy-{version}"'
+        headers = {'ETag': etag, 'Cache-Control': 'no-cache'}
+
+        if etag in [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        since = request.query_params.get('since')
+        if since is None:
+            return Response(policy_snapshot(version), status=status.HTTP_200_OK, headers=headers)
+
+        try:
+            since = int(since)
+        except ValueError:
+            since = -1
+
+        if not 0 <= since <= version:
+            return Response({"error": "since must be a version returned by this endpoint"},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        return Response(policy_delta(since, version), status=status.HTTP_200_OK, headers=headers)
+
+
 class ValidateAPIKeyView(APIView):
     """
     Validate the API key and check its expiration.
@@ -228,13 +416,7 @@ class ValidateAPIKeyView(APIView):
                             )
 
         try:
-            applications = Application.objects.filter(is_active=True)
-            application = None
-
-            for app in applications:
-                if app.check_api_key(api_key):
-                    application = app
-                    break
+            application = Application.get_by_api_key(api_key)
 
             if not application:
                 return Response({"error": "Invalid API Key"},
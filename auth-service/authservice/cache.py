@@ -0,0 +1,118 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from datetime import datetime
+
+from django.conf import settings
+from django.utils import timezone
+
+
+class Decision(NamedTuple):
+    """
+    Result of a permission check as returned to the calling service.
+    expires_at caps how long the decision may be cached (token or API key expiry).
+    """
+    data: dict
+    status_code: int
+    expires_at: Optional[datetime] = None
+
+
+class TokenIdentity(NamedTuple):
+    """
+    What a knox token resolves to, enough to answer permission and validation checks
+    without loading the user.
+    """
+    user_id: int
+    email: str
+    first_name: str
+    last_name: str
+    user_type_ids: tuple
+    user_type_names: tuple
+    expiry: Optional[datetime]
+
+
+class TTLCache:
+    """
+    Thread safe in-process cache with a time to live per entry and
+    least recently used eviction once max_entries is reached.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, expires_at=None):
+        ttl = self.ttl
+        if expires_at is not None:
+            ttl = min(ttl, (expires_at - timezone.now()).total_seconds())
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_matching(self, predicate):
+        """
+        Remove every entry whose key and value satisfy predicate(key, value)
+        """
+        with self._lock:
+            stale_keys = [key for key, (_, value) in self._entries.items() if predicate(key, value)]
+            for key in stale_keys:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Permission decisions keyed on (kind, credential digest, resource, sub resource, method).
+# Entries are invalidated by the signal handlers in application.signals and user.signals.
+permission_decision_cache = TTLCache(
+    max_entries=settings.PERMISSION_CACHE_MAX_ENTRIES,
+    ttl=settings.PERMISSION_CACHE_TTL,
+)
+
+# Knox token digest to TokenIdentity, entries never outlive the token.
+# Entries are invalidated by the signal handlers in user.signals.
+token_identity_cache = TTLCache(
+    max_entries=settings.TOKEN_CACHE_MAX_ENTRIES,
+    ttl=settings.TOKEN_CACHE_TTL,
+)
@@ -28,6 +28,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get("SECRET_KEY")
 
+# Key used to digest application API keys. Defaults to SECRET_KEY; rotating it
+# invalidates every issued API key.
+API_KEY_HMAC_SECRET = os.environ.get("API_KEY_HMAC_SECRET", SECRET_KEY)
+
 # SECURITY WARNING: don't run with debug turned on in production!
 
 ENVIRONMENT = os.environ.get("ENVIRONMENT")
@@ -189,6 +193,20 @@ SPECTACULAR_SETTINGS = {
     },
 }
 
+# In-process cache of permission decisions returned to the other services.
+# Entries are dropped when permissions, tokens or keys change in this process;
+# the TTL bounds staleness when several worker processes are running.
+PERMISSION_CACHE_TTL = int(os.environ.get("PERMISSION_CACHE_TTL", 30))
+PERMISSION_CACHE_MAX_ENTRIES = int(os.environ.get("PERMISSION_CACHE_MAX_ENTRIES", 10000))
+
+# In-process cache of resolved knox tokens, capped at the token expiry.
+# Expiry is read from the cache, so it assumes REST_KNOX["AUTO_REFRESH"] stays off.
+TOKEN_CACHE_TTL = int(os.environ.get("TOKEN_CACHE_TTL", 60))
+TOKEN_CACHE_MAX_ENTRIES = int(os.environ.get("TOKEN_CACHE_MAX_ENTRIES", 10000))
+
+# Interval for a full rebuild of the user type permission matrix (user.permission_matrix)
+PERMISSION_MATRIX_REFRESH_SECONDS = int(os.environ.get("PERMISSION_MATRIX_REFRESH_SECONDS", 300))
+
 KNOX_TOKEN_MODEL = "knox.AuthToken"
 
 REST_KNOX = {
@@ -208,6 +226,12 @@ REST_KNOX = {
 # Authentication
 AUTH_USER_MODEL = "user.User"
 
+# Signed access tokens (user.access_tokens), issued by the login view on request.
+# ACCESS_TOKEN_SIGNING_KEY is the base64url encoded 32 byte Ed25519 private key seed.
+ACCESS_TOKEN_SIGNING_KEY = os.environ.get("ACCESS_TOKEN_SIGNING_KEY")
+ACCESS_TOKEN_TTL = timedelta(seconds=int(os.environ.get("ACCESS_TOKEN_TTL", 300)))
+ACCESS_TOKEN_ISSUER = os.environ.get("ACCESS_TOKEN_ISSUER", "swakopmund-auth")
+
 CSRF_TRUSTED_ORIGINS = [
     "http://0.0.0.0:8080",
     "http://localhost:8080",
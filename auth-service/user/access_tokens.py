@@ -0,0 +1,133 @@
+import base64
+import hashlib
+import json
+import threading
+
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+
+from .permission_matrix import permission_matrix, PERMISSION_LEVELS
+
+ACCESS_TOKEN_ALGORITHM = 'EdDSA'
+ACCESS_TOKEN_TYPE = 'signed'
+
+
+def b64url_encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def b64url_decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+class AccessTokenSigner:
+    """
+    Issues short lived Ed25519 signed (JWS compact serialisation) access tokens.
+    Services verify them with the public key published at api/auth/user/signing-keys/
+    and authorise requests without calling the auth service.
+    """
+
+    def __init__(self):
+        self._private_key = None
+        self._lock = threading.Lock()
+
+    @property
+    def private_key(self):
+        if self._private_key is None:
+            with self._lock:
+                if self._private_key is None:
+                    self._private_key = self._load_private_key()
+        return self._private_key
+
+    @property
+    def enabled(self):
+        """
+        Signed tokens are only issued with a configured key, a generated one would differ
+        between processes and stop verifying on restart
+        """
+        return bool(settings.ACCESS_TOKEN_SIGNING_KEY)
+
+    @staticmethod
+    def _load_private_key():
+        seed = settings.ACCESS_TOKEN_SIGNING_KEY
+        if not seed:
+            raise ImproperlyConfigured("ACCESS_TOKEN_SIGNING_KEY is not set")
+        try:
+            return Ed25519PrivateKey.from_private_bytes(b64url_decode(seed))
+        except ValueError as e:
+            raise ImproperlyConfigured(f"ACCESS_TOKEN_SIGNING_KEY is not a valid Ed25519 key seed: {e}")
+
+    @property
+    def public_key_bytes(self):
+        return self.private_key.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+
+    @property
+    def key_id(self):
+        return hashlib.sha256(self.public_key_bytes).hexdigest()[:16]
+
+    def jwks(self):
+        if not self.enabled:
+            return {'keys': []}
+        return {
+            'keys': [
+                {
+                    'kty': 'OKP',
+                    'crv': 'Ed25519',
+                    'alg': ACCESS_TOKEN_ALGORITHM,
+                    'use': 'sig',
+                    'kid': self.key_id,
+                    'x': b64url_encode(self.public_key_bytes),
+                }
+            ]
+        }
+
+    def issue(self, user):
+        """
+        Returns the signed token and its expiry for the given user
+        """
+        issued_at = timezone.now()
+        expiry = issued_at + settings.ACCESS_TOKEN_TTL
+        user_types = list(user.user_types.all())
+
+        claims = {
+            'iss': settings.ACCESS_TOKEN_ISSUER,
+            'sub': str(user.id),
+            'email': user.email,
+            'user_types': [ut.name for ut in user_types],
+            'permissions': self._permissions(user_types),
+            'iat': int(issued_at.timestamp()),
+            'exp': int(expiry.timestamp()),
+        }
+        header = {'alg': ACCESS_TOKEN_ALGORITHM, 'typ': 'JWT', 'kid': self.key_id}
+
+        signing_input = '.'.join(
+            b64url_encode(json.dumps(part, separators=(',', ':')).encode('utf-8'))
+            for part in (header, claims)
+        )
+        signature = self.private_key.sign(signing_input.encode('ascii'))
+
+        return f'{signing_input}.{b64url_encode(signature)}', expiry
+
+    @staticmethod
+    def _permissions(user_types):
+        """
+        Highest permission per resource and sub resource across the user's types,
+        e.g. {"activities-services": {"fetch-activities": "read"}}.
+        Anonymous sub resources are listed as read, whatever the user's level, since
+        UserPermissionCheck only allows GET on them. The services can then deny anything
+        the token does not list, or lists at a lower level, as the auth service would.
+        """
+        levels = permission_matrix.levels_for([ut.id for ut in user_types])
+        for key in permission_matrix.anonymous_sub_resources():
+            levels[key] = PERMISSION_LEVELS.index('read')
+
+        permissions = {}
+        for (resource, sub_resource), level in levels.items():
+            permissions.setdefault(resource, {})[sub_resource] = PERMISSION_LEVELS[level]
+        return permissions
+
+
+access_token_signer = AccessTokenSigner()
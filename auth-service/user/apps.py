@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UserConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .access_tokens import access_token_signer
+
+        # A malformed signing key fails at startup rather than on the first signed login
+        if access_token_signer.enabled:
+            access_token_signer.private_key
@@ -0,0 +1,207 @@
+import json
+import queue
+import random
+import threading
+import time
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client
+from django.test.runner import DiscoverRunner
+from django.test.utils import CaptureQueriesContext, setup_test_environment, teardown_test_environment
+from django.utils import timezone
+from knox.models import AuthToken
+
+from application.models import Application, ApplicationResourcePermission, Resource, SubResource
+from authservice.cache import permission_decision_cache, token_identity_cache
+from user.models import User, UserType
+
+ENDPOINTS = {
+    'check-user-permission': '/api/auth/user/check-user-permission/',
+    'check-application-permission': '/api/auth/application/check_application_permission/',
+    'validate-user-token': '/api/auth/user/validate',
+}
+
+METHODS = ['GET', 'GET', 'GET', 'POST', 'PUT', 'DELETE']
+
+
+def percentile(sorted_values, p):
+    """
+    Nearest rank percentile of an already sorted list
+    """
+    if not sorted_values:
+        return None
+    rank = max(0, min(len(sorted_values) - 1, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark the permission check and token validation endpoints. "
+        "Seeds applications and users with tokens into a throwaway test database "
+        "(user types and permissions come from the user.initialiser migration), "
+        "drives the endpoints from concurrent threads and reports latency percentiles "
+        "and queries per request."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Users with a token to seed")
+        parser.add_argument('--applications', type=int, default=10, help="Applications with an API key to seed")
+        parser.add_argument('--requests', type=int, default=3000, help="Requests to send across all endpoints")
+        parser.add_argument('--concurrency', type=int, default=8, help="Threads sending requests")
+        parser.add_argument('--endpoints', nargs='+', choices=list(ENDPOINTS), default=list(ENDPOINTS))
+        parser.add_argument('--disable-caches', action='store_true', help="Turn off the in-process decision and token caches")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed of the data and the request mix")
+        parser.add_argument('--keepdb', action='store_true', help="Keep the test database between runs")
+        parser.add_argument('--output', help="Write the results as JSON to this file")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+
+        setup_test_environment()
+        runner = DiscoverRunner(keepdb=options['keepdb'], verbosity=0, interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            if options['disable_caches']:
+                permission_decision_cache.max_entries = 0
+                token_identity_cache.max_entries = 0
+
+            tokens, api_keys = self.seed(options['users'], options['applications'])
+            workload = self.workload(tokens, api_keys, options['endpoints'], options['requests'])
+            results, elapsed = self.run(workload, options['concurrency'])
+            report = self.report(results, elapsed, options)
+        finally:
+            connection.close()
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        self.print_report(report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(report, output, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def seed(self, user_count, application_count):
+        user_types = list(UserType.objects.all())
+        resources = list(Resource.objects.all())
+
+        users = User.objects.bulk_create([
+            User(email=f"benchmark-user-{i}@example.com", password='!') for i in range(user_count)
+        ])
+        UserTypes = User.user_types.through
+        UserTypes.objects.bulk_create([
+            UserTypes(user_id=user.pk, usertype_id=user_type.pk)
+            for user in users
+            for user_type in self.random.sample(user_types, k=self.random.randint(1, 2))
+        ])
+        tokens = [AuthToken.objects.create(user)[1] for user in users]
+
+        api_keys = []
+        for i in range(application_count):
+            application = Application(name=f"benchmark-application-{i}")
+            api_keys.append(application.generate_api_key())
+            application.save()
+            ApplicationResourcePermission.objects.bulk_create([
+                ApplicationResourcePermission(
+                    application=application,
+                    resource=resource,
+                    permission=self.random.choice([['read'], ['read', 'write'], ['read', 'write', 'admin']]),
+                )
+                for resource in self.random.sample(resources, k=min(len(resources), 5))
+            ])
+
+        return tokens, api_keys
+
+    def workload(self, tokens, api_keys, endpoints, request_count):
+        sub_resources = list(SubResource.objects.values_list('resource__name', 'name'))
+        requests = []
+        for _ in range(request_count):
+            endpoint = self.random.choice(endpoints)
+            resource, sub_resource = self.random.choice(sub_resources)
+            headers = {
+                'HTTP_X_RESOURCE': resource,
+                'HTTP_X_SUB_RESOURCE': sub_resource,
+                'HTTP_X_METHOD': self.random.choice(METHODS),
+            }
+            if endpoint == 'check-application-permission':
+                headers['HTTP_X_API_KEY'] = self.random.choice(api_keys)
+            else:
+                headers['HTTP_AUTHORIZATION'] = f"Token {self.random.choice(tokens)}"
+            requests.append((endpoint, headers))
+        return requests
+
+    def run(self, workload, concurrency):
+        pending = queue.SimpleQueue()
+        for request in workload:
+            pending.put(request)
+        results = []
+
+        def worker():
+            client = Client()
+            try:
+                while True:
+                    try:
+                        endpoint, headers = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    with CaptureQueriesContext(connection) as queries:
+                        started = time.perf_counter()
+                        response = client.post(ENDPOINTS[endpoint], **headers)
+                        latency = time.perf_counter() - started
+                    results.append((endpoint, latency, len(queries), response.status_code))
+            finally:
+                # Every thread opened its own database connection
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, time.perf_counter() - started
+
+    def report(self, results, elapsed, options):
+        endpoints = {}
+        for endpoint in options['endpoints']:
+            rows = [row for row in results if row[0] == endpoint]
+            latencies = sorted(latency * 1000 for _, latency, _, _ in rows)
+            queries = [query_count for _, _, query_count, _ in rows]
+            endpoints[endpoint] = {
+                'requests': len(rows),
+                'p50_ms': percentile(latencies, 50),
+                'p95_ms': percentile(latencies, 95),
+                'p99_ms': percentile(latencies, 99),
+                'mean_ms': sum(latencies) / len(latencies) if latencies else None,
+                'queries_per_request': sum(queries) / len(queries) if queries else None,
+                'max_queries': max(queries, default=None),
+                'status_codes': dict(Counter(str(status_code) for _, _, _, status_code in rows)),
+            }
+
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'users': options['users'],
+            'applications': options['applications'],
+            'concurrency': options['concurrency'],
+            'caches_enabled': not options['disable_caches'],
+            'requests': len(results),
+            'elapsed_s': elapsed,
+            'requests_per_second': len(results) / elapsed if elapsed else None,
+            'endpoints': endpoints,
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f"{report['requests']} requests in {report['elapsed_s']:.2f}s "
+            f"({report['requests_per_second']:.0f} req/s, concurrency {report['concurrency']})"
+        )
+        self.stdout.write(f"{'endpoint':<30}{'requests':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+        for endpoint, stats in report['endpoints'].items():
+            if not stats['requests']:
+                continue
+            self.stdout.write(
+                f"{endpoint:<30}{stats['requests']:>9}{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}"
+                f"{stats['p99_ms']:>9.2f}{stats['queries_per_request']:>9.2f}"
+            )
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Exists, OuterRef
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.contrib.postgres.fields import ArrayField
@@ -38,19 +39,26 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
-    def save(self, *args, **kwargs):
+    def refresh_municipal_staff(self):
         """
-        Designates the municipal staff property based on the user types
+        Designates the municipal staff property based on the user types.
+        Called by the user_types m2m_changed handler in user.signals, only writes when the value changes.
         """
-        super().save(*args, **kwargs)
+        new_value = self.user_types.filter(is_municipal_staff=True).exists()
 
-        if hasattr(self, 'user_types'):
-            new_value = self.user_types.filter(is_municipal_staff=True).exists()
+        if new_value != self.is_municipal_staff:
+            User.objects.filter(pk=self.pk).update(is_municipal_staff=new_value)
+            self.is_municipal_staff = new_value
 
-            if new_value != self.is_municipal_staff:
-                # Avoid infinite recursion by using update()
-                User.objects.filter(pk=self.pk).update(is_municipal_staff=new_value)
-                self.is_municipal_staff = new_value
+    @classmethod
+    def refresh_municipal_staff_for(cls, user_ids):
+        """
+        Recompute the municipal staff property of many users with a single UPDATE
+        """
+        staff_user_types = cls.user_types.through.objects.filter(
+            user_id=OuterRef('pk'), usertype__is_municipal_staff=True
+        )
+        cls.objects.filter(pk__in=user_ids).update(is_municipal_staff=Exists(staff_user_types))
 
     @property
     def primary_user_type(self):
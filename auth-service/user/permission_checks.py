@@ -0,0 +1,154 @@
+from rest_framework import status
+from knox.auth import TokenAuthentication
+from knox.crypto import hash_token
+
+from authservice.cache import Decision, TokenIdentity, permission_decision_cache, token_identity_cache
+from .permission_matrix import permission_matrix, PERMISSION_LEVELS, NO_PERMISSION
+
+# Map HTTP methods to required permission levels
+METHOD_TO_PERMISSION = {
+    'GET': 'read',
+    'POST': 'write',
+    'PUT': 'write',
+    'PATCH': 'write',
+    'DELETE': 'admin',
+}
+
+
+def resolve_token(token, digest=None):
+    """
+    Resolve a knox token to a TokenIdentity, None if the token is invalid or expired.
+    Identities are cached by token digest, so a warm lookup is a hash and a dict access.
+    """
+    digest = digest or hash_token(token)
+    identity = token_identity_cache.get(digest)
+    if identity is not None:
+        return identity
+
+    try:
+        knox_auth = TokenAuthentication()
+        user, auth_token = knox_auth.authenticate_credentials(token.encode('utf-8'))
+    except Exception:
+        return None
+
+    user_types = list(user.user_types.all())
+    identity = TokenIdentity(
+        user_id=user.id,
+        email=user.email,
+        first_name=user.first_name,
+        last_name=user.last_name,
+        user_type_ids=tuple(ut.id for ut in user_types),
+        user_type_names=tuple(ut.name for ut in user_types),
+        expiry=auth_token.expiry,
+    )
+    token_identity_cache.set(digest, identity, expires_at=identity.expiry)
+    return identity
+
+
+class UserPermissionCheck:
+    """
+    Permission checks for a single knox token.
+    The token is only resolved to a user, once, when a check is not cached and
+    the sub resource does not allow anonymous access.
+    """
+
+    def __init__(self, token):
+        self.token = token or None
+        self.digest = hash_token(self.token) if self.token else None
+        self._resolved = False
+        self.identity = None
+
+    def resolve(self):
+        if not self._resolved:
+            self._resolved = True
+            self.identity = resolve_token(self.token, self.digest)
+        return self.identity
+
+    def check(self, resource, sub_resource, method):
+        cache_key = ('user', self.digest, resource, sub_resource, method)
+        decision = permission_decision_cache.get(cache_key)
+
+        if decision is None:
+            decision = self.evaluate(resource, sub_resource, method)
+            permission_decision_cache.set(cache_key, decision, expires_at=decision.expires_at)
+
+        return decision
+
+    def evaluate(self, resource, sub_resource, method):
+        # First check if the resource allows anonymous access
+        if permission_matrix.allows_anonymous(resource, sub_resource):
+            # For anonymous access, only allow GET requests (read-only)
+            if method == 'GET':
+                return Decision({
+                    'status': "authorised",
+                    'anonymous': True,
+                    'permission': 'read',
+                    'message': "Anonymous read access granted"
+                }, status.HTTP_200_OK)
+
+            return Decision({
+                "error": "Anonymous access only allows GET requests"
+            }, status.HTTP_403_FORBIDDEN)
+
+        # If we get here, the resource requires authentication
+        if not self.token:
+            return Decision(
+                {"error": "Authentication required for this resource"},
+                status.HTTP_401_UNAUTHORIZED
+            )
+
+        # Authenticate the user
+        identity = self.resolve()
+        if identity is None:
+            return Decision(
+                {"error": "Invalid authentication token"},
+                status.HTTP_401_UNAUTHORIZED
+            )
+
+        expiry = identity.expiry
+
+        # Get required permission based on HTTP method
+        required_permission = METHOD_TO_PERMISSION.get(method, 'read')
+
+        # Check user permissions through their user types
+        if not identity.user_type_ids:
+            return Decision(
+                {"error": "User has no assigned types"},
+                status.HTTP_403_FORBIDDEN,
+                expires_at=expiry
+            )
+
+        # Highest permission level across the user's types for the requested resource
+        highest_level = permission_matrix.highest_level(
+            identity.user_type_ids,
+            resource,
+            sub_resource
+        )
+
+        if highest_level is None:
+            return Decision(
+                {"error": "No permissions found for user types"},
+                status.HTTP_403_FORBIDDEN,
+                expires_at=expiry
+            )
+
+        if highest_level == NO_PERMISSION:
+            return Decision(
+                {"error": "No valid permissions found"},
+                status.HTTP_403_FORBIDDEN,
+                expires_at=expiry
+            )
+
+        highest_permission = PERMISSION_LEVELS[highest_level]
+
+        if highest_level < PERMISSION_LEVELS.index(required_permission):
+            return Decision({
+                "error": f"Requires {required_permission} permission but only has {highest_permission}"
+            }, status.HTTP_403_FORBIDDEN, expires_at=expiry)
+
+        return Decision({
+            'status': "authorised",
+            'user': {'id': identity.user_id, 'email': identity.email},
+            'permission': highest_permission,
+            'user_types': list(identity.user_type_names)
+        }, status.HTTP_200_OK, expires_at=expiry)
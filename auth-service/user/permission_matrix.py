@@ -0,0 +1,124 @@
+import threading
+import time
+
+from django.conf import settings
+
+from application.models import SubResource
+from .models import UserResourcePermission
+
+PERMISSION_LEVELS = ['read', 'write', 'admin']
+
+# Stored for (user type, sub resource) pairs that have permission rows with no levels in them
+NO_PERMISSION = -1
+
+
+class PermissionMatrix:
+    """
+    In-memory map of (user_type_id, resource name, sub resource name) to the highest
+    permission level the user type holds, as an index into PERMISSION_LEVELS.
+    Built on first use from UserResourcePermission and kept up to date by the
+    signal handlers in user.signals. A full rebuild also happens every
+    PERMISSION_MATRIX_REFRESH_SECONDS so changes made by other processes are picked up.
+    """
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._levels = {}
+        self._anonymous = frozenset()
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def build(self):
+        levels = {}
+        rows = UserResourcePermission.objects.filter(user_type__isnull=False).values_list(
+            'user_type_id', 'sub_resource__resource__name', 'sub_resource__name', 'permission'
+        )
+        for user_type_id, resource, sub_resource, permission in rows:
+            key = (user_type_id, resource, sub_resource)
+            levels[key] = max(levels.get(key, NO_PERMISSION), self._highest(permission))
+
+        anonymous = frozenset(
+            SubResource.objects.filter(allow_anonymous=True).values_list('resource__name', 'name')
+        )
+
+        with self._lock:
+            self._levels = levels
+            self._anonymous = anonymous
+            self._built_at = time.monotonic()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def ensure_built(self):
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.refresh_seconds:
+            self.build()
+
+    def allows_anonymous(self, resource, sub_resource):
+        self.ensure_built()
+        return (resource, sub_resource) in self._anonymous
+
+    def anonymous_sub_resources(self):
+        """
+        (resource, sub resource) pairs that allow anonymous access
+        """
+        self.ensure_built()
+        return self._anonymous
+
+    def highest_level(self, user_type_ids, resource, sub_resource):
+        """
+        Highest level across the given user types, NO_PERMISSION if only empty
+        permission rows exist, None if the user types have no rows at all.
+        """
+        self.ensure_built()
+        levels = self._levels
+        found = [
+            levels[key] for key in ((user_type_id, resource, sub_resource) for user_type_id in user_type_ids)
+            if key in levels
+        ]
+        return max(found) if found else None
+
+    def levels_for(self, user_type_ids):
+        """
+        Highest level per (resource, sub resource) the given user types hold
+        """
+        self.ensure_built()
+        user_type_ids = set(user_type_ids)
+        levels = {}
+        for (user_type_id, resource, sub_resource), level in list(self._levels.items()):
+            if user_type_id in user_type_ids and level != NO_PERMISSION:
+                key = (resource, sub_resource)
+                levels[key] = max(levels.get(key, level), level)
+        return levels
+
+    def update(self, user_type_id, sub_resource_id):
+        """
+        Recompute the entry of a single (user type, sub resource) pair
+        """
+        if user_type_id is None or self._built_at is None:
+            return
+
+        try:
+            sub_resource = SubResource.objects.select_related('resource').get(pk=sub_resource_id)
+        except SubResource.DoesNotExist:
+            self.invalidate()
+            return
+
+        permissions = UserResourcePermission.objects.filter(
+            user_type_id=user_type_id, sub_resource_id=sub_resource_id
+        ).values_list('permission', flat=True)
+
+        key = (user_type_id, sub_resource.resource.name, sub_resource.name)
+        with self._lock:
+            if not permissions:
+                self._levels.pop(key, None)
+            else:
+                self._levels[key] = max(self._highest(permission) for permission in permissions)
+
+    @staticmethod
+    def _highest(permission):
+        return max((PERMISSION_LEVELS.index(p) for p in permission), default=NO_PERMISSION)
+
+
+permission_matrix = PermissionMatrix(refresh_seconds=settings.PERMISSION_MATRIX_REFRESH_SECONDS)
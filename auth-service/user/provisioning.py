@@ -0,0 +1,181 @@
+import csv
+import json
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+
+from .models import User, UserType
+
+# Separator of user type names in a CSV cell, commas are taken by the CSV itself
+CSV_USER_TYPE_SEPARATOR = ';'
+
+USER_FIELDS = ('email', 'password', 'first_name', 'last_name', 'home_address', 'user_type_names')
+
+TEXT_FIELDS = ('email', 'password', 'first_name', 'last_name', 'home_address')
+
+
+def read_rows(stream, file_format):
+    """
+    Yield (line number, row dict) from a CSV (with a header line) or JSON lines stream.
+    Lines that cannot be parsed are yielded with the error message instead of a dict.
+    """
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            user_type_names = row.get('user_type_names') or ''
+            row['user_type_names'] = [
+                name.strip() for name in user_type_names.split(CSV_USER_TYPE_SEPARATOR) if name.strip()
+            ]
+            yield reader.line_num, row
+    elif file_format == 'jsonl':
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield line_number, f"Invalid JSON: {e.msg}"
+                continue
+            if not isinstance(row, dict):
+                yield line_number, "Each line must be a JSON object"
+                continue
+            yield line_number, row
+    else:
+        raise ValueError(f"Unsupported format: {file_format}")
+
+
+class UserProvisioner:
+    """
+    Creates users in bulk from rows of USER_FIELDS.
+    Passwords are hashed in a process pool, users and their user types are
+    inserted with one bulk_create each per chunk. Invalid rows are reported
+    in `errors` and do not stop the batch.
+    """
+
+    def __init__(self, chunk_size=1000, workers=None):
+        self.chunk_size = chunk_size
+        self.workers = workers
+        self.created = 0
+        self.errors = []
+        self.user_types = {
+            user_type.name: user_type for user_type in UserType.objects.all()
+        }
+
+    def provision(self, rows):
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            rows = iter(rows)
+            while chunk := list(islice(rows, self.chunk_size)):
+                self._provision_chunk(chunk, executor)
+
+        return {'created': self.created, 'failed': len(self.errors), 'errors': self.errors}
+
+    def _error(self, line_number, email, message):
+        self.errors.append({'line': line_number, 'email': email, 'error': message})
+
+    def _provision_chunk(self, chunk, executor):
+        valid = []
+        seen_emails = set()
+        for line_number, row in chunk:
+            if isinstance(row, str):
+                self._error(line_number, None, row)
+                continue
+
+            try:
+                user, user_types = self._build_user(row)
+            except ValidationError as e:
+                self._error(line_number, row.get('email'), '; '.join(e.messages))
+                continue
+
+            if user.email in seen_emails:
+                self._error(line_number, user.email, "Duplicate email in this batch")
+                continue
+            seen_emails.add(user.email)
+            valid.append((line_number, user, user_types, row.get('password')))
+
+        existing_emails = set(
+            User.objects.filter(email__in=seen_emails).values_list('email', flat=True)
+        )
+        pending = []
+        for line_number, user, user_types, password in valid:
+            if user.email in existing_emails:
+                self._error(line_number, user.email, "A user with this email already exists")
+            else:
+                pending.append((line_number, user, user_types, password))
+
+        # Rows without a password get an unusable one, which needs no hashing
+        to_hash = [(user, password) for _, user, _, password in pending if password]
+        hashed_passwords = executor.map(
+            make_password, [password for _, password in to_hash], chunksize=max(1, len(to_hash) // 64)
+        )
+        for (user, _), hashed_password in zip(to_hash, hashed_passwords):
+            user.password = hashed_password
+        for _, user, _, password in pending:
+            if not password:
+                user.set_unusable_password()
+
+        try:
+            with transaction.atomic():
+                self._insert([(user, user_types) for _, user, user_types, _ in pending])
+            self.created += len(pending)
+        except IntegrityError:
+            # Another process created some of the emails meanwhile, insert row by row
+            for line_number, user, user_types, _ in pending:
+                user.pk = None
+                try:
+                    with transaction.atomic():
+                        self._insert([(user, user_types)])
+                    self.created += 1
+                except IntegrityError as e:
+                    self._error(line_number, user.email, str(e))
+
+    def _build_user(self, row):
+        # csv.DictReader puts the cells of a row longer than the header under None
+        if None in row:
+            raise ValidationError("Unexpected extra cells")
+        unknown = [key for key in row if key not in USER_FIELDS]
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(unknown)}")
+
+        not_text = [field for field in TEXT_FIELDS if not isinstance(row.get(field), (str, type(None)))]
+        if not_text:
+            raise ValidationError(f"Fields must be text: {', '.join(not_text)}")
+
+        email = User.objects.normalize_email((row.get('email') or '').strip())
+        if not email:
+            raise ValidationError("Email is required")
+        validate_email(email)
+
+        user_type_names = row.get('user_type_names') or []
+        if isinstance(user_type_names, str):
+            user_type_names = [user_type_names]
+        if not isinstance(user_type_names, list) or not all(isinstance(name, str) for name in user_type_names):
+            raise ValidationError("user_type_names must be a name or a list of names")
+        missing = [name for name in user_type_names if name not in self.user_types]
+        if missing:
+            raise ValidationError(f"Unknown user types: {', '.join(missing)}")
+        user_types = [self.user_types[name] for name in user_type_names]
+
+        user = User(
+            email=email,
+            first_name=row.get('first_name') or '',
+            last_name=row.get('last_name') or '',
+            home_address=row.get('home_address') or None,
+            # bulk_create sends no m2m_changed, derive the flag here
+            is_municipal_staff=any(user_type.is_municipal_staff for user_type in user_types),
+        )
+        user.full_clean(exclude=['password', 'email'], validate_unique=False)
+        return user, user_types
+
+    @staticmethod
+    def _insert(users_with_types):
+        users = User.objects.bulk_create([user for user, _ in users_with_types])
+        UserTypes = User.user_types.through
+        UserTypes.objects.bulk_create([
+            UserTypes(user_id=user.pk, usertype_id=user_type.pk)
+            for user, (_, user_types) in zip(users, users_with_types)
+            for user_type in user_types
+        ])
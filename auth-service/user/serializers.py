@@ -2,6 +2,7 @@ from rest_framework import serializers
 from django.contrib.auth import authenticate
 from knox.models import AuthToken
 from .models import User, UserType, UserResourcePermission
+from .permission_checks import METHOD_TO_PERMISSION
 
 class UserTypeSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,6 +17,27 @@ class UserSerializer(serializers.ModelSerializer):
     def get_user_type_names(self, obj):
         return [ut.name for ut in obj.user_types.all()]
 
+class PermissionCheckSerializer(serializers.Serializer):
+    resource = serializers.CharField()
+    sub_resource = serializers.CharField()
+    method = serializers.CharField(default='GET')
+
+    def validate_method(self, value):
+        value = value.upper()
+        if value not in METHOD_TO_PERMISSION:
+            raise serializers.ValidationError(f"Method must be one of {', '.join(METHOD_TO_PERMISSION)}")
+        return value
+
+
+class BatchPermissionCheckSerializer(serializers.Serializer):
+    checks = serializers.ListField(
+        child=PermissionCheckSerializer(),
+        allow_empty=False,
+        max_length=50,
+        help_text="List of resource, sub resource and method combinations to check"
+    )
+
+
 class UserCreateSerializer(serializers.ModelSerializer):
     user_type_names = serializers.ListField(
         child=serializers.CharField(),
@@ -36,12 +58,9 @@ class UserCreateSerializer(serializers.ModelSerializer):
         # Add user types
         if user_type_names:
             user_types = UserType.objects.filter(name__in=user_type_names)
+            # is_municipal_staff is derived by the m2m_changed handler in user.signals
             user.user_types.set(user_types)
 
-            user.is_municipal_staff = user_types.filter(is_municipal_staff=True).exists()
-            User.objects.filter(pk=user.pk).update(is_municipal_staff=user.is_municipal_staff)
-
-
         return user
 
 
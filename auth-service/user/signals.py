@@ -0,0 +1,164 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from knox.models import AuthToken
+
+from authservice.cache import permission_decision_cache, token_identity_cache
+from application.models import Resource, SubResource
+from .models import User, UserType, UserResourcePermission
+from .permission_matrix import permission_matrix
+
+
+def _evict_user(user_id):
+    permission_decision_cache.delete_matching(
+        lambda key, decision: decision.data.get('user', {}).get('id') == user_id
+    )
+    _evict_user_tokens(user_id)
+
+
+def _evict_user_tokens(user_id):
+    token_identity_cache.delete_matching(lambda digest, identity: identity.user_id == user_id)
+
+
+@receiver([post_save, post_delete], sender=UserType)
+def invalidate_permission_decisions(sender, **kwargs):
+    """
+    User permissions change rarely, drop every cached decision
+    """
+    permission_decision_cache.clear()
+    # Resolved tokens carry the user type names
+    token_identity_cache.clear()
+
+
+@receiver(pre_save, sender=UserResourcePermission)
+def remember_previous_permission_target(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_target = (
+            UserResourcePermission.objects.filter(pk=instance.pk)
+            .values_list('user_type_id', 'sub_resource_id')
+            .first()
+        )
+
+
+@receiver([post_save, post_delete], sender=UserResourcePermission)
+def update_permission_matrix(sender, instance, **kwargs):
+    """
+    Applied once the change is committed, so a rolled back change never reaches the
+    matrix and no decision is cached from the rows as they were before the commit
+    """
+    targets = {(instance.user_type_id, instance.sub_resource_id)}
+    previous_target = getattr(instance, '_previous_target', None)
+    if previous_target:
+        targets.add(previous_target)
+
+    def update():
+        for target in targets:
+            permission_matrix.update(*target)
+        permission_decision_cache.clear()
+
+    transaction.on_commit(update)
+
+
+@receiver([post_save, post_delete], sender=Resource)
+@receiver([post_save, post_delete], sender=SubResource)
+def rebuild_permission_matrix(sender, **kwargs):
+    """
+    Renames and anonymous access changes affect many entries, rebuild on next use.
+    Deferred to the commit like update_permission_matrix.
+    """
+    def invalidate():
+        permission_matrix.invalidate()
+        permission_decision_cache.clear()
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_delete, sender=AuthToken)
+def invalidate_token_decisions(sender, instance, **kwargs):
+    """
+    Logout and logoutall delete the token, forget every decision made for it
+    """
+    token_identity_cache.delete(instance.digest)
+    permission_decision_cache.delete_matching(
+        lambda key, decision: key[0] == 'user' and key[1] == instance.digest
+    )
+
+
+@receiver(m2m_changed, sender=User.user_types.through)
+def invalidate_user_type_decisions(sender, instance, action, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if isinstance(instance, User):
+        _evict_user(instance.pk)
+    else:
+        # Changed from the UserType side, the affected users are not known here
+        permission_decision_cache.clear()
+        token_identity_cache.clear()
+
+
+@receiver(m2m_changed, sender=User.user_types.through)
+def derive_municipal_staff(sender, instance, action, pk_set, **kwargs):
+    """
+    Keep User.is_municipal_staff in line with the user types
+    """
+    if isinstance(instance, User):
+        if action in ('post_add', 'post_remove'):
+            instance.refresh_municipal_staff()
+        elif action == 'post_clear' and instance.is_municipal_staff:
+            User.objects.filter(pk=instance.pk).update(is_municipal_staff=False)
+            instance.is_municipal_staff = False
+        return
+
+    # Changed from the UserType side, only staff types change the affected users
+    if not instance.is_municipal_staff:
+        return
+
+    if action == 'pre_clear':
+        instance._cleared_user_ids = list(instance.users.values_list('pk', flat=True))
+    elif action in ('post_add', 'post_remove'):
+        User.refresh_municipal_staff_for(pk_set)
+    elif action == 'post_clear':
+        User.refresh_municipal_staff_for(getattr(instance, '_cleared_user_ids', []))
+
+
+@receiver(pre_save, sender=UserType)
+def remember_previous_municipal_staff(sender, instance, **kwargs):
+    if instance.pk:
+        instance._previous_is_municipal_staff = (
+            UserType.objects.filter(pk=instance.pk).values_list('is_municipal_staff', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=UserType)
+def rederive_municipal_staff(sender, instance, created, **kwargs):
+    if not created and getattr(instance, '_previous_is_municipal_staff', None) != instance.is_municipal_staff:
+        User.refresh_municipal_staff_for(instance.users.values('pk'))
+
+
+@receiver(pre_delete, sender=UserType)
+def remember_municipal_staff_users(sender, instance, **kwargs):
+    # The user type rows are removed by the cascade, which sends no m2m_changed
+    if instance.is_municipal_staff:
+        instance._staff_user_ids = list(instance.users.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=UserType)
+def rederive_municipal_staff_after_delete(sender, instance, **kwargs):
+    staff_user_ids = getattr(instance, '_staff_user_ids', None)
+    if staff_user_ids:
+        User.refresh_municipal_staff_for(staff_user_ids)
+
+
+@receiver(post_save, sender=User)
+def invalidate_saved_user_decisions(sender, instance, update_fields=None, **kwargs):
+    if not instance.is_active:
+        _evict_user(instance.pk)
+    elif update_fields is None or set(update_fields) != {'last_login'}:
+        # Resolved tokens carry the email and names, logins only touch last_login
+        _evict_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_decisions(sender, instance, **kwargs):
+    _evict_user(instance.pk)
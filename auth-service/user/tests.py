@@ -1,3 +1,663 @@
-from django.test import TestCase
+import base64
+import io
+import json
+import os
+import time
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from knox.crypto import hash_token
+from knox.models import AuthToken
+from rest_framework.test import APIClient
+
+from application.models import ApplicationResourcePermission, Resource, SubResource
+from application.tests import create_application
+from authservice.cache import permission_decision_cache, token_identity_cache
+from .access_tokens import access_token_signer, b64url_decode
+from .models import User, UserType, UserResourcePermission
+from .permission_checks import resolve_token
+from .permission_matrix import NO_PERMISSION, PERMISSION_LEVELS, permission_matrix
+from .provisioning import UserProvisioner, read_rows
+
+CHECK_USER_PERMISSION_URL = '/api/auth/user/check-user-permission/'
+CHECK_USER_PERMISSIONS_URL = '/api/auth/user/check-user-permissions/'
+LOGIN_URL = '/api/auth/user/login/'
+VALIDATE_URL = '/api/auth/user/validate'
+SIGNING_KEYS_URL = '/api/auth/user/signing-keys/'
+SIGNING_KEY = base64.urlsafe_b64encode(os.urandom(32)).rstrip(b'=').decode()
+
+
+class AuthorizationTestCase(TestCase):
+    """
+    A resource with a public and a private sub resource, a user type with read access
+    to the private one and a user of that type with a knox token.
+    The in-process caches outlive the test transactions, so they start empty in every test.
+    """
+
+    def setUp(self):
+        permission_decision_cache.clear()
+        token_identity_cache.clear()
+        permission_matrix.invalidate()
+        self.addCleanup(permission_decision_cache.clear)
+        self.addCleanup(token_identity_cache.clear)
+        self.addCleanup(permission_matrix.invalidate)
+
+        self.client = APIClient()
+        self.resource = Resource.objects.create(name='test-services')
+        self.public = SubResource.objects.create(resource=self.resource, name='public', allow_anonymous=True)
+        self.private = SubResource.objects.create(resource=self.resource, name='private')
+
+        self.user_type = UserType.objects.create(name='test-reader')
+        self.permission = UserResourcePermission.objects.create(
+            user_type=self.user_type, sub_resource=self.private, permission=['read']
+        )
+
+        self.user = User.objects.create_user(email='reader@example.com', password='not-used-1234')
+        self.user.user_types.add(self.user_type)
+        _, self.token = AuthToken.objects.create(self.user)
+
+    def check_user_permission(self, sub_resource='private', method='GET', token=None):
+        headers = {'X-RESOURCE': self.resource.name, 'X-SUB-RESOURCE': sub_resource, 'X-METHOD': method}
+        token = self.token if token is None else token
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        return self.client.post(CHECK_USER_PERMISSION_URL, headers=headers)
+
+
+class CheckUserPermissionTests(AuthorizationTestCase):
+    def test_permitted(self):
+        response = self.check_user_permission()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['permission'], 'read')
+        self.assertEqual(response.data['user']['id'], self.user.id)
+
+    def test_insufficient_permission_is_403(self):
+        self.assertEqual(self.check_user_permission(method='POST').status_code, 403)
+
+    def test_user_type_without_permissions_is_403(self):
+        self.user.user_types.set([UserType.objects.create(name='test-outsider')])
+
+        self.assertEqual(self.check_user_permission().status_code, 403)
+
+    def test_missing_token_is_401(self):
+        self.assertEqual(self.check_user_permission(token='').status_code, 401)
+
+    def test_invalid_token_is_401(self):
+        self.assertEqual(self.check_user_permission(token='not-a-token').status_code, 401)
+
+    def test_anonymous_read(self):
+        response = self.check_user_permission(sub_resource='public', token='')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['anonymous'])
+        self.assertEqual(self.check_user_permission(sub_resource='public', method='POST', token='').status_code, 403)
+
+    def test_missing_headers_is_400(self):
+        self.assertEqual(self.client.post(CHECK_USER_PERMISSION_URL).status_code, 400)
+
+
+class PermissionDecisionCacheTests(AuthorizationTestCase):
+    def test_repeated_check_is_served_from_cache(self):
+        self.check_user_permission()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.check_user_permission().status_code, 200)
+
+    def test_grant_invalidates_denial(self):
+        self.assertEqual(self.check_user_permission(method='POST').status_code, 403)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.permission = ['read', 'write']
+            self.permission.save()
+
+        self.assertEqual(self.check_user_permission(method='POST').status_code, 200)
+
+    def test_revoke_invalidates_decision(self):
+        self.assertEqual(self.check_user_permission().status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.delete()
+
+        self.assertEqual(self.check_user_permission().status_code, 403)
+
+    def test_removing_user_type_invalidates_decision(self):
+        self.assertEqual(self.check_user_permission().status_code, 200)
+
+        self.user.user_types.remove(self.user_type)
+
+        self.assertEqual(self.check_user_permission().status_code, 403)
+
+    def test_logout_invalidates_decision(self):
+        self.assertEqual(self.check_user_permission().status_code, 200)
+
+        AuthToken.objects.filter(user=self.user).delete()
+
+        self.assertEqual(self.check_user_permission().status_code, 401)
+
+    def test_deactivating_user_invalidates_decision(self):
+        self.assertEqual(self.check_user_permission().status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.check_user_permission().status_code, 401)
+
+    def test_anonymous_access_change_invalidates_decision(self):
+        self.assertEqual(self.check_user_permission(sub_resource='private', token='').status_code, 401)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.private.allow_anonymous = True
+            self.private.save()
+
+        self.assertEqual(self.check_user_permission(sub_resource='private', token='').status_code, 200)
+
+
+class PermissionMatrixTests(AuthorizationTestCase):
+    def level(self, user_type=None, sub_resource='private'):
+        user_type = user_type or self.user_type
+        return permission_matrix.highest_level([user_type.id], self.resource.name, sub_resource)
+
+    def test_build(self):
+        self.assertEqual(self.level(), PERMISSION_LEVELS.index('read'))
+        self.assertIsNone(self.level(sub_resource='public'))
+        self.assertTrue(permission_matrix.allows_anonymous(self.resource.name, 'public'))
+        self.assertFalse(permission_matrix.allows_anonymous(self.resource.name, 'private'))
+
+    def test_highest_level_across_user_types(self):
+        writer = UserType.objects.create(name='test-writer')
+        UserResourcePermission.objects.create(user_type=writer, sub_resource=self.private, permission=['write'])
+
+        level = permission_matrix.highest_level([self.user_type.id, writer.id], self.resource.name, 'private')
+
+        self.assertEqual(level, PERMISSION_LEVELS.index('write'))
+
+    def test_grant_updates_entry_without_rebuild(self):
+        permission_matrix.ensure_built()
+        built_at = permission_matrix._built_at
+
+        with self.captureOnCommitCallbacks(execute=True):
+            UserResourcePermission.objects.create(user_type=self.user_type, sub_resource=self.public, permission=['admin'])
+            self.permission.permission = ['read', 'write']
+            self.permission.save()
+
+        self.assertEqual(permission_matrix._built_at, built_at)
+        self.assertEqual(self.level(), PERMISSION_LEVELS.index('write'))
+        self.assertEqual(self.level(sub_resource='public'), PERMISSION_LEVELS.index('admin'))
+
+    def test_revoke_removes_entry(self):
+        permission_matrix.ensure_built()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.delete()
+
+        self.assertIsNone(self.level())
+
+    def test_empty_permission_is_no_permission(self):
+        permission_matrix.ensure_built()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.permission = []
+            self.permission.save()
+
+        self.assertEqual(self.level(), NO_PERMISSION)
+        self.assertEqual(permission_matrix.levels_for([self.user_type.id]), {})
+
+    def test_moving_permission_updates_both_user_types(self):
+        other = UserType.objects.create(name='test-other')
+        permission_matrix.ensure_built()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.permission.user_type = other
+            self.permission.save()
+
+        self.assertIsNone(self.level())
+        self.assertEqual(self.level(user_type=other), PERMISSION_LEVELS.index('read'))
+
+    def test_rolled_back_grant_is_not_applied(self):
+        permission_matrix.ensure_built()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.permission.permission = ['read', 'write', 'admin']
+                self.permission.save()
+                UserResourcePermission.objects.create(
+                    user_type=self.user_type, sub_resource=self.public, permission=['admin']
+                )
+                transaction.set_rollback(True)
+
+        self.assertEqual(self.level(), PERMISSION_LEVELS.index('read'))
+        self.assertIsNone(self.level(sub_resource='public'))
+
+    def test_grant_applied_on_commit(self):
+        permission_matrix.ensure_built()
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.permission.permission = ['read', 'write']
+            self.permission.save()
+            # Other threads keep seeing the committed rows until the commit
+            self.assertEqual(self.level(), PERMISSION_LEVELS.index('read'))
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.level(), PERMISSION_LEVELS.index('write'))
+
+    def test_renaming_sub_resource_rebuilds(self):
+        permission_matrix.ensure_built()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.private.name = 'renamed'
+            self.private.save()
+
+        self.assertIsNone(self.level())
+        self.assertEqual(self.level(sub_resource='renamed'), PERMISSION_LEVELS.index('read'))
+
+    def test_levels_for(self):
+        self.assertEqual(
+            permission_matrix.levels_for([self.user_type.id]),
+            {(self.resource.name, 'private'): PERMISSION_LEVELS.index('read')},
+        )
+
+
+class CheckUserPermissionBatchTests(AuthorizationTestCase):
+    def check_user_permissions(self, checks, token=None, api_key=None):
+        headers = {}
+        token = self.token if token is None else token
+        if token:
+            headers['Authorization'] = f'Token {token}'
+        if api_key:
+            headers['X-API-KEY'] = api_key
+        return self.client.post(CHECK_USER_PERMISSIONS_URL, {'checks': checks}, format='json', headers=headers)
+
+    def check(self, sub_resource, method='GET'):
+        return {'resource': self.resource.name, 'sub_resource': sub_resource, 'method': method}
+
+    def user_status_codes(self, response):
+        return [result['user']['status_code'] for result in response.data['results']]
+
+    def test_results_in_request_order(self):
+        response = self.check_user_permissions([
+            self.check('private'), self.check('private', 'POST'), self.check('public'), self.check('missing'),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_status_codes(response), [200, 403, 200, 403])
+        self.assertEqual(response.data['results'][1]['method'], 'POST')
+        self.assertIsNone(response.data['results'][0]['application'])
+
+    def test_matches_single_checks(self):
+        response = self.check_user_permissions([self.check('private'), self.check('private', 'DELETE')])
+
+        self.assertEqual(self.user_status_codes(response), [
+            self.check_user_permission().status_code,
+            self.check_user_permission(method='DELETE').status_code,
+        ])
+
+    def test_invalid_token_is_401_per_check(self):
+        response = self.check_user_permissions([self.check('private'), self.check('public')], token='not-a-token')
+
+        # Anonymous reads do not need the token
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.user_status_codes(response), [401, 200])
+
+    def test_anonymous(self):
+        response = self.check_user_permissions([self.check('private'), self.check('public')], token='')
+
+        self.assertEqual(self.user_status_codes(response), [401, 200])
+
+    def test_application(self):
+        application, key = create_application()
+        ApplicationResourcePermission.objects.create(
+            application=application, resource=self.resource, permission=['read']
+        )
+
+        response = self.check_user_permissions([self.check('private'), self.check('private', 'POST')], api_key=key)
+
+        applications = [result['application']['status_code'] for result in response.data['results']]
+        self.assertEqual(applications, [200, 403])
+        self.assertEqual(self.user_status_codes(response), [200, 403])
+
+    def test_application_only(self):
+        _, key = create_application()
+
+        response = self.check_user_permissions([self.check('private')], token='', api_key=key)
+
+        self.assertIsNone(response.data['results'][0]['user'])
+        self.assertEqual(response.data['results'][0]['application']['status_code'], 403)
+
+    def test_invalid_checks_are_400(self):
+        self.assertEqual(self.check_user_permissions([]).status_code, 400)
+        self.assertEqual(self.check_user_permissions([self.check('private', 'BREW')]).status_code, 400)
+        self.assertEqual(self.check_user_permissions([self.check('private')] * 51).status_code, 400)
+
+
+class SignedAccessTokenTests(AuthorizationTestCase):
+    def setUp(self):
+        super().setUp()
+        # The signer keeps the key it loaded first
+        access_token_signer._private_key = None
+        self.addCleanup(setattr, access_token_signer, '_private_key', None)
+
+    def login(self, token_type='signed'):
+        return self.client.post(LOGIN_URL, {
+            'username': self.user.email, 'password': 'not-used-1234', 'token_type': token_type,
+        }, format='json')
+
+    def verify(self, access_token):
+        """
+        Verify the token against the published key set the way the services do
+        and return its claims
+        """
+        header, claims, signature = access_token.split('.')
+        [key] = self.client.get(SIGNING_KEYS_URL).data['keys']
+        self.assertEqual(json.loads(b64url_decode(header))['kid'], key['kid'])
+
+        public_key = Ed25519PublicKey.from_public_bytes(b64url_decode(key['x']))
+        public_key.verify(b64url_decode(signature), f'{header}.{claims}'.encode('ascii'))
+        return json.loads(b64url_decode(claims))
+
+    @override_settings(ACCESS_TOKEN_SIGNING_KEY=SIGNING_KEY)
+    def test_issue_and_verify(self):
+        response = self.login()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('token', response.data)
+        claims = self.verify(response.data['access_token'])
+        self.assertEqual(claims['sub'], str(self.user.id))
+        self.assertEqual(claims['email'], self.user.email)
+        self.assertEqual(claims['user_types'], ['test-reader'])
+        self.assertEqual(claims['permissions']['test-services'], {'private': 'read', 'public': 'read'})
+        self.assertGreater(claims['exp'], claims['iat'])
+
+    @override_settings(ACCESS_TOKEN_SIGNING_KEY=SIGNING_KEY)
+    def test_anonymous_sub_resource_is_read_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            UserResourcePermission.objects.create(user_type=self.user_type, sub_resource=self.public, permission=['write'])
+
+        claims = self.verify(self.login().data['access_token'])
+
+        # Matches check-user-permission, which only allows GET on anonymous sub resources
+        self.assertEqual(claims['permissions']['test-services']['public'], 'read')
+        self.assertEqual(self.check_user_permission(sub_resource='public', method='POST').status_code, 403)
+
+    @override_settings(ACCESS_TOKEN_SIGNING_KEY=SIGNING_KEY)
+    def test_tampered_token_does_not_verify(self):
+        header, claims, signature = self.login().data['access_token'].split('.')
+        tampered = json.loads(b64url_decode(claims))
+        tampered['permissions']['test-services']['private'] = 'admin'
+        tampered = base64.urlsafe_b64encode(json.dumps(tampered).encode()).rstrip(b'=').decode()
+
+        with self.assertRaises(InvalidSignature):
+            self.verify(f'{header}.{tampered}.{signature}')
+
+    @override_settings(ACCESS_TOKEN_SIGNING_KEY=SIGNING_KEY)
+    def test_knox_token_only_by_default(self):
+        response = self.login(token_type='')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('access_token', response.data)
+
+    @override_settings(ACCESS_TOKEN_SIGNING_KEY=None)
+    def test_refused_without_signing_key(self):
+        response = self.login()
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(AuthToken.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self.client.get(SIGNING_KEYS_URL).data, {'keys': []})
+
+    @override_settings(ACCESS_TOKEN_SIGNING_KEY='not-a-key')
+    def test_malformed_signing_key(self):
+        with self.assertRaises(ImproperlyConfigured):
+            access_token_signer.private_key
+
+
+class TokenIdentityCacheTests(AuthorizationTestCase):
+    def validate(self, token=None):
+        return self.client.post(VALIDATE_URL, headers={'Authorization': f'Token {token or self.token}'})
+
+    def test_repeated_validation_is_served_from_cache(self):
+        self.assertEqual(self.validate().status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.validate()
+        self.assertEqual(response.data['user']['email'], self.user.email)
+        self.assertEqual(response.data['user']['user_types'], ['test-reader'])
+
+    def test_identity_is_shared_with_permission_checks(self):
+        self.validate()
+        permission_matrix.ensure_built()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.check_user_permission().status_code, 200)
+
+    def test_invalid_token(self):
+        self.assertIsNone(resolve_token('not-a-token'))
+        self.assertEqual(self.validate('not-a-token').status_code, 401)
+
+    def test_user_change_evicts_identity(self):
+        self.validate()
+
+        self.user.first_name = 'Renamed'
+        self.user.save()
+
+        self.assertEqual(self.validate().data['user']['first_name'], 'Renamed')
+
+    def test_login_keeps_identity(self):
+        self.validate()
+
+        self.user.save(update_fields=['last_login'])
+
+        self.assertIsNotNone(token_identity_cache.get(hash_token(self.token)))
+
+    def test_user_type_rename_evicts_identity(self):
+        self.validate()
+
+        self.user_type.name = 'test-renamed'
+        self.user_type.save()
+
+        self.assertEqual(self.validate().data['user']['user_types'], ['test-renamed'])
+
+    def test_logout_evicts_identity(self):
+        self.validate()
+
+        AuthToken.objects.filter(user=self.user).delete()
+
+        self.assertIsNone(token_identity_cache.get(hash_token(self.token)))
+        self.assertEqual(self.validate().status_code, 401)
+
+    def test_identity_expires_with_token(self):
+        _, token = AuthToken.objects.create(self.user, expiry=timedelta(seconds=30))
+        self.assertIsNotNone(resolve_token(token))
+
+        later = time.monotonic() + 31
+        with mock.patch('authservice.cache.time.monotonic', return_value=later):
+            self.assertIsNone(token_identity_cache.get(hash_token(token)))
+
+
+class MunicipalStaffDerivationTests(TestCase):
+    def setUp(self):
+        self.staff = UserType.objects.create(name='test-staff', is_municipal_staff=True)
+        self.resident = UserType.objects.create(name='test-resident')
+        self.user = User.objects.create_user(email='staff@example.com', password='not-used-1234')
+        self.other = User.objects.create_user(email='other@example.com', password='not-used-1234')
+
+    def assertStaff(self, *users):
+        self.assertEqual(
+            [user.email for user in users if User.objects.get(pk=user.pk).is_municipal_staff],
+            [user.email for user in users],
+        )
+
+    def assertNotStaff(self, *users):
+        self.assertFalse(User.objects.filter(pk__in=[user.pk for user in users], is_municipal_staff=True).exists())
+
+    def test_add_and_remove(self):
+        self.user.user_types.add(self.resident)
+        self.assertNotStaff(self.user)
+
+        self.user.user_types.add(self.staff)
+        self.assertTrue(self.user.is_municipal_staff)
+        self.assertStaff(self.user)
+
+        self.user.user_types.remove(self.staff)
+        self.assertFalse(self.user.is_municipal_staff)
+        self.assertNotStaff(self.user)
+
+    def test_set_and_clear(self):
+        self.user.user_types.set([self.staff, self.resident])
+        self.assertStaff(self.user)
+
+        self.user.user_types.set([self.resident])
+        self.assertNotStaff(self.user)
+
+        self.user.user_types.add(self.staff)
+        self.user.user_types.clear()
+        self.assertFalse(self.user.is_municipal_staff)
+        self.assertNotStaff(self.user)
+
+    def test_changed_from_user_type_side(self):
+        self.staff.users.add(self.user, self.other)
+        self.assertStaff(self.user, self.other)
+
+        self.staff.users.remove(self.other)
+        self.assertStaff(self.user)
+        self.assertNotStaff(self.other)
+
+        self.staff.users.clear()
+        self.assertNotStaff(self.user, self.other)
+
+    def test_user_type_side_of_non_staff_type_updates_no_users(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.resident.users.add(self.user)
+
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+    def test_user_type_becomes_staff(self):
+        self.user.user_types.add(self.resident)
+
+        self.resident.is_municipal_staff = True
+        self.resident.save()
+        self.assertStaff(self.user)
+
+        self.resident.is_municipal_staff = False
+        self.resident.save()
+        self.assertNotStaff(self.user)
+
+    def test_other_staff_type_is_kept(self):
+        other_staff = UserType.objects.create(name='test-other-staff', is_municipal_staff=True)
+        self.user.user_types.add(self.staff, other_staff)
+
+        self.user.user_types.remove(self.staff)
+        self.assertStaff(self.user)
+
+        other_staff.delete()
+        self.assertNotStaff(self.user)
+
+
+class UserProvisioningTests(TestCase):
+    def setUp(self):
+        self.staff = UserType.objects.create(name='test-staff', is_municipal_staff=True)
+        self.resident = UserType.objects.create(name='test-resident')
+        User.objects.create_user(email='existing@example.com', password='not-used-1234')
+
+    def provision(self, text, file_format='csv', chunk_size=1000):
+        return UserProvisioner(chunk_size=chunk_size, workers=1).provision(read_rows(io.StringIO(text), file_format))
+
+    def test_csv(self):
+        report = self.provision(
+            'email,password,first_name,last_name,user_type_names\n'
+            'a@example.com,secret-1234,Ann,Smith,test-staff;test-resident\n'
+            'b@example.com,,Ben,,\n'
+        )
+
+        self.assertEqual(report, {'created': 2, 'failed': 0, 'errors': []})
+        ann = User.objects.get(email='a@example.com')
+        self.assertTrue(ann.check_password('secret-1234'))
+        self.assertTrue(ann.is_municipal_staff)
+        self.assertEqual(sorted(ann.user_types.values_list('name', flat=True)), ['test-resident', 'test-staff'])
+        ben = User.objects.get(email='b@example.com')
+        self.assertFalse(ben.has_usable_password())
+        self.assertFalse(ben.is_municipal_staff)
+
+    def test_csv_row_rejection(self):
+        report = self.provision(
+            'email,password,user_type_names\n'
+            'good@example.com,secret-1234,test-resident\n'
+            ',secret-1234,\n'
+            'not-an-email,secret-1234,\n'
+            'typo@example.com,secret-1234,test-unknown\n'
+            'good@example.com,secret-1234,\n'
+            'existing@example.com,secret-1234,\n'
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['failed'], 5)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4, 5, 6, 7])
+        self.assertEqual(report['errors'][0]['error'], 'Email is required')
+        self.assertIn('Unknown user types: test-unknown', report['errors'][2]['error'])
+        self.assertEqual(report['errors'][3]['error'], 'Duplicate email in this batch')
+        self.assertEqual(report['errors'][4]['error'], 'A user with this email already exists')
+        self.assertFalse(User.objects.filter(email__in=['not-an-email', 'typo@example.com']).exists())
+
+    def test_csv_unknown_column_is_rejected(self):
+        report = self.provision('email,password,role\nc@example.com,secret-1234,admin\n')
+
+        self.assertEqual(report['created'], 0)
+        self.assertEqual(report['errors'][0]['error'], 'Unknown fields: role')
+
+    def test_jsonl(self):
+        report = self.provision(
+            '{"email": "d@example.com", "user_type_names": "test-resident"}\n'
+            '\n'
+            'not json\n'
+            '["e@example.com"]\n',
+            file_format='jsonl',
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['line'] for error in report['errors']], [3, 4])
+        self.assertTrue(report['errors'][0]['error'].startswith('Invalid JSON'))
+        self.assertEqual(report['errors'][1]['error'], 'Each line must be a JSON object')
+
+    def test_csv_row_with_extra_cells_is_rejected(self):
+        report = self.provision(
+            'email,password\n'
+            'f@example.com,secret-1234,extra\n'
+            'g@example.com,secret-1234\n'
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual(report['errors'], [
+            {'line': 2, 'email': 'f@example.com', 'error': 'Unexpected extra cells'},
+        ])
+
+    def test_jsonl_values_of_the_wrong_type_are_rejected(self):
+        report = self.provision(
+            '{"email": 5}\n'
+            '{"email": "h@example.com", "password": 1234}\n'
+            '{"email": "i@example.com", "user_type_names": [1]}\n'
+            '{"email": "j@example.com", "user_type_names": {"name": "test-staff"}}\n'
+            '{"email": "k@example.com", "password": "secret-1234"}\n',
+            file_format='jsonl',
+        )
+
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['line'] for error in report['errors']], [1, 2, 3, 4])
+        self.assertEqual(report['errors'][0]['error'], 'Fields must be text: email')
+        self.assertEqual(report['errors'][1]['error'], 'Fields must be text: password')
+        self.assertEqual(report['errors'][2]['error'], 'user_type_names must be a name or a list of names')
+        self.assertEqual(report['errors'][3]['error'], 'user_type_names must be a name or a list of names')
+        self.assertTrue(User.objects.get(email='k@example.com').check_password('secret-1234'))
+
+    def test_chunks(self):
+        rows = ''.join(f'{{"email": "user{i}@example.com"}}\n' for i in range(5))
+
+        report = self.provision(rows, file_format='jsonl', chunk_size=2)
+
+        self.assertEqual(report['created'], 5)
+        self.assertEqual(User.objects.filter(email__startswith='user').count(), 5)
@@ -8,15 +8,17 @@ from rest_framework.urlpatterns import format_suffix_patterns
 from knox import views as knox_views
 
 # app imports
-from .views import CheckUserPermission, LoginView, CreateUserView, ValidateUserTokenView
+from .views import CheckUserPermission, CheckUserPermissionBatch, LoginView, CreateUserView, ValidateUserTokenView, SigningKeysView
 
 urlpatterns = [
     path('sign-up/', CreateUserView.as_view(), name='create_user'),
     path('check-user-permission/', CheckUserPermission.as_view(), name='check_user_permission'),
+    path('check-user-permissions/', CheckUserPermissionBatch.as_view(), name='check_user_permissions_batch'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', knox_views.LogoutView.as_view(), name='knox_logout'),
     path('logoutall/', knox_views.LogoutAllView.as_view(), name='knox_logoutall'),
     path('validate', ValidateUserTokenView.as_view(), name='validate_token'),
+    path('signing-keys/', SigningKeysView.as_view(), name='signing_keys'),
 ]
 
 urlpatterns = format_suffix_patterns(urlpatterns)
\ No newline at end of file
@@ -0,0 +1,268 @@
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from rest_framework.exceptions import AuthenticationFailed
+
+logger = logging.getLogger(__name__)
+
+# Status codes of auth server responses that are decisions and may be cached
+POSITIVE_STATUS_CODES = {200}
+NEGATIVE_STATUS_CODES = {401, 403}
+
+
+def credential_digest(credential):
+    """
+    Tokens and API keys are only kept in memory as digests
+    """
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode('utf-8')).hexdigest()
+
+
+def _create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=settings.AUTH_SERVER_POOL_SIZE,
+        max_retries=0,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+# One keep-alive connection pool to the auth server per process
+session = _create_session()
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the auth server is down. After `failure_threshold` consecutive
+    failures the circuit opens for `reset_seconds`, then a single trial call is let
+    through; its outcome closes the circuit or opens it again.
+    """
+
+    def __init__(self, failure_threshold, reset_seconds):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_progress or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_progress or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("Auth server circuit opened after %s failures", self._failures)
+                self._opened_at = time.monotonic()
+                self._trial_in_progress = False
+
+
+class PendingFetch:
+    """
+    A call to the auth server other threads wait on, with its result or exception once done
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class DecisionCache:
+    """
+    Bounded, thread safe TTL cache of auth server responses stored as (status code, body).
+    Threads asking for the same key while it is fetched wait for that fetch and share its
+    result or exception instead of calling the auth server themselves.
+
+    With `max_staleness` set, allowed decisions are kept that much longer and callers
+    passing `allow_stale` get them past their TTL while one thread refreshes them.
+    Denials are never served stale and a refresh that is denied replaces the allowed decision.
+    """
+
+    def __init__(self, ttl, negative_ttl, max_entries, max_staleness=0):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        # key -> (expires at, stale until, (status code, body))
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def _lookup(self, key, allow_stale):
+        """
+        Returns (cached result or None, whether the caller should refresh it in the background)
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+
+        expires_at, stale_until, result = entry
+        now = time.monotonic()
+        if expires_at > now:
+            self._entries.move_to_end(key)
+            return result, False
+        if stale_until <= now:
+            del self._entries[key]
+        elif allow_stale:
+            if key in self._inflight:
+                return result, False
+            self._inflight[key] = PendingFetch()
+            return result, True
+        return None, False
+
+    def get_or_fetch(self, key, fetch, allow_stale=False):
+        with self._lock:
+            cached, refresh = self._lookup(key, allow_stale)
+            pending = self._inflight.get(key)
+            leader = pending is None
+            if cached is None and leader:
+                pending = self._inflight[key] = PendingFetch()
+
+        if cached is not None:
+            if refresh:
+                threading.Thread(target=self._refresh, args=(key, fetch, pending), daemon=True).start()
+            return cached
+
+        if not leader:
+            # The timeout applies to connecting and to reading separately
+            if not pending.done.wait(timeout=2 * settings.AUTH_SERVER_TIMEOUT):
+                raise AuthenticationFailed('Authentication service unavailable')
+            if pending.error is not None:
+                raise pending.error
+            return pending.result
+
+        return self._fetch(key, fetch, pending)
+
+    def _fetch(self, key, fetch, pending):
+        try:
+            pending.result = fetch()
+            self._set(key, *pending.result)
+            return pending.result
+        except Exception as e:
+            pending.error = e
+            raise
+        finally:
+            self._finish(key)
+
+    def _refresh(self, key, fetch, pending):
+        try:
+            self._fetch(key, fetch, pending)
+        except Exception:
+            # Already logged by auth_server_request, the stale decision stays until it runs out
+            pass
+
+    def _finish(self, key):
+        with self._lock:
+            pending = self._inflight.pop(key, None)
+        if pending is not None:
+            pending.done.set()
+
+    def _set(self, key, status_code, body):
+        if status_code in POSITIVE_STATUS_CODES:
+            ttl = self.ttl
+            staleness = self.max_staleness
+        elif status_code in NEGATIVE_STATUS_CODES:
+            ttl = self.negative_ttl
+            staleness = 0
+        else:
+            # Errors keep a stale allowed decision in place until it runs out
+            return
+
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, expires_at + staleness, (status_code, body))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+circuit_breaker = CircuitBreaker(
+    failure_threshold=settings.AUTH_CIRCUIT_FAILURE_THRESHOLD,
+    reset_seconds=settings.AUTH_CIRCUIT_RESET_SECONDS,
+)
+
+decision_cache = DecisionCache(
+    ttl=settings.AUTH_CACHE_TTL,
+    negative_ttl=settings.AUTH_CACHE_NEGATIVE_TTL,
+    max_entries=settings.AUTH_CACHE_MAX_ENTRIES,
+    max_staleness=settings.AUTH_CACHE_MAX_STALENESS if settings.AUTH_STALE_WHILE_REVALIDATE else 0,
+)
+
+
+def auth_server_request(method, path, error_message, **kwargs):
+    """
+    Call the auth server through the pooled session and the circuit breaker.
+    Transport errors and 5xx responses count as failures and raise AuthenticationFailed.
+    """
+    if not circuit_breaker.allow():
+        raise AuthenticationFailed('Authentication service unavailable')
+
+    try:
+        response = session.request(
+            method,
+            f'{settings.AUTH_SERVER_URL}{path}',
+            timeout=settings.AUTH_SERVER_TIMEOUT,
+            **kwargs
+        )
+    except requests.Timeout:
+        circuit_breaker.record_failure()
+        logger.error(f"Auth server timeout calling {path}")
+        raise AuthenticationFailed('Authentication service unavailable')
+    except requests.RequestException as e:
+        circuit_breaker.record_failure()
+        logger.error(f"Auth server error calling {path}: {str(e)}")
+        raise AuthenticationFailed(error_message)
+
+    if response.status_code >= 500:
+        circuit_breaker.record_failure()
+    else:
+        circuit_breaker.record_success()
+    return response
+
+
+def cached_permission_check(cache_key, path, headers, error_message, allow_stale=False):
+    """
+    POST a permission check to the auth server at most once per cache key and TTL window,
+    returning (status code, body). Only read requests may pass `allow_stale`.
+    """
+    def fetch():
+        response = auth_server_request('POST', path, error_message, headers=headers)
+        try:
+            body = response.json()
+        except ValueError:
+            body = {}
+        return response.status_code, body
+
+    return decision_cache.get_or_fetch(cache_key, fetch, allow_stale)
@@ -8,12 +8,16 @@ class ResourceServerAuthentication(BaseAuthentication):
     1. Application permissions (via x-api-key)
     2. User permissions (via Authorization header)
     """
+    READ_METHODS = ('GET', 'HEAD')
+
     def authenticate(self, request):
         # Extract required headers
         api_key = request.headers.get('x-api-key')
         user_token = self._extract_user_token(request)
         resource = request.headers.get('x-resource')
         sub_resource = request.headers.get('x-sub-resource')
+        # Only reads may be authorised from an expired decision, see auth_client.DecisionCache
+        allow_stale = request.method in self.READ_METHODS
 
         auth_results = {
             'application': None,
@@ -23,7 +27,7 @@ class ResourceServerAuthentication(BaseAuthentication):
         # First verify application permissions
         if api_key and resource:
             try:
-                app_auth = PermissionValidator.check_application_permission(api_key, resource)
+                app_auth = PermissionValidator.check_application_permission(api_key, resource, allow_stale)
                 auth_results['application'] = app_auth
             except AuthenticationFailed as e:
                
@@ -34,7 +38,7 @@ class ResourceServerAuthentication(BaseAuthentication):
         if user_token and resource and sub_resource:
             try:
                 user_auth = PermissionValidator.check_user_permission(
-                    user_token, api_key, resource, sub_resource
+                    user_token, api_key, resource, sub_resource, allow_stale
                 )
                 auth_results['user'] = user_auth
             except AuthenticationFailed as e:
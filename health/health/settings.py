@@ -179,6 +179,25 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media/')
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_SERVER_URL = os.environ.get('AUTH_SERVER_URL')
+AUTH_SERVER_TIMEOUT = float(os.environ.get('AUTH_SERVER_TIMEOUT', 3))
+AUTH_SERVER_POOL_SIZE = int(os.environ.get('AUTH_SERVER_POOL_SIZE', 20))
+
+# Permission check answers are cached per credential, denials for a shorter time
+AUTH_CACHE_TTL = float(os.environ.get('AUTH_CACHE_TTL', 30))
+AUTH_CACHE_NEGATIVE_TTL = float(os.environ.get('AUTH_CACHE_NEGATIVE_TTL', 5))
+AUTH_CACHE_MAX_ENTRIES = int(os.environ.get('AUTH_CACHE_MAX_ENTRIES', 10000))
+
+# Opt-in: serve expired allowed decisions to read requests while they are refreshed
+AUTH_STALE_WHILE_REVALIDATE = os.environ.get('AUTH_STALE_WHILE_REVALIDATE', 'false').lower() in ('1', 'true', 'yes')
+AUTH_CACHE_MAX_STALENESS = float(os.environ.get('AUTH_CACHE_MAX_STALENESS', 300))
+
+# Consecutive auth server failures before failing fast, and for how long
+AUTH_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('AUTH_CIRCUIT_FAILURE_THRESHOLD', 5))
+AUTH_CIRCUIT_RESET_SECONDS = float(os.environ.get('AUTH_CIRCUIT_RESET_SECONDS', 30))
+
+# Signed access tokens issued by the auth server, verified locally
+ACCESS_TOKEN_ISSUER = os.environ.get('ACCESS_TOKEN_ISSUER', 'swakopmund-auth')
+SIGNING_KEYS_REFRESH_SECONDS = int(os.environ.get('SIGNING_KEYS_REFRESH_SECONDS', 3600))
 
 RUN_SERVER_PORT = 8001
 
@@ -0,0 +1,211 @@
+import threading
+import time
+from unittest import mock
+
+from django.test import SimpleTestCase
+from rest_framework.exceptions import AuthenticationFailed
+
+from .auth_client import CircuitBreaker, DecisionCache, auth_server_request
+
+
+class SlowFetch:
+    """
+    Stand-in for a call to the auth server that blocks until released and counts its calls
+    """
+
+    def __init__(self, result=(200, {'status': 'authorised'}), error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.calls += 1
+        self.release.wait(timeout=5)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def run_concurrently(target, count):
+    """
+    Call target from `count` threads, returns what each call returned or raised
+    """
+    outcomes = []
+
+    def run():
+        try:
+            outcomes.append(target())
+        except Exception as e:
+            outcomes.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, outcomes
+
+
+class DecisionCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = DecisionCache(ttl=30, negative_ttl=5, max_entries=100)
+
+    def burst(self, fetch, count=10):
+        threads, outcomes = run_concurrently(lambda: self.cache.get_or_fetch('key', fetch), count)
+        # Let every thread reach the cache before the fetch returns
+        time.sleep(0.1)
+        fetch.release.set()
+        for thread in threads:
+            thread.join()
+        return outcomes
+
+    def test_concurrent_misses_share_one_fetch(self):
+        fetch = SlowFetch()
+
+        outcomes = self.burst(fetch)
+
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(outcomes, [(200, {'status': 'authorised'})] * 10)
+        self.assertEqual(self.cache.get_or_fetch('key', SlowFetch()), (200, {'status': 'authorised'}))
+
+    def test_failed_fetch_is_shared_with_waiters(self):
+        error = AuthenticationFailed('Authentication service unavailable')
+        fetch = SlowFetch(error=error)
+
+        outcomes = self.burst(fetch)
+
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(outcomes, [error] * 10)
+
+    def test_uncacheable_result_is_shared_with_waiters(self):
+        fetch = SlowFetch(result=(500, {}))
+
+        outcomes = self.burst(fetch)
+
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(outcomes, [(500, {})] * 10)
+        # Not cached, the next call asks again
+        next_fetch = SlowFetch()
+        next_fetch.release.set()
+        self.cache.get_or_fetch('key', next_fetch)
+        self.assertEqual(next_fetch.calls, 1)
+
+    def test_denials_expire_after_negative_ttl(self):
+        self.cache._set('allowed', 200, {})
+        self.cache._set('denied', 403, {})
+        fetch = SlowFetch(result=(200, {'fetched': True}))
+        fetch.release.set()
+
+        later = time.monotonic() + 10
+        with mock.patch('health.auth_client.time.monotonic', return_value=later):
+            self.assertEqual(self.cache.get_or_fetch('allowed', fetch), (200, {}))
+            self.assertEqual(self.cache.get_or_fetch('denied', fetch), (200, {'fetched': True}))
+
+    def test_bounded(self):
+        cache = DecisionCache(ttl=30, negative_ttl=5, max_entries=2)
+        for key in ['a', 'b', 'c']:
+            cache._set(key, 200, {})
+
+        self.assertEqual(list(cache._entries), ['b', 'c'])
+
+
+class StaleWhileRevalidateTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = DecisionCache(ttl=30, negative_ttl=5, max_entries=100, max_staleness=300)
+        self.cache._set('key', 200, {'status': 'authorised'})
+        self.expired = mock.patch('health.auth_client.time.monotonic', return_value=time.monotonic() + 60)
+        self.expired.start()
+        self.addCleanup(self.expired.stop)
+
+    def wait_for_refresh(self):
+        for _ in range(50):
+            if 'key' not in self.cache._inflight:
+                return
+            time.sleep(0.01)
+        self.fail('The background refresh did not finish')
+
+    def test_stale_decision_served_while_refreshed_once(self):
+        fetch = SlowFetch(result=(200, {'status': 'refreshed'}))
+
+        for _ in range(3):
+            self.assertEqual(self.cache.get_or_fetch('key', fetch, allow_stale=True), (200, {'status': 'authorised'}))
+        fetch.release.set()
+        self.wait_for_refresh()
+
+        self.assertEqual(fetch.calls, 1)
+        self.assertEqual(self.cache._entries['key'][2], (200, {'status': 'refreshed'}))
+
+    def test_stale_decision_only_for_callers_allowing_it(self):
+        fetch = SlowFetch(result=(200, {'status': 'refreshed'}))
+        fetch.release.set()
+
+        self.assertEqual(self.cache.get_or_fetch('key', fetch), (200, {'status': 'refreshed'}))
+
+    def test_denied_refresh_replaces_decision(self):
+        fetch = SlowFetch(result=(403, {'error': 'Permission denied'}))
+        fetch.release.set()
+
+        self.cache.get_or_fetch('key', fetch, allow_stale=True)
+        self.wait_for_refresh()
+
+        self.assertEqual(self.cache.get_or_fetch('key', fetch, allow_stale=True), (403, {'error': 'Permission denied'}))
+
+    def test_failed_refresh_keeps_stale_decision(self):
+        fetch = SlowFetch(error=AuthenticationFailed('Authentication service unavailable'))
+        fetch.release.set()
+
+        self.cache.get_or_fetch('key', fetch, allow_stale=True)
+        self.wait_for_refresh()
+
+        self.assertEqual(self.cache.get_or_fetch('key', fetch, allow_stale=True), (200, {'status': 'authorised'}))
+
+
+class CircuitBreakerTests(SimpleTestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+
+    def test_opens_after_consecutive_failures(self):
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_success()
+        for _ in range(2):
+            self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow())
+
+        self.breaker.record_failure()
+        self.assertFalse(self.breaker.allow())
+
+    def test_single_trial_after_reset(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        with mock.patch('health.auth_client.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertTrue(self.breaker.allow())
+            # Only one trial call at a time
+            self.assertFalse(self.breaker.allow())
+
+            self.breaker.record_failure()
+            self.assertFalse(self.breaker.allow())
+
+    def test_successful_trial_closes(self):
+        for _ in range(3):
+            self.breaker.record_failure()
+
+        with mock.patch('health.auth_client.time.monotonic', return_value=time.monotonic() + 31):
+            self.assertTrue(self.breaker.allow())
+        self.breaker.record_success()
+
+        self.assertTrue(self.breaker.allow())
+        self.assertTrue(self.breaker.allow())
+
+    def test_open_circuit_fails_fast(self):
+        open_breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+        open_breaker.record_failure()
+
+        with mock.patch('health.auth_client.circuit_breaker', open_breaker), \
+                mock.patch('health.auth_client.session') as session:
+            with self.assertRaises(AuthenticationFailed):
+                auth_server_request('POST', '/api/auth/user/check-user-permission/', 'Failed')
+
+        session.request.assert_not_called()
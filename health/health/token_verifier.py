@@ -0,0 +1,142 @@
+import base64
+import json
+import logging
+import threading
+import time
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from django.conf import settings
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+
+from .auth_client import auth_server_request
+
+logger = logging.getLogger(__name__)
+
+# Minimum time between key refreshes triggered by an unknown key id
+SIGNING_KEYS_MIN_REFRESH_SECONDS = 30
+
+PERMISSION_LEVELS = ['read', 'write', 'admin']
+METHOD_TO_PERMISSION = {
+    'GET': 'read',
+    'POST': 'write',
+    'PUT': 'write',
+    'PATCH': 'write',
+    'DELETE': 'admin',
+}
+
+
+def _b64url_decode(data):
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def is_access_token(token):
+    """
+    Signed access tokens are JWS compact strings, knox tokens are plain hex
+    """
+    return token.count('.') == 2
+
+
+class SigningKeys:
+    """
+    Public keys published by the auth server, fetched and cached per process.
+    When a refresh fails the keys fetched last keep being used.
+    """
+
+    def __init__(self):
+        self._keys = {}
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, kid):
+        age = time.monotonic() - self._fetched_at
+        if age > settings.SIGNING_KEYS_REFRESH_SECONDS or (
+            kid not in self._keys and age > SIGNING_KEYS_MIN_REFRESH_SECONDS
+        ):
+            self.refresh()
+        return self._keys.get(kid)
+
+    def refresh(self):
+        with self._lock:
+            # Successful or not, refresh at most once per interval
+            now = time.monotonic()
+            if now - self._attempted_at < SIGNING_KEYS_MIN_REFRESH_SECONDS:
+                return
+            self._attempted_at = now
+
+            try:
+                response = auth_server_request(
+                    'GET', '/api/auth/user/signing-keys/', 'Failed to verify access token'
+                )
+                if response.status_code != 200:
+                    raise AuthenticationFailed(f'Auth server returned {response.status_code}')
+                keys = {
+                    key['kid']: Ed25519PublicKey.from_public_bytes(_b64url_decode(key['x']))
+                    for key in response.json().get('keys', [])
+                    if key.get('kty') == 'OKP' and key.get('crv') == 'Ed25519'
+                }
+            except (AuthenticationFailed, ValueError, KeyError) as e:
+                logger.warning(f"Could not refresh signing keys, keeping {len(self._keys)} known keys: {e}")
+                if not self._keys:
+                    raise AuthenticationFailed('Failed to verify access token')
+                return
+
+            self._keys = keys
+            self._fetched_at = now
+
+
+signing_keys = SigningKeys()
+
+
+def verify_access_token(token):
+    """
+    Verify the signature, issuer and expiry of a signed access token and return its claims
+    """
+    try:
+        encoded_header, encoded_claims, encoded_signature = token.split('.')
+        header = json.loads(_b64url_decode(encoded_header))
+        claims = json.loads(_b64url_decode(encoded_claims))
+        signature = _b64url_decode(encoded_signature)
+    except ValueError:
+        raise AuthenticationFailed('Invalid access token')
+
+    if header.get('alg') != 'EdDSA':
+        raise AuthenticationFailed('Invalid access token')
+
+    public_key = signing_keys.get(header.get('kid'))
+    if public_key is None:
+        raise AuthenticationFailed('Unknown signing key')
+
+    try:
+        public_key.verify(signature, f'{encoded_header}.{encoded_claims}'.encode('ascii'))
+    except InvalidSignature:
+        raise AuthenticationFailed('Invalid access token')
+
+    if claims.get('iss') != settings.ACCESS_TOKEN_ISSUER or claims.get('exp', 0) <= time.time():
+        raise AuthenticationFailed('Access token has expired')
+
+    return claims
+
+
+def authorise_claims(claims, resource, sub_resource, method='GET'):
+    """
+    Permission decision from the permissions carried in the token, in the same shape
+    as the auth server response. The token lists every sub resource the user may use,
+    anonymous ones included, so anything it does not list is denied. Anonymous sub
+    resources are listed as read, so like the auth server only GET is allowed on them.
+    """
+    permission = claims.get('permissions', {}).get(resource, {}).get(sub_resource)
+    if permission not in PERMISSION_LEVELS:
+        raise PermissionDenied('Permission denied')
+
+    required_permission = METHOD_TO_PERMISSION.get(method, 'read')
+    if PERMISSION_LEVELS.index(permission) < PERMISSION_LEVELS.index(required_permission):
+        raise PermissionDenied(f'Requires {required_permission} permission but only has {permission}')
+
+    return {
+        'status': 'authorised',
+        'user': {'id': int(claims['sub']), 'email': claims.get('email')},
+        'permission': permission,
+        'user_types': claims.get('user_types', []),
+    }
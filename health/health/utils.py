@@ -1,72 +1,68 @@
 # permissions.py
-import requests
-from django.conf import settings
 from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
 import logging
 
+from .auth_client import cached_permission_check, credential_digest
+from .token_verifier import authorise_claims, is_access_token, verify_access_token
+
 logger = logging.getLogger(__name__)
 
 class PermissionValidator:
     @staticmethod
-    def check_user_permission(user_token, api_key, resource, sub_resource):
+    def check_user_permission(user_token, api_key, resource, sub_resource, allow_stale=False):
         """
-        Verify user permissions by calling auth server endpoint
+        Verify user permissions by calling auth server endpoint, answers are cached per credential
         """
+        # Signed access tokens carry the user's permissions, no need to ask the auth server
+        if is_access_token(user_token):
+            claims = verify_access_token(user_token)
+            return authorise_claims(claims, resource, sub_resource)
+
         headers = {
             'Authorization': f'Token {user_token}',
             'x-api-key': api_key,
             'x-resource': resource,
             'x-sub-resource': sub_resource
         }
+        cache_key = ('user', credential_digest(user_token), credential_digest(api_key), resource, sub_resource)
 
-        try:
-            response = requests.post(
-                f'{settings.AUTH_SERVER_URL}/api/auth/user/check-user-permission/',
-                headers=headers,
-                timeout=3
-            )
+        status_code, body = cached_permission_check(
+            cache_key,
+            '/api/auth/user/check-user-permission/',
+            headers,
+            'Failed to verify user permissions',
+            allow_stale
+        )
 
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 403:
-                raise PermissionDenied(response.json().get('error', 'Permission denied'))
-            else:
-                raise AuthenticationFailed(response.json().get('error', 'Authentication failed'))
-
-        except requests.Timeout:
-            logger.error("Auth server timeout during user permission check")
-            raise AuthenticationFailed('Authentication service unavailable')
-        except requests.RequestException as e:
-            logger.error(f"Auth server error during user permission check: {str(e)}")
-            raise AuthenticationFailed('Failed to verify user permissions')
+        if status_code == 200:
+            return body
+        elif status_code == 403:
+            raise PermissionDenied(body.get('error', 'Permission denied'))
+        else:
+            raise AuthenticationFailed(body.get('error', 'Authentication failed'))
 
     @staticmethod
-    def check_application_permission(api_key, resource):
+    def check_application_permission(api_key, resource, allow_stale=False):
         """
-        Verify application permissions by calling auth server endpoint
+        Verify application permissions by calling auth server endpoint, answers are cached per API key
         """
         headers = {
             'x-api-key': api_key,
             'x-resource': resource
         }
+        cache_key = ('application', credential_digest(api_key), resource)
 
-        try:
-            response = requests.post(
-                f'{settings.AUTH_SERVER_URL}/api/auth/application/check_application_permission/',
-                headers=headers,
-                timeout=3
-            )
-
-            if response.status_code == 200:
-                return response.json()
-            elif response.status_code == 403:
-                raise PermissionDenied(response.json().get('error', 'Application permission denied'))
-            else:
-                raise AuthenticationFailed(response.json().get('error', 'Application authentication failed'))
+        status_code, body = cached_permission_check(
+            cache_key,
+            '/api/auth/application/check_application_permission/',
+            headers,
+            'Failed to verify application permissions',
+            allow_stale
+        )
 
-        except requests.Timeout:
-            logger.error("Auth server timeout during application permission check")
-            raise AuthenticationFailed('Authentication service unavailable')
-        except requests.RequestException as e:
-            logger.error(f"Auth server error during application permission check: {str(e)}")
-            raise AuthenticationFailed('Failed to verify application permissions')
\ No newline at end of file
+        if status_code == 200:
+            return body
+        elif status_code == 403:
+            raise PermissionDenied(body.get('error', 'Application permission denied'))
+        else:
+            raise AuthenticationFailed(body.get('error', 'Application authentication failed'))
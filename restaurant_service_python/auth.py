@@ -0,0 +1,166 @@
+import importlib.util
+import os
+
+import httpx
+from fastapi import Depends, Header, HTTPException, Request
+
+from auth_cache import auth_decision_cache, credential_digest
+
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
+
+RESOURCE_NAME = "restaurants-services"
+
+READ_METHODS = {"GET", "HEAD"}
+
+
+def create_auth_client() -> httpx.AsyncClient:
+    """
+    Client shared by all requests for the lifetime of the application, so connections
+    to the auth service are kept alive and reused. HTTP/2 is negotiated when h2 is installed.
+    """
+    return httpx.AsyncClient(
+        timeout=3.0,
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+
+
+def get_auth_client(request: Request) -> httpx.AsyncClient:
+    # Created in the lifespan in main, created here when the app runs without it
+    if getattr(request.app.state, "auth_client", None) is None:
+        request.app.state.auth_client = create_auth_client()
+    return request.app.state.auth_client
+
+
+async def _post_check(client: httpx.AsyncClient, url: str, headers: dict):
+    """
+    Ask the auth service, returning (status code, body) so the decision can be cached.
+    Transport errors are raised and never cached.
+    """
+    try:
+        response = await client.post(url, headers=headers)
+    except httpx.TimeoutException:
+        raise HTTPException(status_code=401, detail="Auth service timeout")
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=401, detail=f"Auth service error: {str(e)}")
+
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    return response.status_code, body
+
+
+async def check_user_permission(
+    client: httpx.AsyncClient,
+    user_token: str,
+    api_key: str,
+    sub_resource: str,
+    method: str = "GET",
+    allow_stale: bool = False,
+):
+    headers = {
+        "Authorization": f"Token {user_token}",
+        "x-api-key": api_key,
+        "x-resource": RESOURCE_NAME,
+        "x-sub-resource": sub_resource,
+        "x-method": method,
+    }
+
+    url = f"{AUTH_SERVICE_URL}/api/auth/user/check-user-permission/"
+    cache_key = (
+        "user",
+        credential_digest(user_token),
+        credential_digest(api_key),
+        RESOURCE_NAME,
+        sub_resource,
+        method,
+    )
+
+    status_code, body = await auth_decision_cache.get_or_fetch(
+        cache_key, lambda: _post_check(client, url, headers), allow_stale=allow_stale
+    )
+
+    if status_code == 200:
+        return body
+    elif status_code == 403:
+        raise HTTPException(status_code=403, detail=body.get("error", "Permission denied"))
+    else:
+        raise HTTPException(status_code=401, detail=body.get("error", "Authentication failed"))
+
+
+async def check_application_permission(
+    client: httpx.AsyncClient,
+    api_key: str,
+    method: str = "GET",
+    allow_stale: bool = False,
+):
+    headers = {"x-api-key": api_key, "x-resource": RESOURCE_NAME, "x-method": method}
+
+    url = f"{AUTH_SERVICE_URL}/api/auth/application/check_application_permission/"
+    cache_key = ("application", credential_digest(api_key), RESOURCE_NAME, method)
+
+    status_code, body = await auth_decision_cache.get_or_fetch(
+        cache_key, lambda: _post_check(client, url, headers), allow_stale=allow_stale
+    )
+
+    if status_code == 200:
+        return body
+    elif status_code == 403:
+        raise HTTPException(
+            status_code=403, detail=body.get("error", "Application permission denied")
+        )
+    else:
+        raise HTTPException(
+            status_code=401, detail=body.get("error", "Application authentication failed")
+        )
+
+
+def extract_user_token(authorization: str | None):
+    if not authorization:
+        return None
+    parts = authorization.split()
+    if len(parts) == 2 and parts[0].lower() == "token":
+        return parts[1]
+    return None
+
+
+def verify_auth(sub_resource: str, require_user: bool = False):
+    """
+    Dependency checking the application (x-api-key) and, when given, the user
+    (Authorization: Token) against the auth service for `sub_resource`.
+    A failed user check is only fatal when `require_user` is set.
+    """
+    async def dependency(
+        request: Request,
+        x_api_key: str = Header(None),
+        authorization: str = Header(None),
+        client: httpx.AsyncClient = Depends(get_auth_client),
+    ):
+        if not x_api_key:
+            raise HTTPException(status_code=401, detail="Missing required headers")
+
+        user_token = extract_user_token(authorization)
+        if require_user and not user_token:
+            raise HTTPException(status_code=401, detail="Missing authorization token")
+
+        # Only reads may be authorised from an expired decision, see auth_cache
+        allow_stale = request.method in READ_METHODS
+
+        app_auth = await check_application_permission(
+            client, x_api_key, request.method, allow_stale
+        )
+
+        user_auth = None
+        if user_token:
+            try:
+                user_auth = await check_user_permission(
+                    client, user_token, x_api_key, sub_resource, request.method, allow_stale
+                )
+            except HTTPException:
+                if require_user:
+                    raise
+
+        return {"app": app_auth, "user": user_auth}
+
+    return dependency
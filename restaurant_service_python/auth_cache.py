@@ -0,0 +1,188 @@
+# Copy of activities-service/service/app/services/auth_cache.py, do not edit it here.
+# Change the original and run activities-service/service/scripts/python/syncSharedModules.py.
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Awaitable, Callable, Hashable
+
+AUTH_CACHE_TTL = float(os.getenv("AUTH_CACHE_TTL", "30"))
+AUTH_CACHE_NEGATIVE_TTL = float(os.getenv("AUTH_CACHE_NEGATIVE_TTL", "5"))
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
+# Opt-in: serve expired allowed decisions to read requests while they are refreshed
+AUTH_STALE_WHILE_REVALIDATE = os.getenv("AUTH_STALE_WHILE_REVALIDATE", "false").lower() in ("1", "true", "yes")
+AUTH_CACHE_MAX_STALENESS = float(os.getenv("AUTH_CACHE_MAX_STALENESS", "300"))
+
+# Status codes of auth service responses that are decisions and may be cached
+POSITIVE_STATUS_CODES = {200}
+NEGATIVE_STATUS_CODES = {401, 403}
+
+
+def credential_digest(credential: str | None) -> str | None:
+    """Tokens and API keys are only kept in memory as digests."""
+    if not credential:
+        return None
+    return hashlib.sha256(credential.encode("utf-8")).hexdigest()
+
+
+class AuthDecisionCache:
+    """
+    Bounded in-process cache of auth service responses, stored as (status code, body).
+    Allowed decisions are kept for `ttl` seconds and 401/403 decisions for `negative_ttl`
+    seconds. Concurrent misses for the same key share one upstream call.
+    Transport errors are never cached.
+
+    With `max_staleness` set, allowed decisions are kept that much longer and callers
+    passing `allow_stale` get them past their TTL while one refresh runs in the
+    background. Denials are never served stale and a refresh that is denied replaces
+    the allowed decision.
+    """
+
+    def __init__(
+        self,
+        ttl: float,
+        negative_ttl: float,
+        max_entries: int,
+        max_staleness: float = 0,
+    ):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.max_staleness = max_staleness
+        # key -> (expires at, stale until, (status code, body))
+        self._entries: OrderedDict[
+            Hashable, tuple[float, float, tuple[int, dict]]
+        ] = OrderedDict()
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale_hits = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self._upstream_latencies = deque(maxlen=1000)
+
+    async def get_or_fetch(
+        self,
+        key: Hashable,
+        fetch: Callable[[], Awaitable[tuple[int, dict]]],
+        allow_stale: bool = False,
+    ) -> tuple[int, dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, stale_until, result = entry
+            now = time.monotonic()
+            if expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            if stale_until <= now:
+                del self._entries[key]
+            elif allow_stale:
+                self.stale_hits += 1
+                if key not in self._inflight:
+                    self._start_fetch(key, fetch).add_done_callback(
+                        _consume_exception
+                    )
+                return result
+
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = self._start_fetch(key, fetch)
+        else:
+            self.coalesced += 1
+
+        # A cancelled caller must not cancel the call the other callers wait on
+        return await asyncio.shield(task)
+
+    def _start_fetch(self, key, fetch) -> asyncio.Task:
+        task = asyncio.ensure_future(self._fetch(key, fetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fetch(self, key, fetch) -> tuple[int, dict]:
+        self.upstream_calls += 1
+        started = time.perf_counter()
+        try:
+            status_code, body = await fetch()
+        except Exception:
+            self.upstream_errors += 1
+            raise
+        finally:
+            self._upstream_latencies.append(time.perf_counter() - started)
+
+        self.set(key, status_code, body)
+        return status_code, body
+
+    def set(self, key: Hashable, status_code: int, body: dict):
+        if status_code in POSITIVE_STATUS_CODES:
+            ttl = self.ttl
+            staleness = self.max_staleness
+        elif status_code in NEGATIVE_STATUS_CODES:
+            ttl = self.negative_ttl
+            staleness = 0
+        else:
+            # Errors keep a stale allowed decision in place until it runs out
+            return
+
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        expires_at = time.monotonic() + ttl
+        self._entries[key] = (expires_at, expires_at + staleness, (status_code, body))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        served = self.hits + self.coalesced + self.stale_hits
+        lookups = served + self.misses
+        latencies = sorted(self._upstream_latencies)
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 2)
+
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "negative_ttl": self.negative_ttl,
+            "max_staleness": self.max_staleness,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale_hits": self.stale_hits,
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "upstream": {
+                "calls": self.upstream_calls,
+                "errors": self.upstream_errors,
+                "in_flight": len(self._inflight),
+                "p50_ms": percentile(50),
+                "p95_ms": percentile(95),
+                "p99_ms": percentile(99),
+            },
+        }
+
+
+def _consume_exception(task: asyncio.Task):
+    # Background refreshes have no caller to raise to, a failed one keeps the stale decision
+    if not task.cancelled():
+        task.exception()
+
+
+auth_decision_cache = AuthDecisionCache(
+    ttl=AUTH_CACHE_TTL,
+    negative_ttl=AUTH_CACHE_NEGATIVE_TTL,
+    max_entries=AUTH_CACHE_MAX_ENTRIES,
+    max_staleness=AUTH_CACHE_MAX_STALENESS if AUTH_STALE_WHILE_REVALIDATE else 0,
+)
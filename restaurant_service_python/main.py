@@ -8,14 +8,16 @@ from sqlalchemy import select
 from dotenv import load_dotenv
 from models import Base, RestaurantDB, ReviewDB
 from sqlalchemy.orm import selectinload
-import httpx
+from contextlib import asynccontextmanager
 
 # Load environment variables
 load_dotenv()
 
+# Reads its configuration from the environment on import
+from auth import create_auth_client, verify_auth
+
 # Configuration
 DATABASE_URL = os.getenv("DATABASE_URL")
-AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
 PORT = int(os.getenv("PORT", "8002"))
 HOST = os.getenv("HOST", "0.0.0.0")
 
@@ -25,7 +27,14 @@ async_session = async_sessionmaker(engine, expire_on_commit=False)
 
 from fastapi.middleware.cors import CORSMiddleware
 
-app = FastAPI(title="Swakopmund Restaurant Service", root_path="/api/restaurants")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client to the auth service for the lifetime of the application
+    app.state.auth_client = create_auth_client()
+    yield
+    await app.state.auth_client.aclose()
+
+app = FastAPI(title="Swakopmund Restaurant Service", root_path="/api/restaurants", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -85,42 +94,6 @@ async def get_db():
     async with async_session() as session:
         yield session
 
-# Authentication middleware
-async def verify_auth(
-    x_api_key: str = Header(None),
-    x_resource: str = Header(None),
-    x_sub_resource: str = Header(None),
-    authorization: str = Header(None)
-):
-    if not x_api_key or not x_resource:
-        raise HTTPException(status_code=401, detail="Missing required headers")
-    
-    # For anonymous endpoints, we only need to verify the API key
-    if x_sub_resource == "fetch-restaurants":
-        return True
-        
-    # For authenticated endpoints, we need both API key and user token
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Missing authorization token")
-        
-    # Verify with auth service
-    async with httpx.AsyncClient() as client:
-        try:
-            response = await client.post(
-                f"{AUTH_SERVICE_URL}/api/auth/verify",
-                headers={
-                    "x-api-key": x_api_key,
-                    "x-resource": x_resource,
-                    "x-sub-resource": x_sub_resource,
-                    "authorization": authorization
-                }
-            )
-            if response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid authentication")
-            return True
-        except Exception as e:
-            raise HTTPException(status_code=401, detail=str(e))
-
 @app.get("/", response_model=List[Restaurant])
 async def get_restaurants(
     name: Optional[str] = None,
@@ -128,7 +101,7 @@ async def get_restaurants(
     price_range: Optional[str] = None,
     is_featured: Optional[bool] = None,
     db: AsyncSession = Depends(get_db),
-    _: bool = Depends(verify_auth)
+    _: dict = Depends(verify_auth("fetch-restaurants"))
 ):
     query = select(RestaurantDB).options(selectinload(RestaurantDB.reviews))
     if name:
@@ -215,7 +188,7 @@ async def add_review(
     restaurant_id: int,
     review: Review,
     db: AsyncSession = Depends(get_db),
-    _: bool = Depends(verify_auth)
+    _: dict = Depends(verify_auth("review-restaurants", require_user=True))
 ):
     # Check restaurant exists
     result = await db.execute(select(RestaurantDB).where(RestaurantDB.id == restaurant_id).options(selectinload(RestaurantDB.reviews)))
@@ -0,0 +1,112 @@
+import httpx
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+import auth
+from auth_cache import auth_decision_cache
+
+
+@pytest.fixture
+def auth_calls():
+    return []
+
+
+@pytest.fixture
+def client(auth_calls, monkeypatch):
+    """
+    An app with one endpoint per verify_auth mode, checked against a mock auth service
+    that grants reads to everyone and writes to the "writer" token only
+    """
+
+    def handler(request):
+        auth_calls.append(request)
+        if request.headers.get("x-api-key") != "key":
+            return httpx.Response(403, json={"error": "Invalid API Key"})
+        if request.url.path.endswith("/check_application_permission/"):
+            return httpx.Response(200, json={"status": "authorised"})
+        if request.headers.get("authorization") == "Token invalid":
+            return httpx.Response(401, json={"error": "Invalid token"})
+        if request.headers.get("x-method") != "GET" and request.headers.get(
+            "authorization"
+        ) != "Token writer":
+            return httpx.Response(403, json={"error": "Permission denied"})
+        return httpx.Response(
+            200, json={"status": "authorised", "user": {"id": 1, "email": "a@a.com"}}
+        )
+
+    app = FastAPI()
+
+    @app.get("/restaurants")
+    def list_restaurants(auth_data: dict = Depends(auth.verify_auth("fetch-restaurants"))):
+        return auth_data
+
+    @app.post("/reviews")
+    def create_review(
+        auth_data: dict = Depends(auth.verify_auth("review-restaurants", require_user=True))
+    ):
+        return auth_data
+
+    app.state.auth_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(auth, "AUTH_SERVICE_URL", "http://auth")
+    auth_decision_cache.clear()
+    yield TestClient(app)
+    auth_decision_cache.clear()
+
+
+def headers(token=None, api_key="key"):
+    headers = {"x-api-key": api_key}
+    if token:
+        headers["Authorization"] = f"Token {token}"
+    return headers
+
+
+def test_verify_auth___sends_request_method(client, auth_calls):
+    client.get("/restaurants", headers=headers("reader"))
+    client.post("/reviews", headers=headers("writer"))
+
+    assert [call.headers["x-method"] for call in auth_calls] == [
+        "GET",
+        "GET",
+        "POST",
+        "POST",
+    ]
+
+
+def test_verify_auth___method_is_part_of_cache_key(client, auth_calls):
+    assert client.get("/restaurants", headers=headers("reader")).status_code == 200
+    assert client.post("/reviews", headers=headers("reader")).status_code == 403
+    assert client.get("/restaurants", headers=headers("reader")).status_code == 200
+
+    assert len(auth_calls) == 4
+
+
+def test_verify_auth___user_is_optional_for_anonymous_endpoints(client):
+    response = client.get("/restaurants", headers=headers())
+
+    assert response.status_code == 200
+    assert response.json()["user"] is None
+    # A failed user check does not fail an endpoint that does not require a user
+    response = client.get("/restaurants", headers=headers("invalid"))
+    assert response.status_code == 200
+    assert response.json()["user"] is None
+
+
+def test_verify_auth___user_required(client):
+    assert client.post("/reviews", headers=headers()).status_code == 401
+    assert client.post("/reviews", headers=headers("invalid")).status_code == 401
+    response = client.post("/reviews", headers=headers("writer"))
+    assert response.status_code == 200
+    assert response.json()["user"]["user"]["id"] == 1
+
+
+def test_verify_auth___api_key_required(client):
+    assert client.get("/restaurants", headers={}).status_code == 401
+    assert client.get("/restaurants", headers=headers(api_key="wrong")).status_code == 403
+
+
+def test_verify_auth___decisions_are_cached(client, auth_calls):
+    for _ in range(3):
+        client.get("/restaurants", headers=headers("reader"))
+
+    assert len(auth_calls) == 2
@@ -1,4 +1,6 @@
 import datetime
+import logging
+from typing import Optional
 import uuid
 from sqlalchemy.orm import Session
 
@@ -9,6 +11,9 @@ from app.models.dto.models import (
     UpdateMissedWastePickupStatusDto,
 )
 from app.models.enums.enums import MissedWastePickupStatusEnum
+from app.pagination import InvalidCursor, paginate
+
+logger = logging.getLogger(__name__)
 
 # ---- missed_waste_pickups ----
 
@@ -47,8 +52,8 @@ def create_missed_waste_pickup(
         db.commit()
         db.refresh(missed_waste_pickup)
         return missed_waste_pickup, 201, ""
-    except Exception as e:
-        print(f"Error creating missed waste pickup: {e}")
+    except Exception:
+        logger.exception("Error creating missed waste pickup")
         return None, 500, "An error occurred while creating the missed waste pickup"
 
 
@@ -59,7 +64,12 @@ def search_missed_waste_pickups(
     sort_order: str = "asc",
     limit: int = 10,
     page: int = 1,
-) -> list[MissedWastePickupSearchResultDto]:
+    cursor: Optional[str] = None,
+) -> tuple[list[MissedWastePickupSearchResultDto], Optional[str]]:
+    """
+    Returns one page of missed waste pickups and the cursor of the next page,
+    see app.pagination
+    """
     try:
         if sort_order not in ["asc", "desc"]:
             sort_order = "asc"
@@ -70,20 +80,27 @@ def search_missed_waste_pickups(
         if page < 1:
             page = 1
 
-        offset = (page - 1) * limit
-
         query = db.query(MissedWastePickups).filter(
             (MissedWastePickups.description.ilike(f"%{search_term}%"))
             | (MissedWastePickups.address.ilike(f"%{search_term}%"))
         )
 
         if len(sort_field) > 0:
-            if sort_order == "asc":
-                query = query.order_by(getattr(MissedWastePickups, sort_field).asc())
-            else:
-                query = query.order_by(getattr(MissedWastePickups, sort_field).desc())
-
-        missed_waste_pickups = query.offset(offset).limit(limit).all()
+            sort_column = getattr(MissedWastePickups, sort_field)
+            descending = sort_order == "desc"
+        else:
+            sort_field, sort_column, descending = "id", MissedWastePickups.id, False
+
+        missed_waste_pickups, next_cursor = paginate(
+            query,
+            sort_field,
+            sort_column,
+            MissedWastePickups.id,
+            descending,
+            limit,
+            page,
+            cursor,
+        )
 
         return_data = [
             MissedWastePickupSearchResultDto(
@@ -97,10 +114,12 @@ def search_missed_waste_pickups(
             for item in missed_waste_pickups
         ]
 
-        return return_data
-    except Exception as e:
-        print(f"Error searching missed waste pickups: {e}")
-        return []
+        return return_data, next_cursor
+    except InvalidCursor:
+        raise
+    except Exception:
+        logger.exception("Error searching missed waste pickups")
+        return [], None
 
 
 def get_missed_waste_pickup_details(
@@ -120,8 +139,8 @@ def get_missed_waste_pickup_details(
             userId=str(item.userId),
         )
 
-    except Exception as e:
-        print(f"Error getting missed waste pickups: {e}")
+    except Exception:
+        logger.exception("Error getting missed waste pickups")
         return None
 
 
@@ -147,8 +166,8 @@ def update_missed_waste_pickup_status(
         missed_waste_pickup.status = data.status
         db.commit()
         return True, 200, ""
-    except Exception as e:
-        print(f"Error updating missed waste pickup status: {e}")
+    except Exception:
+        logger.exception("Error updating missed waste pickup status")
         return (
             False,
             500,
@@ -0,0 +1,63 @@
+# Copy of activities-service/service/app/logging_config.py, do not edit it here.
+# Change the original and run activities-service/service/scripts/python/syncSharedModules.py.
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+
+# Attributes every LogRecord has, anything else was passed in `extra` and is a field
+_RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line with the message and the fields passed in `extra`"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S%z"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """
+    Route all records through a queue to a listener thread that writes them to stdout,
+    so logging never blocks the event loop on console I/O. Safe to call more than once.
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(
+            logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
+        )
+
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+
+    _listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    _listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(_listener.stop)
@@ -1,24 +1,43 @@
-from typing import List
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager
+from typing import List, Optional
+from fastapi import FastAPI, Depends, HTTPException, Response
 from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 
 from app import crud
 from app.database import Base, SessionLocal, get_engine
+from app.logging_config import configure_logging
 from app.models.dto.models import (
     CreateMissedWastePickupDto,
     MissedWastePickupSearchResultDto,
     UpdateMissedWastePickupStatusDto,
 )
-from app.services.auth_service import RESOURCE_NAME, authenticate_request_with_user
+from app.pagination import NEXT_CURSOR_HEADER, InvalidCursor
+from app.services.auth_service import (
+    RESOURCE_NAME,
+    authenticate_request_with_user,
+    create_auth_client,
+)
+
+configure_logging()
 
 Base.metadata.create_all(bind=get_engine())
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One pooled client to the auth service for the lifetime of the application
+    app.state.auth_client = create_auth_client()
+    yield
+    await app.state.auth_client.aclose()
+
+
 app = FastAPI(
     title="Waste management service",
     description="Manages waste management operations",
     version="1.0.0",
     openapi_tags=[],
+    lifespan=lifespan,
 )
 
 
@@ -63,24 +82,33 @@ def create_missed_waste_pickup(
     responses={200: {"description": "list of missed waste pickups"}},
 )
 def get_missed_waste_pickups(
+    response: Response,
     search_term: str = "",
     sort_field: str = "id",
     sort_order: str = "desc",
     limit: int = 10,
     page: int = 1,
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db),
     auth_data: dict = Depends(
         authenticate_request_with_user(RESOURCE_NAME, "missed-waste-pickups", "search")
     ),
 ):
-    results = crud.search_missed_waste_pickups(
-        db=db,
-        search_term=search_term,
-        sort_field=sort_field,
-        sort_order=sort_order,
-        limit=limit,
-        page=page,
-    )
+    try:
+        results, next_cursor = crud.search_missed_waste_pickups(
+            db=db,
+            search_term=search_term,
+            sort_field=sort_field,
+            sort_order=sort_order,
+            limit=limit,
+            page=page,
+            cursor=cursor,
+        )
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return results
 
 
@@ -0,0 +1,155 @@
+# Copy of activities-service/service/app/services/access_token_verifier.py, do not edit it here.
+# Change the original and run activities-service/service/scripts/python/syncSharedModules.py.
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+
+import httpx
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PublicKey
+from fastapi import HTTPException
+from starlette.status import HTTP_401_UNAUTHORIZED, HTTP_403_FORBIDDEN
+
+logger = logging.getLogger(__name__)
+
+AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
+ACCESS_TOKEN_ISSUER = os.getenv("ACCESS_TOKEN_ISSUER", "swakopmund-auth")
+SIGNING_KEYS_REFRESH_SECONDS = int(os.getenv("SIGNING_KEYS_REFRESH_SECONDS", "3600"))
+# minimum time between key refreshes triggered by an unknown key id
+SIGNING_KEYS_MIN_REFRESH_SECONDS = 30
+
+PERMISSION_LEVELS = ["read", "write", "admin"]
+METHOD_TO_PERMISSION = {
+    "GET": "read",
+    "POST": "write",
+    "PUT": "write",
+    "PATCH": "write",
+    "DELETE": "admin",
+}
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def is_access_token(token: str) -> bool:
+    """Signed access tokens are JWS compact strings, knox tokens are plain hex."""
+    return token.count(".") == 2
+
+
+class SigningKeys:
+    """
+    Public keys published by the auth service, fetched and cached per process.
+    When a refresh fails the keys fetched last keep being used.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, Ed25519PublicKey] = {}
+        self._fetched_at = 0.0
+        self._attempted_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def get(self, client: httpx.AsyncClient, kid: str) -> Ed25519PublicKey | None:
+        age = time.monotonic() - self._fetched_at
+        if age > SIGNING_KEYS_REFRESH_SECONDS or (
+            kid not in self._keys and age > SIGNING_KEYS_MIN_REFRESH_SECONDS
+        ):
+            await self.refresh(client)
+        return self._keys.get(kid)
+
+    async def refresh(self, client: httpx.AsyncClient):
+        async with self._lock:
+            # Successful or not, refresh at most once per interval
+            now = time.monotonic()
+            if now - self._attempted_at < SIGNING_KEYS_MIN_REFRESH_SECONDS:
+                return
+            self._attempted_at = now
+
+            url = f"{AUTH_SERVICE_URL}/api/auth/user/signing-keys/"
+            try:
+                response = await client.get(url)
+                response.raise_for_status()
+                keys = {
+                    key["kid"]: Ed25519PublicKey.from_public_bytes(
+                        _b64url_decode(key["x"])
+                    )
+                    for key in response.json().get("keys", [])
+                    if key.get("kty") == "OKP" and key.get("crv") == "Ed25519"
+                }
+            except (httpx.HTTPError, ValueError, KeyError) as e:
+                logger.warning(
+                    "Could not refresh signing keys, keeping %d known keys: %s",
+                    len(self._keys),
+                    e,
+                )
+                if not self._keys:
+                    raise HTTPException(
+                        status_code=HTTP_401_UNAUTHORIZED,
+                        detail=f"Auth service error: {str(e)}",
+                    )
+                return
+
+            self._keys = keys
+            self._fetched_at = now
+
+
+signing_keys = SigningKeys()
+
+
+async def verify_access_token(client: httpx.AsyncClient, token: str) -> dict:
+    """Verify the signature, issuer and expiry of a signed access token and return its claims."""
+    try:
+        encoded_header, encoded_claims, encoded_signature = token.split(".")
+        header = json.loads(_b64url_decode(encoded_header))
+        claims = json.loads(_b64url_decode(encoded_claims))
+        signature = _b64url_decode(encoded_signature)
+    except ValueError:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid access token")
+
+    if header.get("alg") != "EdDSA":
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid access token")
+
+    public_key = await signing_keys.get(client, header.get("kid"))
+    if public_key is None:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Unknown signing key")
+
+    try:
+        public_key.verify(signature, f"{encoded_header}.{encoded_claims}".encode("ascii"))
+    except InvalidSignature:
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid access token")
+
+    if claims.get("iss") != ACCESS_TOKEN_ISSUER or claims.get("exp", 0) <= time.time():
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Access token has expired")
+
+    return claims
+
+
+def authorise_claims(
+    claims: dict, resource: str, sub_resource: str, method: str = "GET"
+) -> dict:
+    """
+    Permission decision from the permissions carried in the token, in the same shape
+    as the auth service response. The token lists every sub resource the user may use,
+    anonymous ones included, so anything it does not list is denied. Anonymous sub
+    resources are listed as read, so like the auth service only GET is allowed on them.
+    """
+    permission = claims.get("permissions", {}).get(resource, {}).get(sub_resource)
+    if permission not in PERMISSION_LEVELS:
+        raise HTTPException(status_code=HTTP_403_FORBIDDEN, detail="Permission denied")
+
+    required_permission = METHOD_TO_PERMISSION.get(method, "read")
+    if PERMISSION_LEVELS.index(permission) < PERMISSION_LEVELS.index(required_permission):
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail=f"Requires {required_permission} permission but only has {permission}",
+        )
+
+    return {
+        "status": "authorised",
+        "user": {"id": int(claims["sub"]), "email": claims.get("email")},
+        "permission": permission,
+        "user_types": claims.get("user_types", []),
+    }
@@ -1,21 +1,63 @@
 from fastapi import Header, Request, HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import httpx
+import importlib.util
+import logging
 import os
+import time
 from starlette.status import HTTP_403_FORBIDDEN, HTTP_401_UNAUTHORIZED
 
 from app.models.dto.models import AuthenticatedUserDTO
+from app.services.access_token_verifier import (
+    authorise_claims,
+    is_access_token,
+    verify_access_token,
+)
+from app.services.auth_cache import auth_decision_cache, credential_digest
 
 AUTH_SERVICE_URL = os.getenv("AUTH_SERVICE_URL")
 
 bearer_scheme = HTTPBearer()
 
+logger = logging.getLogger(__name__)
+
 RESOURCE_NAME = "waste-services"
 
+READ_METHODS = {"GET", "HEAD"}
+
+
+def create_auth_client() -> httpx.AsyncClient:
+    """
+    Client shared by all requests for the lifetime of the application, so connections
+    to the auth service are kept alive and reused. HTTP/2 is negotiated when h2 is installed.
+    """
+    return httpx.AsyncClient(
+        timeout=3.0,
+        http2=importlib.util.find_spec("h2") is not None,
+        limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+    )
+
+
+def get_auth_client(request: Request) -> httpx.AsyncClient:
+    # Created in the lifespan in app.main, created here when the app runs without it (e.g. tests)
+    if getattr(request.app.state, "auth_client", None) is None:
+        request.app.state.auth_client = create_auth_client()
+    return request.app.state.auth_client
+
 
 async def check_user_permission(
-    user_token: str, api_key: str, resource: str, sub_resource: str
+    client: httpx.AsyncClient,
+    user_token: str,
+    api_key: str,
+    resource: str,
+    sub_resource: str,
+    allow_stale: bool = False,
 ):
+    # Signed access tokens carry the user's permissions, no need to ask the auth service
+    if is_access_token(user_token):
+        claims = await verify_access_token(client, user_token)
+        return authorise_claims(claims, resource, sub_resource)
+
     headers = {
         "Authorization": f"Token {user_token}",
         "x-api-key": api_key,
@@ -24,58 +66,66 @@ async def check_user_permission(
     }
 
     url = f"{AUTH_SERVICE_URL}/api/auth/user/check-user-permission/"
-
-    try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            response = await client.post(url, headers=headers)
-
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 403:
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN,
-                detail=response.json().get("error", "Permission denied"),
-            )
-        else:
-            raise HTTPException(
-                status_code=HTTP_401_UNAUTHORIZED,
-                detail=response.json().get("error", "Authentication failed"),
-            )
-
-    except httpx.TimeoutException:
+    cache_key = (
+        "user",
+        credential_digest(user_token),
+        credential_digest(api_key),
+        resource,
+        sub_resource,
+    )
+
+    # Concurrent checks for the same credentials share one call to the auth service
+    status_code, body = await auth_decision_cache.get_or_fetch(
+        cache_key, lambda: _post_check(client, url, headers), allow_stale=allow_stale
+    )
+
+    if status_code == 200:
+        return body
+    elif status_code == 403:
         raise HTTPException(
-            status_code=HTTP_401_UNAUTHORIZED, detail="Auth service timeout"
+            status_code=HTTP_403_FORBIDDEN,
+            detail=body.get("error", "Permission denied"),
         )
-    except httpx.RequestError as e:
+    else:
         raise HTTPException(
-            status_code=HTTP_401_UNAUTHORIZED, detail=f"Auth service error: {str(e)}"
+            status_code=HTTP_401_UNAUTHORIZED,
+            detail=body.get("error", "Authentication failed"),
         )
 
 
-async def check_application_permission(api_key: str, resource: str):
+async def check_application_permission(
+    client: httpx.AsyncClient, api_key: str, resource: str, allow_stale: bool = False
+):
     headers = {"x-api-key": api_key, "x-resource": resource}
 
     url = f"{AUTH_SERVICE_URL}/api/auth/application/check_application_permission/"
+    cache_key = ("application", credential_digest(api_key), resource)
 
-    try:
-        async with httpx.AsyncClient(timeout=3.0) as client:
-            response = await client.post(url, headers=headers)
-
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 403:
-            raise HTTPException(
-                status_code=HTTP_403_FORBIDDEN,
-                detail=response.json().get("error", "Application permission denied"),
-            )
-        else:
-            raise HTTPException(
-                status_code=HTTP_401_UNAUTHORIZED,
-                detail=response.json().get(
-                    "error", "Application authentication failed"
-                ),
-            )
+    status_code, body = await auth_decision_cache.get_or_fetch(
+        cache_key, lambda: _post_check(client, url, headers), allow_stale=allow_stale
+    )
 
+    if status_code == 200:
+        return body
+    elif status_code == 403:
+        raise HTTPException(
+            status_code=HTTP_403_FORBIDDEN,
+            detail=body.get("error", "Application permission denied"),
+        )
+    else:
+        raise HTTPException(
+            status_code=HTTP_401_UNAUTHORIZED,
+            detail=body.get("error", "Application authentication failed"),
+        )
+
+
+async def _post_check(client: httpx.AsyncClient, url: str, headers: dict):
+    """
+    Ask the auth service, returning (status code, body) so the decision can be cached.
+    Transport errors are raised and never cached.
+    """
+    try:
+        response = await client.post(url, headers=headers)
     except httpx.TimeoutException:
         raise HTTPException(
             status_code=HTTP_401_UNAUTHORIZED, detail="Auth service timeout"
@@ -85,6 +135,12 @@ async def check_application_permission(api_key: str, resource: str):
             status_code=HTTP_401_UNAUTHORIZED, detail=f"Auth service error: {str(e)}"
         )
 
+    try:
+        body = response.json()
+    except ValueError:
+        body = {}
+    return response.status_code, body
+
 
 def get_auth_headers(resource: str, sub_resource: str, method: str):
     def dependency():
@@ -99,7 +155,9 @@ def get_auth_headers(resource: str, sub_resource: str, method: str):
 
 def authenticate_request(_resource: str, _sub_resource: str, _method: str):
     async def dependency(
-        request: Request, override_value: dict = Depends(authentication_override)
+        request: Request,
+        override_value: dict = Depends(authentication_override),
+        client: httpx.AsyncClient = Depends(get_auth_client),
     ):
         if override_value is not None:
             return override_value
@@ -109,38 +167,76 @@ def authenticate_request(_resource: str, _sub_resource: str, _method: str):
         resource = _resource
         sub_resource = _sub_resource
 
-        print(f"API Key: {api_key}")
-        print(f"User Token: {user_token}")
-        print(f"Resource: {resource}")
-        print(f"Sub Resource: {sub_resource}")
-
         app_auth = None
         user_auth = None
+        error = None
+        # Only reads may be authorised from an expired decision, see auth_cache
+        allow_stale = request.method in READ_METHODS
+        started = time.perf_counter()
 
         if api_key and resource:
             try:
-                app_auth = await check_application_permission(api_key, resource)
-            except HTTPException:
+                app_auth = await check_application_permission(
+                    client, api_key, resource, allow_stale
+                )
+            except HTTPException as e:
                 if not user_token:
-                    raise
+                    error = e
 
-        if user_token and resource and sub_resource:
+        if error is None and user_token and resource and sub_resource:
             try:
                 user_auth = await check_user_permission(
-                    user_token, api_key, resource, sub_resource
+                    client, user_token, api_key, resource, sub_resource, allow_stale
                 )
-            except HTTPException:
+            except HTTPException as e:
                 if not app_auth:
-                    raise
+                    error = e
+
+        if error is None and not app_auth and not user_auth:
+            error = HTTPException(status_code=401, detail="Authentication failed")
 
-        if not app_auth and not user_auth:
-            raise HTTPException(status_code=401, detail="Authentication failed")
+        _log_authentication(request, resource, sub_resource, started, error, user_auth)
+        if error is not None:
+            raise error
 
         return {"app": app_auth, "user": user_auth}
 
     return dependency
 
 
+def _log_authentication(
+    request: Request,
+    resource: str,
+    sub_resource: str,
+    started: float,
+    error: HTTPException | None,
+    user_auth: dict | None,
+):
+    """
+    Record how long the auth checks took on request.state.auth_ms and log the outcome.
+    Credentials are never logged.
+    """
+    auth_ms = round((time.perf_counter() - started) * 1000, 2)
+    request.state.auth_ms = auth_ms
+
+    level = logging.INFO if error is not None else logging.DEBUG
+    if not logger.isEnabledFor(level):
+        return
+    logger.log(
+        level,
+        "Authentication failed" if error is not None else "Request authenticated",
+        extra={
+            "method": request.method,
+            "path": request.url.path,
+            "resource": resource,
+            "sub_resource": sub_resource,
+            "auth_ms": auth_ms,
+            "status_code": error.status_code if error is not None else 200,
+            "user_id": (user_auth or {}).get("user", {}).get("id"),
+        },
+    )
+
+
 def authenticate_request_with_user(_resource: str, _sub_resource: str, _method: str):
     async def dependency(
         auth_data: dict = Depends(
@@ -173,15 +269,15 @@ def extract_user_token(request: Request):
 
 async def authenticate_user(
     credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    client: httpx.AsyncClient = Depends(get_auth_client),
 ) -> AuthenticatedUserDTO:
     token = credentials.credentials
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{AUTH_SERVICE_URL}/api/auth/user/info",
-                headers={"Authorization": f"Bearer {token}"},
-                timeout=10.0,
-            )
+        response = await client.get(
+            f"{AUTH_SERVICE_URL}/api/auth/user/info",
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=10.0,
+        )
 
         if response.status_code != 200:
             raise HTTPException(status_code=401, detail="Invalid token")
@@ -0,0 +1,172 @@
+import asyncio
+import base64
+import json
+import time
+
+import httpx
+import pytest
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives.serialization import Encoding, PublicFormat
+from fastapi import HTTPException
+
+from app.services import access_token_verifier, auth_service
+from app.services.access_token_verifier import SigningKeys
+
+PRIVATE_KEY = Ed25519PrivateKey.generate()
+KID = "test-key"
+
+
+def b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def sign(permissions: dict, expires_in: int = 300) -> str:
+    header = {"alg": "EdDSA", "typ": "JWT", "kid": KID}
+    claims = {
+        "iss": access_token_verifier.ACCESS_TOKEN_ISSUER,
+        "sub": "1",
+        "email": "a@a.com",
+        "user_types": ["resident"],
+        "permissions": permissions,
+        "exp": int(time.time()) + expires_in,
+    }
+    signing_input = ".".join(
+        b64url_encode(json.dumps(part).encode("utf-8")) for part in (header, claims)
+    )
+    signature = PRIVATE_KEY.sign(signing_input.encode("ascii"))
+    return f"{signing_input}.{b64url_encode(signature)}"
+
+
+@pytest.fixture
+def auth_service_state():
+    """Whether the mock auth service is up and the requests it received"""
+    return {"up": True, "calls": []}
+
+
+@pytest.fixture
+def auth_client(auth_service_state, monkeypatch):
+    public_key = PRIVATE_KEY.public_key().public_bytes(Encoding.Raw, PublicFormat.Raw)
+
+    async def handler(request):
+        auth_service_state["calls"].append(request)
+        if not auth_service_state["up"]:
+            raise httpx.ConnectError("Auth service is down")
+        if request.url.path == "/api/auth/user/signing-keys/":
+            return httpx.Response(
+                200,
+                json={
+                    "keys": [
+                        {
+                            "kty": "OKP",
+                            "crv": "Ed25519",
+                            "kid": KID,
+                            "x": b64url_encode(public_key),
+                        }
+                    ]
+                },
+            )
+        return httpx.Response(401, json={"error": "Invalid token"})
+
+    monkeypatch.setattr(access_token_verifier, "AUTH_SERVICE_URL", "http://auth")
+    monkeypatch.setattr(auth_service, "AUTH_SERVICE_URL", "http://auth")
+    monkeypatch.setattr(access_token_verifier, "signing_keys", SigningKeys())
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def check(client, token, method="GET"):
+    async def run():
+        claims = await access_token_verifier.verify_access_token(client, token)
+        return access_token_verifier.authorise_claims(
+            claims, "waste-services", "missed-waste-pickups", method
+        )
+
+    return asyncio.run(run())
+
+
+def test_verify_access_token___authorised_from_claims(auth_client):
+    token = sign({"waste-services": {"missed-waste-pickups": "write"}})
+
+    result = check(auth_client, token, "POST")
+
+    assert result["user"] == {"id": 1, "email": "a@a.com"}
+    assert result["permission"] == "write"
+
+
+def test_verify_access_token___insufficient_permission_is_403(auth_client):
+    token = sign({"waste-services": {"missed-waste-pickups": "read"}})
+
+    with pytest.raises(HTTPException) as e:
+        check(auth_client, token, "DELETE")
+    assert e.value.status_code == 403
+
+
+def test_verify_access_token___anonymous_sub_resource_is_read_only(auth_client):
+    # The auth service lists anonymous sub resources as read, whatever the user's
+    # level, and check-user-permission only allows GET on them
+    token = sign({"waste-services": {"missed-waste-pickups": "read"}})
+
+    assert check(auth_client, token, "GET")["permission"] == "read"
+    with pytest.raises(HTTPException) as e:
+        check(auth_client, token, "POST")
+    assert e.value.status_code == 403
+
+
+def test_verify_access_token___unlisted_sub_resource_is_403(
+    auth_client, auth_service_state
+):
+    token = sign({"waste-services": {"other": "admin"}})
+
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(
+            auth_service.check_user_permission(
+                auth_client, token, None, "waste-services", "missed-waste-pickups"
+            )
+        )
+
+    assert e.value.status_code == 403
+    # Only the signing keys were fetched, check-user-permission was not called
+    assert [call.url.path for call in auth_service_state["calls"]] == [
+        "/api/auth/user/signing-keys/"
+    ]
+
+
+def test_verify_access_token___tampered_token_is_401(auth_client):
+    header, claims, signature = sign({}).split(".")
+    tampered = sign({"waste-services": {"missed-waste-pickups": "admin"}})
+
+    with pytest.raises(HTTPException) as e:
+        check(auth_client, ".".join([header, tampered.split(".")[1], signature]))
+    assert e.value.status_code == 401
+
+
+def test_verify_access_token___expired_token_is_401(auth_client):
+    token = sign({"waste-services": {"missed-waste-pickups": "read"}}, expires_in=-1)
+
+    with pytest.raises(HTTPException) as e:
+        check(auth_client, token)
+    assert e.value.status_code == 401
+
+
+def test_signing_keys___failed_refresh_keeps_known_keys(
+    auth_client, auth_service_state, monkeypatch, caplog
+):
+    token = sign({"waste-services": {"missed-waste-pickups": "read"}})
+    check(auth_client, token)
+
+    # The keys are due for a refresh but the auth service is down
+    monkeypatch.setattr(access_token_verifier, "SIGNING_KEYS_REFRESH_SECONDS", 0)
+    monkeypatch.setattr(access_token_verifier, "SIGNING_KEYS_MIN_REFRESH_SECONDS", 0)
+    auth_service_state["up"] = False
+
+    assert check(auth_client, token)["permission"] == "read"
+    assert "Could not refresh signing keys" in caplog.text
+
+
+def test_signing_keys___unreachable_without_known_keys_is_401(
+    auth_client, auth_service_state
+):
+    auth_service_state["up"] = False
+
+    with pytest.raises(HTTPException) as e:
+        check(auth_client, sign({}))
+    assert e.value.status_code == 401
@@ -87,6 +87,36 @@ def test_get_missed_waste_pickups___success_with_sorting(client):
     assert data[0]["date"] == "2023-10-02 12:00:00"
 
 
+def test_get_missed_waste_pickups___cursor_pagination(client):
+    params = {"search_term": "", "sort_field": "status", "sort_order": "desc", "limit": 1}
+    response = client.get("/api/waste-management/missed_waste_pickups", params=params)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    first_id = response.json()[0]["id"]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(
+        "/api/waste-management/missed_waste_pickups",
+        params={**params, "cursor": cursor},
+    )
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.json()[0]["id"] != first_id
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_get_missed_waste_pickups___failure_cursor_of_other_sort_order(client):
+    params = {"search_term": "", "sort_field": "date", "sort_order": "desc", "limit": 1}
+    response = client.get("/api/waste-management/missed_waste_pickups", params=params)
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(
+        "/api/waste-management/missed_waste_pickups",
+        params={**params, "sort_order": "asc", "cursor": cursor},
+    )
+    assert response.status_code == 400
+
+
 def test_update_missed_waste_pickup_status(client):
     payload = UpdateMissedWastePickupStatusDto(
         id=1,
@@ -0,0 +1,99 @@
+import asyncio
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+from app.services import auth_service
+from app.services.auth_cache import auth_decision_cache, credential_digest
+
+
+@pytest.fixture
+def auth_calls():
+    return []
+
+
+@pytest.fixture
+def auth_client(auth_calls, monkeypatch):
+    """Answers auth service calls from a mock transport and records them in auth_calls"""
+
+    async def handler(request):
+        auth_calls.append(request)
+        await asyncio.sleep(0.05)
+        if request.headers.get("x-api-key") == "unreachable":
+            raise httpx.ConnectError("Auth service is down")
+        if request.headers.get("x-api-key") == "denied":
+            return httpx.Response(403, json={"error": "Permission denied"})
+        return httpx.Response(
+            200,
+            json={"status": "authorised", "user": {"id": 1, "email": "a@a.com"}},
+        )
+
+    monkeypatch.setattr(auth_service, "AUTH_SERVICE_URL", "http://auth")
+    auth_decision_cache.clear()
+    yield httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    auth_decision_cache.clear()
+
+
+def test_check_user_permission___concurrent_checks_share_one_call(
+    auth_client, auth_calls
+):
+    async def burst():
+        return await asyncio.gather(
+            *[
+                auth_service.check_user_permission(
+                    auth_client, "token", "key", "waste-services", "missed-waste-pickups"
+                )
+                for _ in range(50)
+            ]
+        )
+
+    results = asyncio.run(burst())
+
+    assert len(auth_calls) == 1
+    assert all(result["user"]["id"] == 1 for result in results)
+
+
+def test_check_user_permission___denials_are_cached(auth_client, auth_calls):
+    async def check():
+        with pytest.raises(HTTPException) as e:
+            await auth_service.check_user_permission(
+                auth_client, "token", "denied", "waste-services", "missed-waste-pickups"
+            )
+        return e.value
+
+    for _ in range(3):
+        assert asyncio.run(check()).status_code == 403
+
+    assert len(auth_calls) == 1
+
+
+def test_check_user_permission___stale_decision_only_serves_reads(
+    auth_client, monkeypatch
+):
+    monkeypatch.setattr(auth_decision_cache, "ttl", 0.01)
+    monkeypatch.setattr(auth_decision_cache, "max_staleness", 60)
+    cache_key = (
+        "user",
+        credential_digest("token"),
+        credential_digest("unreachable"),
+        "waste-services",
+        "missed-waste-pickups",
+    )
+    auth_decision_cache.set(cache_key, 200, {"status": "authorised"})
+
+    async def check(allow_stale):
+        await asyncio.sleep(0.02)
+        return await auth_service.check_user_permission(
+            auth_client,
+            "token",
+            "unreachable",
+            "waste-services",
+            "missed-waste-pickups",
+            allow_stale,
+        )
+
+    assert asyncio.run(check(allow_stale=True)) == {"status": "authorised"}
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(check(allow_stale=False))
+    assert e.value.status_code == 401